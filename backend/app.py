@@ -10,7 +10,16 @@ from routes.items import items_bp
 from routes.transactions import transactions_bp
 from routes.analytics import analytics_bp
 from routes.audit import audit_bp
+from routes.sync import sync_bp
+from routes.socket_events import StockNamespace, NotificationNamespace
 from utils.db import init_db, set_db_permissions
+from utils.jobs import schedule_job
+from utils.reorder import refresh_reorder_suggestions, REORDER_REFRESH_MINUTES
+from utils.low_stock import verify_low_stock, LOW_STOCK_VERIFY_MINUTES
+from utils.audit import audit_writer
+from utils.notifier import notifier
+from utils.socket_queue import client_manager, SOCKETIO_MESSAGE_QUEUE
+from utils.audit_archive import archive_audit_logs, AUDIT_ARCHIVE_MINUTES
 
 # Load environment variables from .env file (development only)
 # In production (Render), use environment variables set in dashboard
@@ -28,33 +37,44 @@ app.config['SECRET_KEY'] = JWT_SECRET
 app.config['JWT_SECRET_KEY'] = JWT_SECRET
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.getenv('DATABASE_PATH', '/tmp/inventory.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Wait for SQLite write locks held by other workers instead of failing fast;
+# URI filenames let ledger archives be attached read-only
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30, 'uri': True}}
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=12)
 app.config['JWT_TOKEN_LOCATION'] = ['headers']
 
 # Environment detection
 FLASK_ENV = os.getenv('FLASK_ENV', 'development')
 IS_PRODUCTION = FLASK_ENV == 'production'
+# Off for one-off CLI runs, which must not start the workers' threads and jobs
+BACKGROUND_TASKS = os.getenv('BACKGROUND_TASKS', 'true').lower() == 'true'
 
 # CORS Configuration
 CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
 print(f"CORS Origins: {CORS_ORIGINS}")
 
+# Pub/sub between worker processes, so every client sees every worker's emits;
+# a CLI run only publishes
+socketio_queue = client_manager(
+    SOCKETIO_MESSAGE_QUEUE, app.config['SQLALCHEMY_DATABASE_URI'], write_only=not BACKGROUND_TASKS
+)
+
 if IS_PRODUCTION and '*' not in CORS_ORIGINS:
     # Strict CORS in production
     CORS(app, resources={
         "/api/*": {
             "origins": CORS_ORIGINS,
-            "allow_headers": ["Content-Type", "Authorization"],
-            "expose_headers": ["Content-Type", "Authorization"],
+            "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
+            "expose_headers": ["Content-Type", "Authorization", "X-Next-Cursor", "Idempotent-Replayed"],
             "supports_credentials": True,
             "max_age": 3600
         }
     })
-    socketio = SocketIO(app, cors_allowed_origins=CORS_ORIGINS)
+    socketio = SocketIO(app, cors_allowed_origins=CORS_ORIGINS, client_manager=socketio_queue)
 else:
     # Relaxed CORS for development or if wildcard is set
-    CORS(app)
-    socketio = SocketIO(app, cors_allowed_origins="*")
+    CORS(app, expose_headers=["X-Next-Cursor", "Idempotent-Replayed"])
+    socketio = SocketIO(app, cors_allowed_origins="*", client_manager=socketio_queue)
 
 db.init_app(app)
 jwt = JWTManager(app)
@@ -87,6 +107,11 @@ app.register_blueprint(items_bp, url_prefix='/api')
 app.register_blueprint(transactions_bp, url_prefix='/api')
 app.register_blueprint(analytics_bp, url_prefix='/api')
 app.register_blueprint(audit_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+
+# Socket.IO namespaces
+socketio.on_namespace(StockNamespace('/stock'))
+socketio.on_namespace(NotificationNamespace('/'))
 
 # Initialize database
 with app.app_context():
@@ -101,6 +126,18 @@ with app.app_context():
         set_db_permissions(db_path)
     print(f"Database initialized at: {db_path}")
 
+if BACKGROUND_TASKS:
+    # Audit records are written in batches by a background thread in each worker
+    audit_writer.start(app)
+    # Change notifications are coalesced into one frame per client per window
+    notifier.start(socketio)
+    
+    # Periodic jobs; shared ones are claimed by one worker process per run
+    schedule_job(app, 'reorder_suggestions', REORDER_REFRESH_MINUTES, refresh_reorder_suggestions)
+    schedule_job(app, 'audit_archive', AUDIT_ARCHIVE_MINUTES, archive_audit_logs)
+    # Every worker checks its own in-memory low-stock set
+    schedule_job(app, 'low_stock_verify', LOW_STOCK_VERIFY_MINUTES, verify_low_stock, shared=False)
+
 # Authentication Routes
 @app.route('/api/auth/login', methods=['POST'])
 def login():
@@ -168,6 +205,9 @@ def health_check():
         'status': 'healthy' if db_status == 'connected' else 'degraded',
         'message': 'InvGuard API is running',
         'database': db_status,
+        'audit_queue': audit_writer.pending(),
+        'notifications': notifier.stats(),
+        'message_queue': socketio_queue.name if socketio_queue else None,
         'environment': FLASK_ENV
     }), 200
 
@@ -183,6 +223,7 @@ def api_root():
             'items': '/api/items',
             'transactions': '/api/transactions',
             'analytics': '/api/analytics/*',
+            'sync': '/api/sync',
             'health': '/api/health'
         }
     }), 200
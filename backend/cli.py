@@ -16,6 +16,7 @@ API_URL = os.getenv('API_URL', 'http://localhost:5000/api')
 DATABASE_PATH = os.getenv('DATABASE_PATH', '/app/data/inventory.db')
 BACKUP_PATH = os.getenv('BACKUP_PATH', '/app/backups')
 GPG_PASSPHRASE = os.getenv('GPG_PASSPHRASE', 'default_passphrase')
+RECONCILE_PATH = os.getenv('RECONCILE_PATH', os.path.join(os.path.dirname(DATABASE_PATH), 'reconciliation'))
 
 # Global token storage (in production, use secure storage)
 TOKEN_FILE = '/tmp/invguard_token'
@@ -28,6 +29,18 @@ def get_headers():
         return {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
     return {'Content-Type': 'application/json'}
 
+def load_flask_app():
+    """
+    Import the backend app for commands that work on the database directly
+
+    The app is loaded without the audit writer, notifier and scheduled
+    jobs, so a one-off command never runs them alongside the workers.
+    Audit records are then written synchronously.
+    """
+    os.environ['BACKGROUND_TASKS'] = 'false'
+    from app import app as flask_app
+    return flask_app
+
 def save_token(token):
     """Save JWT token to file"""
     with open(TOKEN_FILE, 'w') as f:
@@ -285,6 +298,158 @@ def restore_db(backup_file: str):
     except Exception as e:
         typer.echo(f"✗ Error: {e}", err=True)
 
+@app.command()
+def snapshot_stock():
+    """Record a point-in-time stock snapshot of every item (run daily)"""
+    try:
+        # Works on the database directly, like backup-db
+        flask_app = load_flask_app()
+        from models import db
+        from utils.snapshots import take_snapshot
+        
+        with flask_app.app_context():
+            count = take_snapshot()
+            db.session.commit()
+        
+        typer.echo(f"✓ Stock snapshot recorded for {count} items")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def archive_ledger(hot_days: int = 365, vacuum: bool = True):
+    """Move transactions older than the hot horizon into yearly archive files"""
+    try:
+        flask_app = load_flask_app()
+        from utils.ledger_archive import archive_ledger as run_archive
+        
+        with flask_app.app_context():
+            archived = run_archive(hot_days=hot_days, vacuum=vacuum)
+        
+        if archived:
+            for period, count in archived.items():
+                typer.echo(f"✓ Archived {count} transactions from {period}")
+        else:
+            typer.echo("✓ Nothing to archive")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def archive_audit(retention_days: int = 90, compression: str = 'gzip', vacuum: bool = True):
+    """Move audit records older than the retention window into compressed archive segments"""
+    try:
+        flask_app = load_flask_app()
+        from utils.audit_archive import archive_audit_logs, audit_archive_dir
+        
+        with flask_app.app_context():
+            result = archive_audit_logs(retention_days=retention_days, compression=compression, vacuum=vacuum)
+            directory = audit_archive_dir()
+        
+        if result['records']:
+            typer.echo(f"✓ Archived {result['records']} audit records into {result['segments']} segments")
+            typer.echo(f"  Location: {directory}")
+        else:
+            typer.echo("✓ Nothing to archive")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def compact_audit_changes(chunk_size: int = 20000, vacuum: bool = True):
+    """Rewrite old Item audit records from full snapshots into field diffs"""
+    try:
+        flask_app = load_flask_app()
+        from utils.audit_compact import compact_item_audit_changes
+        
+        with flask_app.app_context():
+            result = compact_item_audit_changes(chunk_size=chunk_size, vacuum=vacuum)
+        
+        saved = result['bytes_before'] - result['bytes_after']
+        typer.echo(f"✓ Rewrote {result['rewritten']} of {result['scanned']} Item audit records")
+        typer.echo(f"  Changes size: {result['bytes_before']} -> {result['bytes_after']} bytes ({saved} saved)")
+        if result['skipped']:
+            typer.echo(f"  Left {result['skipped']} updates as snapshots (no earlier state to diff against)")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def backfill_daily_movements(days: Optional[int] = None):
+    """Rebuild the daily movement totals behind stock trends from the ledger"""
+    try:
+        from datetime import datetime, timedelta
+        flask_app = load_flask_app()
+        from utils.daily_movements import backfill_daily_movements as run_backfill
+        
+        date_from = datetime.utcnow() - timedelta(days=days) if days else None
+        with flask_app.app_context():
+            rows = run_backfill(date_from)
+        
+        scope = f"the last {days} days" if days else "the whole ledger"
+        typer.echo(f"✓ Rebuilt {rows} daily movement rows from {scope}")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def rebuild_stats():
+    """Verify the dashboard counters against the items table and repair them"""
+    try:
+        flask_app = load_flask_app()
+        from utils.inventory_stats import rebuild_inventory_stats
+        
+        with flask_app.app_context():
+            drift = rebuild_inventory_stats()
+        
+        if not drift:
+            typer.echo("✓ Dashboard counters are up to date")
+            return
+        
+        for name, (stored, actual) in sorted(drift.items()):
+            typer.echo(f"⚠ {name}: stored {stored}, actual {actual}")
+        typer.echo("✓ Dashboard counters rebuilt")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def refresh_reorder_suggestions():
+    """Recompute demand forecasts and reorder suggestions for every item"""
+    try:
+        flask_app = load_flask_app()
+        from utils.reorder import refresh_reorder_suggestions as run_refresh
+        
+        with flask_app.app_context():
+            result = run_refresh()
+        
+        typer.echo(f"✓ Reorder suggestions computed for {result['items']} items")
+        typer.echo(f"  Due for reorder: {result['reorder']}")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
+@app.command()
+def reconcile_stock(chunk_size: int = 50000, rescan: bool = False):
+    """Compare on-hand stock with the transaction ledger and report discrepancies"""
+    try:
+        # Reads the database directly (read-only); progress is checkpointed
+        # under RECONCILE_PATH so reruns only scan new ledger rows
+        from utils.reconcile import reconcile_stock as run_reconcile
+        
+        result = run_reconcile(DATABASE_PATH, RECONCILE_PATH, chunk_size=chunk_size, rescan=rescan)
+        
+        scan = "full scan" if result['full_rescan'] else "incremental"
+        typer.echo(f"Checked {result['items_checked']} items against {result['rows_scanned']} "
+                   f"new ledger rows ({scan}, up to transaction {result['last_transaction_id']})")
+        
+        if not result['discrepancies']:
+            typer.echo("✓ On-hand stock matches the ledger")
+            return
+        
+        typer.echo(f"⚠️  {result['discrepancies']} items differ from the ledger:\n")
+        typer.echo(f"{'ID':<6} {'SKU':<15} {'On hand':<10} {'Ledger':<10} {'Difference':<10}")
+        typer.echo("-" * 55)
+        for row in result['sample']:
+            typer.echo(f"{row['item_id']:<6} {row['sku']:<15} {row['on_hand']:<10} "
+                       f"{row['ledger']:<10} {row['difference']:<10}")
+        typer.echo(f"\nFull report: {result['report']}")
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+
 @app.command()
 def low_stock():
     """Show items with low stock"""
@@ -7,6 +7,13 @@ db = SQLAlchemy()
 
 class Audit(db.Model):
     __tablename__ = 'audit_logs'
+    # Newest-first keyset paging, alone or after an equality filter
+    __table_args__ = (
+        db.Index('ix_audit_logs_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_audit_logs_action_timestamp_id', 'action', 'timestamp', 'id'),
+        db.Index('ix_audit_logs_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+        db.Index('ix_audit_logs_resource_timestamp_id', 'resource_type', 'resource_id', 'timestamp', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     action = db.Column(db.String(20), nullable=False)  # CREATE, UPDATE, DELETE
@@ -56,6 +63,9 @@ class User(db.Model):
 
 class Item(db.Model):
     __tablename__ = 'items'
+    __table_args__ = (
+        db.Index('ix_items_change_seq_id', 'change_seq', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -67,8 +77,10 @@ class Item(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Change sequence of the last write
     
     transactions = db.relationship('Transaction', backref='item', lazy=True, cascade='all, delete-orphan')
+    daily_movements = db.relationship('DailyMovement', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -87,6 +99,14 @@ class Item(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_created_at_id', 'created_at', 'id'),
+        db.Index('ix_transactions_item_id_created_at', 'item_id', 'created_at'),
+        db.Index('ix_transactions_change_seq_id', 'change_seq', 'id'),
+        # Never hand a deleted row's ID out again: reconciliation and stock
+        # snapshots checkpoint on the newest ledger ID they have seen
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False)
@@ -95,6 +115,8 @@ class Transaction(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.String(80))
+    archived_period = db.Column(db.String(7), nullable=True)  # Set on summary rows standing in for archived movements
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Change sequence of the write that created it
     
     def to_dict(self):
         return {
@@ -106,4 +128,129 @@ class Transaction(db.Model):
             'notes': self.notes,
             'created_at': self.created_at.isoformat(),
             'created_by': self.created_by
-        }
\ No newline at end of file
+        }
+
+
+class DailyMovement(db.Model):
+    __tablename__ = 'daily_movements'
+    __table_args__ = (
+        db.Index('ix_daily_movements_item_id_date', 'item_id', 'date'),
+    )
+    
+    # One row per item and UTC day, kept in step with the ledger on every movement
+    date = db.Column(db.Date, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id'), primary_key=True)
+    stock_in = db.Column(db.Integer, nullable=False, default=0)
+    stock_out = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'item_id': self.item_id,
+            'stock_in': self.stock_in,
+            'stock_out': self.stock_out
+        }
+
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    __table_args__ = (
+        db.Index('ix_stock_snapshots_taken_at', 'taken_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    last_transaction_id = db.Column(db.Integer, nullable=False, default=0)  # Newest ledger row included
+    taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'item_id': self.item_id,
+            'quantity': self.quantity,
+            'last_transaction_id': self.last_transaction_id,
+            'taken_at': self.taken_at.isoformat()
+        }
+
+
+class InventoryStat(db.Model):
+    __tablename__ = 'inventory_stats'
+    
+    # Dashboard counters, adjusted in the same transaction as every item write
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+
+class CategoryStat(db.Model):
+    __tablename__ = 'category_stats'
+    
+    category = db.Column(db.String(100), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # Bumped in the same transaction as every write to the named table
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SyncTombstone(db.Model):
+    __tablename__ = 'sync_tombstones'
+    __table_args__ = (
+        db.Index('ix_sync_tombstones_resource_type_change_seq', 'resource_type', 'change_seq', 'resource_id'),
+    )
+    
+    # Deleted rows, so sync clients learn to drop them from their replicas
+    resource_type = db.Column(db.String(20), primary_key=True)  # item or transaction
+    resource_id = db.Column(db.Integer, primary_key=True)
+    change_seq = db.Column(db.Integer, nullable=False)  # Change sequence of the delete
+
+
+class ReorderSuggestion(db.Model):
+    __tablename__ = 'reorder_suggestions'
+    
+    # Demand statistics per item, replaced as a whole by every run of the
+    # reorder job; stock positions are compared with them when read
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id'), primary_key=True)
+    avg_daily_demand = db.Column(db.Float, nullable=False, default=0)
+    demand_std = db.Column(db.Float, nullable=False, default=0)
+    reorder_point = db.Column(db.Integer, nullable=False, default=0)
+    order_up_to = db.Column(db.Integer, nullable=False, default=0)  # Target level for a new order
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'item_id': self.item_id,
+            'avg_daily_demand': self.avg_daily_demand,
+            'demand_std': self.demand_std,
+            'reorder_point': self.reorder_point,
+            'order_up_to': self.order_up_to,
+            'computed_at': self.computed_at.isoformat()
+        }
+
+
+class ScheduledJob(db.Model):
+    __tablename__ = 'scheduled_jobs'
+    
+    # Last start of each periodic job, claimed by one worker process at a time
+    name = db.Column(db.String(50), primary_key=True)
+    last_run_at = db.Column(db.DateTime, nullable=False)
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('username', 'key', name='uq_idempotency_keys_username_key'),
+        db.Index('ix_idempotency_keys_created_at', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # SHA-256 of method, path and body
+    status_code = db.Column(db.Integer, nullable=True)  # NULL while the request is in flight
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,36 +1,46 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
-from sqlalchemy import func, desc, case
-from models import db, Item, Transaction
-from utils.security import viewer_or_admin_required
-from datetime import datetime, timedelta
+from sqlalchemy import func, desc
+from models import db, Item, ReorderSuggestion
+from utils.security import admin_required, viewer_or_admin_required
+from utils.analytics_cache import cached_analytics, cache_stats, current_versions, read_snapshot
+from utils.inventory_stats import read_inventory_stats, recent_transactions, RECENT_VERSION_TABLES
+from utils.low_stock import low_stock
+from utils.snapshots import parse_as_of, quantities_as_of
+from utils.pagination import page_size, parse_date_range
+from utils.trends import stock_trends as _stock_trends, DEFAULT_WINDOW
+from utils.abc import abc_report, ABC_CLASSES, DEFAULT_A_SHARE, DEFAULT_B_SHARE
 
 analytics_bp = Blueprint('analytics', __name__)
 
+TOP_ITEMS = 10
+BUNDLE_SECTIONS = ['low-stock', 'category-summary', 'stock-trends', 'top-items', 'dashboard']
+
 @analytics_bp.route('/analytics/low-stock', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
 def low_stock_items():
     """Get items with stock below reorder level"""
-    items = Item.query.filter(Item.quantity <= Item.reorder_level).all()
-    
-    result = [{
-        'id': item.id,
-        'name': item.name,
-        'sku': item.sku,
-        'category': item.category,
-        'current_stock': item.quantity,
-        'reorder_level': item.reorder_level,
-        'shortage': item.reorder_level - item.quantity
-    } for item in items]
-    
-    return jsonify(result), 200
+    # Served from the in-memory set the write paths keep up to date
+    return jsonify(low_stock.get()), 200
 
 @analytics_bp.route('/analytics/category-summary', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
+@cached_analytics('items', 'transactions')
 def category_summary():
-    """Get summary statistics by category"""
+    """Get summary statistics by category, optionally as of a past date"""
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if as_of:
+        return jsonify(_category_summary_as_of(as_of)), 200
+    
+    return jsonify(_category_summary()), 200
+
+def _category_summary():
     summary = db.session.query(
         Item.category,
         func.count(Item.id).label('total_items'),
@@ -38,79 +48,217 @@ def category_summary():
         func.sum(Item.quantity * Item.price).label('total_value')
     ).group_by(Item.category).all()
     
-    result = [{
+    return [{
         'category': row.category,
         'total_items': row.total_items,
         'total_quantity': row.total_quantity or 0,
         'total_value': float(row.total_value or 0)
     } for row in summary]
+
+def _category_summary_as_of(as_of):
+    """Category totals from point-in-time quantities (valued at current prices)"""
+    quantities = quantities_as_of(as_of)
+    rows = db.session.query(Item.id, Item.category, Item.price).filter(Item.created_at < as_of)
     
-    return jsonify(result), 200
+    summary = {}
+    for item_id, category, price in rows:
+        entry = summary.setdefault(category, {
+            'category': category,
+            'total_items': 0,
+            'total_quantity': 0,
+            'total_value': 0.0
+        })
+        quantity = quantities.get(item_id, 0)
+        entry['total_items'] += 1
+        entry['total_quantity'] += quantity
+        entry['total_value'] += quantity * price
+    
+    return [summary[category] for category in sorted(summary)]
 
 @analytics_bp.route('/analytics/stock-trends', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
+@cached_analytics('items', 'transactions')
 def stock_trends():
-    """Get stock movement trends (last 30 days)"""
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    # Get daily transaction summary
-    trends = db.session.query(
-        func.date(Transaction.created_at).label('date'),
-        func.sum(case((Transaction.transaction_type == 'IN', Transaction.quantity), else_=0)).label('stock_in'),
-        func.sum(case((Transaction.transaction_type == 'OUT', Transaction.quantity), else_=0)).label('stock_out')
-    ).filter(
-        Transaction.created_at >= thirty_days_ago
-    ).group_by(
-        func.date(Transaction.created_at)
-    ).order_by('date').all()
-    
-    result = [{
-        'date': str(row.date),
-        'stock_in': int(row.stock_in or 0),
-        'stock_out': int(row.stock_out or 0),
-        'net_change': int((row.stock_in or 0) - (row.stock_out or 0))
-    } for row in trends]
+    """Get bucketed stock movement trends, optionally for one item or category"""
+    try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+        trends = _stock_trends(
+            start, end,
+            granularity=request.args.get('granularity', 'day'),
+            item_id=request.args.get('item_id', type=int),
+            category=request.args.get('category'),
+            window=request.args.get('window', DEFAULT_WINDOW, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify(result), 200
+    return jsonify(trends), 200
 
 @analytics_bp.route('/analytics/top-items', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
+@cached_analytics('items')
 def top_items():
     """Get top items by value"""
-    items = Item.query.order_by(desc(Item.quantity * Item.price)).limit(10).all()
-    
-    result = [{
+    items = Item.query.order_by(desc(Item.quantity * Item.price)).limit(TOP_ITEMS).all()
+    return jsonify([_top_item_entry(item) for item in items]), 200
+
+def _top_item_entry(item):
+    return {
         'id': item.id,
         'name': item.name,
         'category': item.category,
         'quantity': item.quantity,
         'price': item.price,
         'total_value': item.quantity * item.price
-    } for item in items]
-    
-    return jsonify(result), 200
+    }
 
 @analytics_bp.route('/analytics/dashboard', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
+@cached_analytics('items', 'transactions')
 def dashboard_stats():
     """Get overall dashboard statistics"""
-    total_items = Item.query.count()
-    total_categories = db.session.query(func.count(func.distinct(Item.category))).scalar()
-    total_value = db.session.query(func.sum(Item.quantity * Item.price)).scalar() or 0
-    low_stock_count = Item.query.filter(Item.quantity <= Item.reorder_level).count()
-    
-    # Recent transactions
-    recent_transactions = Transaction.query.order_by(
-        Transaction.created_at.desc()
-    ).limit(5).all()
-    
-    return jsonify({
-        'total_items': total_items,
-        'total_categories': total_categories,
-        'total_inventory_value': float(total_value),
-        'low_stock_alerts': low_stock_count,
-        'recent_transactions': [t.to_dict() for t in recent_transactions]
-    }), 200
\ No newline at end of file
+    return jsonify(_dashboard()), 200
+
+def _dashboard():
+    """Counters maintained by the write paths plus the recent-transactions buffer"""
+    stats = read_inventory_stats()
+    stats['recent_transactions'] = recent_transactions.get(current_versions(RECENT_VERSION_TABLES))
+    return stats
+
+@analytics_bp.route('/analytics/reorder-suggestions', methods=['GET'])
+@jwt_required()
+@viewer_or_admin_required
+@cached_analytics('items', 'reorder_suggestions')
+def reorder_suggestions():
+    """Get items due for reorder by forecast demand (all=true for every item), most urgent first"""
+    category = request.args.get('category')
+    include_all = request.args.get('all', 'false').lower() == 'true'
+    
+    # Demand statistics come from the last reorder job run; stock is live
+    query = db.select(
+        Item.id, Item.name, Item.sku, Item.category, Item.quantity, Item.reorder_level,
+        ReorderSuggestion.avg_daily_demand, ReorderSuggestion.demand_std, ReorderSuggestion.reorder_point,
+        ReorderSuggestion.order_up_to, ReorderSuggestion.computed_at
+    ).join(ReorderSuggestion, ReorderSuggestion.item_id == Item.id)
+    if category:
+        query = query.where(Item.category == category)
+    if not include_all:
+        query = query.where(
+            Item.quantity <= ReorderSuggestion.reorder_point,
+            Item.quantity < ReorderSuggestion.order_up_to
+        )
+    
+    rows = db.session.execute(query).all()
+    entries = [_reorder_entry(row) for row in rows]
+    entries.sort(key=lambda entry: (entry['days_of_cover'] is None, entry['days_of_cover'] or 0, entry['id']))
+    return jsonify(entries), 200
+
+def _reorder_entry(row):
+    quantity = row.quantity or 0
+    demand = row.avg_daily_demand
+    return {
+        'id': row.id,
+        'name': row.name,
+        'sku': row.sku,
+        'category': row.category,
+        'current_stock': quantity,
+        'reorder_level': row.reorder_level,
+        'avg_daily_demand': demand,
+        'demand_std': row.demand_std,
+        'days_of_cover': round(max(quantity, 0) / demand, 1) if demand > 0 else None,
+        'suggested_reorder_point': row.reorder_point,
+        'order_quantity': max(row.order_up_to - quantity, 0) if quantity <= row.reorder_point else 0,
+        'computed_at': row.computed_at.isoformat()
+    }
+
+@analytics_bp.route('/analytics/abc', methods=['GET'])
+@jwt_required()
+@viewer_or_admin_required
+@cached_analytics('items', 'transactions')
+def abc_classification():
+    """Get the ABC classification by consumption value with category breakdowns"""
+    klass = request.args.get('class')
+    if klass and klass not in ABC_CLASSES:
+        return jsonify({'message': f"Invalid class. Use {', '.join(ABC_CLASSES)}"}), 400
+    
+    try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+        report = abc_report(
+            start, end,
+            a_share=request.args.get('a_share', DEFAULT_A_SHARE, type=float),
+            b_share=request.args.get('b_share', DEFAULT_B_SHARE, type=float)
+        )
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Highest consumption value first, optionally one class only
+    limit = page_size(request.args.get('limit', type=int))
+    ranked = [entry for entry in report.pop('ranked') if not klass or entry[4] == klass][:limit]
+    details = {row.id: row for row in db.session.execute(
+        db.select(Item.id, Item.name, Item.sku, Item.category).where(Item.id.in_([entry[0] for entry in ranked]))
+    )}
+    report['items'] = [{
+        'id': item_id,
+        'name': details[item_id].name,
+        'sku': details[item_id].sku,
+        'category': details[item_id].category,
+        'consumption_quantity': quantity,
+        'consumption_value': round(value, 2),
+        'cumulative_share': round(share, 4),
+        'class': item_class
+    } for item_id, quantity, value, share, item_class in ranked]
+    
+    return jsonify(report), 200
+
+@analytics_bp.route('/analytics/bundle', methods=['GET'])
+@jwt_required()
+@viewer_or_admin_required
+@cached_analytics('items', 'transactions')
+def analytics_bundle():
+    """Get several analytics sections in one request, from one read snapshot"""
+    requested = request.args.get('sections')
+    sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else BUNDLE_SECTIONS
+    unknown = [name for name in sections if name not in BUNDLE_SECTIONS]
+    if unknown:
+        return jsonify({'message': f"Unknown section: {', '.join(unknown)}. Use {', '.join(BUNDLE_SECTIONS)}"}), 400
+    
+    # One read transaction so every section sees the same data
+    with read_snapshot():
+        result = _bundle(sections)
+    
+    return jsonify(result), 200
+
+def _bundle(sections):
+    """Compute the requested sections with the builders of the single endpoints"""
+    wanted = set(sections)
+    result = {}
+    
+    if 'category-summary' in wanted:
+        result['category-summary'] = _category_summary()
+    
+    if 'dashboard' in wanted:
+        result['dashboard'] = _dashboard()
+    
+    if 'low-stock' in wanted:
+        result['low-stock'] = low_stock.get()
+    
+    if 'top-items' in wanted:
+        items = db.session.execute(db.select(
+            Item.id, Item.name, Item.category, Item.quantity, Item.price
+        ).order_by(desc(Item.quantity * Item.price)).limit(TOP_ITEMS)).all()
+        result['top-items'] = [_top_item_entry(item) for item in items]
+    
+    if 'stock-trends' in wanted:
+        result['stock-trends'] = _stock_trends()
+    
+    return result
+
+@analytics_bp.route('/analytics/cache-stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def analytics_cache_stats():
+    """Get hit-rate metrics of the analytics result cache"""
+    return jsonify(cache_stats()), 200
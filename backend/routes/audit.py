@@ -1,25 +1,119 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Audit
+from sqlalchemy import select
+from models import db, Audit, User
 from utils.security import admin_required
+from utils.pagination import page_size, parse_date_range, keyset_page, encode_cursor, decode_cursor
+from utils.audit_archive import query_audit_archive
+from datetime import datetime
+import json
 
 audit_bp = Blueprint('audit', __name__)
 
+def _audit_query(filters):
+    """Filtered audit rows with the username joined in, instead of one user SELECT per row"""
+    query = db.session.query(
+        Audit.id, Audit.action, Audit.resource_type, Audit.resource_id,
+        Audit.user_id, User.username.label('user_name'), Audit.changes, Audit.timestamp
+    ).outerjoin(User, User.id == Audit.user_id)
+
+    if filters.get('action'):
+        query = query.filter(Audit.action == filters['action'])
+    if filters.get('resource_type'):
+        query = query.filter(Audit.resource_type == filters['resource_type'])
+    if filters.get('resource_id') is not None:
+        query = query.filter(Audit.resource_id == filters['resource_id'])
+    if filters.get('user_id') is not None:
+        query = query.filter(Audit.user_id == filters['user_id'])
+    if filters.get('date_from'):
+        query = query.filter(Audit.timestamp >= filters['date_from'])
+    if filters.get('date_to'):
+        query = query.filter(Audit.timestamp < filters['date_to'])
+    return query
+
+def _audit_page(filters):
+    """
+    Fetch one page newest first and build the response
+
+    With include_archive=true a page that runs past the oldest record in
+    the database continues into the archive segments. With raw_changes
+    the stored changes JSON is spliced into the body as-is rather than
+    decoded and encoded again.
+    """
+    limit = page_size(request.args.get('limit', type=int))
+    cursor = request.args.get('cursor')
+    include_archive = request.args.get('include_archive', 'false').lower() == 'true'
+    raw_changes = request.args.get('raw_changes', 'false').lower() == 'true'
+
+    try:
+        date_from, date_to = parse_date_range(request.args.get('from'), request.args.get('to'))
+        filters = dict(filters, date_from=date_from, date_to=date_to)
+        rows, next_cursor = keyset_page(_audit_query(filters), Audit.timestamp, Audit.id, cursor, limit)
+        before = (rows[-1].timestamp, rows[-1].id) if rows else (decode_cursor(cursor) if cursor else None)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    entries = [{
+        'id': row.id,
+        'action': row.action,
+        'resource_type': row.resource_type,
+        'resource_id': row.resource_id,
+        'user_id': row.user_id,
+        'user_name': row.user_name,
+        'timestamp': row.timestamp.isoformat()
+    } for row in rows]
+
+    # Archived records are all older than the ones still in the database
+    archived = []
+    if include_archive and next_cursor is None:
+        archived = query_audit_archive(filters, before, limit - len(rows) + 1)
+        if len(rows) + len(archived) > limit:
+            archived = archived[:limit - len(rows)]
+            last = archived[-1] if archived else entries[-1]
+            next_cursor = encode_cursor(datetime.fromisoformat(last['timestamp']), last['id'])
+
+    if raw_changes:
+        body = '[' + ','.join(
+            [json.dumps(entry)[:-1] + ', "changes": ' + (row.changes or 'null') + '}'
+             for entry, row in zip(entries, rows)] +
+            [json.dumps(record) for record in archived]
+        ) + ']'
+        response = current_app.response_class(body, mimetype='application/json')
+    else:
+        for entry, row in zip(entries, rows):
+            entry['changes'] = json.loads(row.changes) if row.changes else None
+        response = jsonify(entries + archived)
+
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
 @audit_bp.route('/audit', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_audit_logs():
-    """Get audit logs with optional filtering"""
-    logs = Audit.query.order_by(Audit.timestamp.desc()).limit(100).all()
-    return jsonify([log.to_dict() for log in logs]), 200
+    """Get audit logs newest first with optional filtering and cursor paging"""
+    action = request.args.get('action')
+    filters = {
+        'action': action.upper() if action else None,
+        'resource_type': request.args.get('resource_type'),
+        'resource_id': request.args.get('resource_id', type=int),
+        'user_id': request.args.get('user_id', type=int)
+    }
+
+    username = request.args.get('user')
+    if username:
+        # Resolved once, so the user_id index (and the archive index) serve the filter
+        user_id = db.session.execute(select(User.id).where(User.username == username)).scalar()
+        if user_id is None or filters['user_id'] not in (None, user_id):
+            return jsonify([]), 200
+        filters['user_id'] = user_id
+
+    return _audit_page(filters)
 
 @audit_bp.route('/audit/resource/<string:resource_type>/<int:resource_id>', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_resource_audit_logs(resource_type, resource_id):
     """Get audit logs for a specific resource"""
-    logs = Audit.query.filter_by(
-        resource_type=resource_type,
-        resource_id=resource_id
-    ).order_by(Audit.timestamp.desc()).all()
-    return jsonify([log.to_dict() for log in logs]), 200
\ No newline at end of file
+    return _audit_page({'resource_type': resource_type, 'resource_id': resource_id})
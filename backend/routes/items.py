@@ -1,8 +1,19 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import select
 from models import db, Item, Transaction, Audit
 from utils.security import admin_required, viewer_or_admin_required
-from utils.audit import log_audit
+from utils.idempotency import idempotent
+from utils.audit import log_audit, field_values, field_changes, ITEM_AUDIT_FIELDS
+from utils.snapshots import parse_as_of, quantities_as_of
+from utils.snapshots import maybe_snapshot
+from utils.daily_movements import add_daily_movements
+from utils.analytics_cache import bump_versions
+from utils.inventory_stats import StatsDelta, item_state, recent_transactions
+from utils.low_stock import LowStockChanges
+from utils.notifier import notifier
+from utils.sync import next_change_seq, record_deletions
+from utils.stock import validate_stock_level
 import json
 
 items_bp = Blueprint('items', __name__)
@@ -11,15 +22,35 @@ items_bp = Blueprint('items', __name__)
 @jwt_required()
 @viewer_or_admin_required
 def get_items():
-    """Get all items with optional filtering"""
+    """Get all items with optional filtering, optionally as they stood at a past date"""
     category = request.args.get('category')
+    sku = request.args.get('sku')
     low_stock = request.args.get('low_stock', 'false').lower() == 'true'
     
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
     query = Item.query
     
     if category:
         query = query.filter_by(category=category)
     
+    if sku:
+        query = query.filter_by(sku=sku)
+    
+    if as_of:
+        quantities = quantities_as_of(as_of)
+        items = query.filter(Item.created_at < as_of).all()
+        result = []
+        for item in items:
+            data = item.to_dict()
+            data['quantity'] = quantities.get(item.id, 0)
+            if not low_stock or data['quantity'] <= item.reorder_level:
+                result.append(data)
+        return jsonify(result), 200
+    
     if low_stock:
         query = query.filter(Item.quantity <= Item.reorder_level)
     
@@ -37,6 +68,7 @@ def get_item(item_id):
 @items_bp.route('/items', methods=['POST'])
 @jwt_required()
 @admin_required
+@idempotent
 def create_item():
     """Create new item"""
     data = request.get_json()
@@ -46,6 +78,10 @@ def create_item():
     if not all(field in data for field in required):
         return jsonify({'message': 'Missing required fields'}), 400
     
+    error = validate_stock_level(data['quantity'])
+    if error:
+        return jsonify({'message': error}), 400
+    
     # Check if SKU already exists
     if Item.query.filter_by(sku=data['sku']).first():
         return jsonify({'message': 'SKU already exists'}), 400
@@ -57,11 +93,35 @@ def create_item():
         quantity=data['quantity'],
         price=data['price'],
         reorder_level=data.get('reorder_level', 10),
-        description=data.get('description', '')
+        description=data.get('description', ''),
+        change_seq=next_change_seq()
     )
     
     db.session.add(item)
+    db.session.flush()
+    # Record the initial quantity in the ledger so stock reconciles with it
+    if item.quantity > 0:
+        opening = Transaction(
+            item_id=item.id,
+            transaction_type='IN',
+            quantity=item.quantity,
+            notes='Opening balance',
+            created_by=get_jwt_identity(),
+            change_seq=item.change_seq
+        )
+        db.session.add(opening)
+        db.session.flush()
+        add_daily_movements([opening])
+    stats = StatsDelta()
+    stats.change(None, item_state(item))
+    stats.apply()
+    low_stock_changes = LowStockChanges()
+    low_stock_changes.change(item.id, None, item_state(item), item)
+    low_stock_changes.resolve()
+    versions = bump_versions('items', 'transactions')
     db.session.commit()
+    low_stock_changes.publish(versions)
+    notifier.notify('item', 'created', item.id, categories=[item.category])
     # Audit log
     try:
         user = get_jwt_identity()
@@ -70,7 +130,7 @@ def create_item():
         from models import User
         user_obj = User.query.filter_by(username=user).first()
         user_id = user_obj.id if user_obj else None
-        log_audit('CREATE', 'Item', item.id, user_id, changes=item.to_dict())
+        log_audit('CREATE', 'Item', item.id, user_id, changes=field_values(item, ITEM_AUDIT_FIELDS))
     except Exception:
         pass
 
@@ -81,32 +141,76 @@ def create_item():
 @admin_required
 def update_item(item_id):
     """Update existing item"""
-    item = Item.query.get_or_404(item_id)
     data = request.get_json()
+    if 'quantity' in data:
+        error = validate_stock_level(data['quantity'])
+        if error:
+            return jsonify({'message': error}), 400
+    # Take the write lock before reading the item, so the state the
+    # counter deltas start from is the one this update replaces
+    seq = next_change_seq()
+    item = Item.query.get_or_404(item_id)
+    before = item_state(item)
     
     # Update fields
     if 'name' in data:
         item.name = data['name']
     if 'category' in data:
         item.category = data['category']
+    adjustment = None
     if 'quantity' in data:
+        # Setting stock directly posts the difference to the ledger, so
+        # reconciliation, point-in-time quantities and daily totals follow
+        delta = data['quantity'] - (item.quantity or 0)
         item.quantity = data['quantity']
+        if delta:
+            adjustment = Transaction(
+                item_id=item.id,
+                transaction_type='IN' if delta > 0 else 'OUT',
+                quantity=abs(delta),
+                notes='Stock adjustment',
+                created_by=get_jwt_identity(),
+                change_seq=seq
+            )
     if 'price' in data:
         item.price = data['price']
     if 'reorder_level' in data:
         item.reorder_level = data['reorder_level']
     if 'description' in data:
         item.description = data['description']
+    # Read the attribute history before anything autoflushes it away
+    changes = field_changes(item, ITEM_AUDIT_FIELDS)
+    item.change_seq = seq
     
+    if adjustment:
+        db.session.add(adjustment)
+        db.session.flush()
+        maybe_snapshot(adjustment.id, adjustment.id)
+        add_daily_movements([adjustment])
+    stats = StatsDelta()
+    stats.change(before, item_state(item))
+    stats.apply()
+    low_stock_changes = LowStockChanges()
+    low_stock_changes.change(item.id, before, item_state(item), item)
+    low_stock_changes.resolve()
+    if adjustment:
+        versions = bump_versions('items', 'transactions')
+        posted = adjustment.to_dict()
+    else:
+        versions = bump_versions('items')
     db.session.commit()
+    if adjustment:
+        recent_transactions.push([posted], versions)
+        notifier.notify('transaction', 'created', adjustment.id, item.id, [item.category])
+    low_stock_changes.publish(versions)
+    # Subscribers of the old category learn that the item left it
+    notifier.notify('item', 'updated', item.id, categories=[before[0], item.category])
     # Audit log
     try:
         user = get_jwt_identity()
         from models import User
         user_obj = User.query.filter_by(username=user).first()
         user_id = user_obj.id if user_obj else None
-        # Determine diff (simple approach)
-        changes = {k: getattr(item, k) for k in ['name','category','quantity','price','reorder_level','description']}
         log_audit('UPDATE', 'Item', item.id, user_id, changes=changes)
     except Exception:
         pass
@@ -118,9 +222,25 @@ def update_item(item_id):
 @admin_required
 def delete_item(item_id):
     """Delete item"""
+    # Locked before the read, like update_item
+    seq = next_change_seq()
     item = Item.query.get_or_404(item_id)
+    category = item.category
+    stats = StatsDelta()
+    stats.change(item_state(item), None)
+    low_stock_changes = LowStockChanges()
+    low_stock_changes.change(item.id, item_state(item), None, item)
+    low_stock_changes.resolve()
+    record_deletions('item', [item.id], seq)
+    record_deletions('transaction', select(Transaction.id).where(
+        Transaction.item_id == item.id, Transaction.archived_period.is_(None)
+    ), seq)
     db.session.delete(item)
+    stats.apply()
+    versions = bump_versions('items', 'transactions')
     db.session.commit()
+    low_stock_changes.publish(versions)
+    notifier.notify('item', 'deleted', item_id, categories=[category])
     # Audit log
     try:
         user = get_jwt_identity()
@@ -0,0 +1,124 @@
+import time
+from flask import request
+from flask_socketio import Namespace, join_room, leave_room
+from flask_jwt_extended import decode_token
+from models import db
+from utils.movements import record_movement
+from utils.notifier import notifier, role_room, SUBSCRIBABLE_ROOM
+
+MAX_SUBSCRIBE_ROOMS = 100
+
+class NotificationNamespace(Namespace):
+    """
+    Default namespace for change notifications, delivered by room
+
+    Clients connect with ``auth={'token': <JWT>}`` and are placed in the
+    room of their role (``role:admin`` or ``role:viewer``), which carries
+    the audit records to admins only. They then emit ``subscribe`` and
+    ``unsubscribe`` with ``{'rooms': [...]}`` to choose the changes they
+    receive as inventory_delta frames: ``resource:item``,
+    ``resource:transaction``, ``item:<id>`` or ``category:<name>``.
+    """
+
+    def on_connect(self, auth=None):
+        token = (auth or {}).get('token')
+        if not token:
+            raise ConnectionRefusedError('authorization_required')
+
+        try:
+            claims = decode_token(token)
+        except Exception:
+            raise ConnectionRefusedError('invalid_token')
+
+        if claims.get('role') not in ['admin', 'viewer']:
+            raise ConnectionRefusedError('access_denied')
+
+        join_room(role_room(claims['role']))
+        notifier.connect(request.sid)
+
+    def on_disconnect(self, reason=None):
+        notifier.disconnect(request.sid)
+
+    def on_subscribe(self, data):
+        """Join rooms; the ack lists the rooms joined"""
+        rooms, error = self._rooms(data)
+        if error:
+            return {'ok': False, 'message': error}
+        for room in rooms:
+            join_room(room)
+        notifier.subscribe(request.sid, rooms)
+        return {'ok': True, 'rooms': rooms}
+
+    def on_unsubscribe(self, data):
+        """Leave rooms; the ack lists the rooms left"""
+        rooms, error = self._rooms(data)
+        if error:
+            return {'ok': False, 'message': error}
+        for room in rooms:
+            leave_room(room)
+        notifier.unsubscribe(request.sid, rooms)
+        return {'ok': True, 'rooms': rooms}
+
+    def _rooms(self, data):
+        rooms = data.get('rooms') if isinstance(data, dict) else None
+        if not isinstance(rooms, list) or not rooms:
+            return None, 'rooms must be a non-empty list'
+        if len(rooms) > MAX_SUBSCRIBE_ROOMS:
+            return None, f'Too many rooms. Maximum is {MAX_SUBSCRIBE_ROOMS}'
+        invalid = [room for room in rooms if not isinstance(room, str) or not SUBSCRIBABLE_ROOM.match(room)]
+        if invalid:
+            return None, f'Invalid rooms: {invalid}'
+        return list(dict.fromkeys(rooms)), None
+
+class StockNamespace(Namespace):
+    """
+    Authenticated Socket.IO namespace for submitting stock movements
+
+    Clients connect with ``auth={'token': <JWT>}`` and emit ``movement``
+    events with the same payload as POST /api/transactions. The result is
+    returned in the acknowledgement, so a scanner can post movement after
+    movement over one open connection without per-request HTTP overhead.
+    """
+
+    def __init__(self, namespace):
+        super().__init__(namespace)
+        self.sessions = {}
+
+    def on_connect(self, auth=None):
+        token = (auth or {}).get('token')
+        if not token:
+            raise ConnectionRefusedError('authorization_required')
+
+        try:
+            claims = decode_token(token)
+        except Exception:
+            raise ConnectionRefusedError('invalid_token')
+
+        if claims.get('role') != 'admin':
+            raise ConnectionRefusedError('admin_required')
+
+        self.sessions[request.sid] = claims
+
+    def on_disconnect(self, reason=None):
+        self.sessions.pop(request.sid, None)
+
+    def on_movement(self, data):
+        """Apply one IN/OUT movement and return the result as the ack"""
+        claims = self.sessions.get(request.sid)
+        if claims is None:
+            return {'ok': False, 'status': 401, 'message': 'Authorization token is missing'}
+
+        if claims.get('exp') and claims['exp'] < time.time():
+            return {'ok': False, 'status': 401, 'message': 'Token has expired'}
+
+        try:
+            transaction, error, status = record_movement(data, claims['sub'])
+        except Exception as e:
+            # Always answer, or the scanner waits for an ack until it times out
+            db.session.rollback()
+            print(f"✗ Socket movement failed: {e}")
+            return {'ok': False, 'status': 500, 'message': 'Internal server error'}
+        if error:
+            return {'ok': False, 'status': status, 'message': error}
+
+        return {'ok': True, 'status': status, 'transaction': transaction}
@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from utils.security import viewer_or_admin_required
+from utils.sync import read_changes, SYNC_RESOURCES, SYNC_PAGE_SIZE, SYNC_MAX_PAGE_SIZE
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/sync', methods=['GET'])
+@jwt_required()
+@viewer_or_admin_required
+def sync_changes():
+    """Get the items and transactions created, updated or deleted since a change sequence number"""
+    since = request.args.get('since', type=int)
+    cursor = request.args.get('cursor')
+    limit = max(1, min(request.args.get('limit', SYNC_PAGE_SIZE, type=int), SYNC_MAX_PAGE_SIZE))
+    resources = request.args.get('resources')
+    resources = resources.split(',') if resources else SYNC_RESOURCES
+    
+    if any(resource not in SYNC_RESOURCES for resource in resources):
+        return jsonify({'message': f"Invalid resources. Use {', '.join(SYNC_RESOURCES)}"}), 400
+    
+    if since is None and request.args.get('since'):
+        return jsonify({'message': 'since must be an integer change sequence number'}), 400
+    
+    try:
+        page = read_changes(since, cursor, list(dict.fromkeys(resources)), limit)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify(page), 200
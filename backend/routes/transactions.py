@@ -1,29 +1,97 @@
+from datetime import timedelta
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import contains_eager
 from models import db, Item, Transaction
 from utils.security import admin_required, viewer_or_admin_required
+from utils.idempotency import idempotent
+from utils.ledger_archive import hot_ledger, archived_ledger, archived_periods
+from utils.pagination import page_size, parse_date_range, keyset_page, decode_cursor, encode_cursor
+from utils.snapshots import maybe_snapshot
+from utils.daily_movements import add_daily_movements
+from utils.analytics_cache import bump_versions
+from utils.inventory_stats import StatsDelta, recent_transactions
+from utils.low_stock import LowStockChanges
+from utils.movements import record_movement, delete_movement
+from utils.notifier import notifier
+from utils.sync import next_change_seq
+from utils.stock import validate_movement, apply_stock_change, plan_movements, stock_state_before
 
 transactions_bp = Blueprint('transactions', __name__)
 
+BATCH_MODES = ['atomic', 'best_effort']
+MAX_BATCH_LINES = 1000
+
 @transactions_bp.route('/transactions', methods=['GET'])
 @jwt_required()
 @viewer_or_admin_required
 def get_transactions():
-    """Get all transactions with optional filtering"""
+    """Get transactions newest first with optional filtering and cursor paging"""
     item_id = request.args.get('item_id', type=int)
     transaction_type = request.args.get('type')
-    limit = request.args.get('limit', 100, type=int)
+    limit = page_size(request.args.get('limit', type=int))
+    
+    try:
+        date_from, date_to = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    query = Transaction.query
+    cursor = request.args.get('cursor')
     
-    if item_id:
-        query = query.filter_by(item_id=item_id)
+    def fetch_page(ledger, limit):
+        # Load item names in the same query instead of one SELECT per row;
+        # an explicit join, since archive entities only match Transaction by
+        # column name
+        query = db.session.query(ledger).outerjoin(Item, Item.id == ledger.item_id).options(
+            contains_eager(ledger.item)
+        )
+        
+        if item_id:
+            query = query.filter(ledger.item_id == item_id)
+        
+        if transaction_type:
+            query = query.filter(ledger.transaction_type == transaction_type)
+        
+        if date_from:
+            query = query.filter(ledger.created_at >= date_from)
+        
+        if date_to:
+            query = query.filter(ledger.created_at < date_to)
+        
+        transactions, next_cursor = keyset_page(query, ledger.created_at, ledger.id, cursor, limit)
+        last = (transactions[-1].created_at, transactions[-1].id) if transactions else None
+        return [t.to_dict() for t in transactions], next_cursor, last
     
-    if transaction_type:
-        query = query.filter_by(transaction_type=transaction_type)
+    try:
+        # Hot rows are always newer than archived ones, so a full page from
+        # the hot table never needs the archives
+        page, next_cursor, last = fetch_page(hot_ledger(), limit)
+        
+        # Archived years are disjoint: read them newest first, one at a time,
+        # skipping the years the cursor has already passed
+        upper = date_to
+        if cursor:
+            passed = decode_cursor(cursor)[0] + timedelta(microseconds=1)
+            upper = min(upper, passed) if upper else passed
+        periods = archived_periods(date_from, upper)[::-1] if next_cursor is None else []
+        for period in periods:
+            if len(page) == limit:
+                # Full at a year boundary; older years may hold the rest
+                next_cursor = encode_cursor(*last)
+                break
+            with archived_ledger(period) as ledger:
+                rows, next_cursor, last_row = fetch_page(ledger, limit - len(page))
+            page.extend(rows)
+            last = last_row or last
+            if next_cursor:
+                break
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    transactions = query.order_by(Transaction.created_at.desc()).limit(limit).all()
-    return jsonify([t.to_dict() for t in transactions]), 200
+    response = jsonify(page)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
 
 @transactions_bp.route('/transactions/<int:transaction_id>', methods=['GET'])
 @jwt_required()
@@ -36,53 +104,144 @@ def get_transaction(transaction_id):
 @transactions_bp.route('/transactions', methods=['POST'])
 @jwt_required()
 @admin_required
+@idempotent
 def create_transaction():
     """Create new transaction (IN or OUT)"""
-    data = request.get_json()
+    transaction, error, status = record_movement(request.get_json(), get_jwt_identity())
+    if error:
+        return jsonify({'message': error}), status
+    
+    return jsonify(transaction), status
+
+@transactions_bp.route('/transactions/<int:transaction_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def delete_transaction(transaction_id):
+    """Delete transaction and reverse its stock movement (admin only)"""
+    _, error, status = delete_movement(transaction_id)
+    if error:
+        return jsonify({'message': error}), status
+    
+    return jsonify({'message': 'Transaction deleted successfully'}), 200
+
+@transactions_bp.route('/transactions/batch', methods=['POST'])
+@jwt_required()
+@admin_required
+@idempotent
+def create_transaction_batch():
+    """Post many IN/OUT lines with one stock update per item and a single commit"""
+    data = request.get_json() or {}
     current_user = get_jwt_identity()
+    lines = data.get('lines')
+    mode = data.get('mode', 'atomic')
     
-    # Validate required fields
-    required = ['item_id', 'transaction_type', 'quantity']
-    if not all(field in data for field in required):
-        return jsonify({'message': 'Missing required fields'}), 400
+    if mode not in BATCH_MODES:
+        return jsonify({'message': 'Invalid mode. Use atomic or best_effort'}), 400
     
-    if data['transaction_type'] not in ['IN', 'OUT']:
-        return jsonify({'message': 'Invalid transaction type. Use IN or OUT'}), 400
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'message': 'No lines to post'}), 400
     
-    # Get item
-    item = Item.query.get_or_404(data['item_id'])
+    if len(lines) > MAX_BATCH_LINES:
+        return jsonify({'message': f'Too many lines. Maximum is {MAX_BATCH_LINES}'}), 400
     
-    # Check if sufficient stock for OUT transaction
-    if data['transaction_type'] == 'OUT' and item.quantity < data['quantity']:
-        return jsonify({'message': 'Insufficient stock'}), 400
+    errors = {}
+    for index, line in enumerate(lines):
+        error = validate_movement(line)
+        if error:
+            errors[index] = error
+    valid = {index: line for index, line in enumerate(lines) if index not in errors}
     
-    # Create transaction
-    transaction = Transaction(
-        item_id=data['item_id'],
-        transaction_type=data['transaction_type'],
-        quantity=data['quantity'],
-        notes=data.get('notes', ''),
-        created_by=current_user
-    )
+    # Load every referenced item once; the items are also reused by
+    # Transaction.to_dict without further queries
+    item_ids = {line['item_id'] for line in valid.values()}
+    items = Item.query.filter(Item.id.in_(item_ids)).all() if item_ids else []
+    stock = {item.id: item.quantity for item in items}
+    
+    plan_errors, plans = plan_movements(valid, stock)
+    errors.update(plan_errors)
+    
+    if errors and mode == 'atomic':
+        return jsonify(_batch_response(lines, errors, {}, mode)), 400
     
-    # Update item quantity
-    if data['transaction_type'] == 'IN':
-        item.quantity += data['quantity']
-    else:
-        item.quantity -= data['quantity']
+    # One conditional UPDATE per item; a miss means another worker took
+    # the stock between our read and this write
+    accepted = []
+    stats = StatsDelta()
+    low_stock_changes = LowStockChanges()
+    seq = next_change_seq()
+    for item_id, plan in plans.items():
+        indexes = plan['indexes']
+        if not indexes:
+            continue
+        updated = apply_stock_change(item_id, plan['delta'], required=plan['required'], change_seq=seq)
+        if updated is not None:
+            before = stock_state_before(updated, plan['delta'])
+            stats.change(before, tuple(updated))
+            low_stock_changes.change(item_id, before, tuple(updated))
+            accepted.extend(indexes)
+            continue
+        if mode == 'atomic':
+            db.session.rollback()
+            for index in indexes:
+                errors[index] = 'Insufficient stock'
+            return jsonify(_batch_response(lines, errors, {}, mode)), 400
+        for index in indexes:
+            errors[index] = 'Insufficient stock'
     
-    db.session.add(transaction)
+    created = {}
+    for index in sorted(accepted):
+        line = lines[index]
+        created[index] = Transaction(
+            item_id=line['item_id'],
+            transaction_type=line['transaction_type'],
+            quantity=line['quantity'],
+            notes=line.get('notes', ''),
+            created_by=current_user,
+            change_seq=seq
+        )
+    db.session.add_all(created.values())
+    db.session.flush()
+    if created:
+        ids = [t.id for t in created.values()]
+        maybe_snapshot(min(ids), max(ids))
+        add_daily_movements(created.values())
+        stats.apply()
+        low_stock_changes.resolve()
+        versions = bump_versions('items', 'transactions')
+    
+    # Serialize before committing so the response doesn't reload every row
+    response = _batch_response(lines, errors, created, mode)
+    changed = [(t.id, t.item_id) for t in created.values()]
     db.session.commit()
     
-    return jsonify(transaction.to_dict()), 201
+    if not created:
+        return jsonify(response), 400
+    
+    recent_transactions.push(
+        [result['transaction'] for result in response['results'] if result['status'] == 'created'],
+        versions
+    )
+    low_stock_changes.publish(versions)
+    categories = {item.id: item.category for item in items}
+    for transaction_id, item_id in changed:
+        notifier.notify('transaction', 'created', transaction_id, item_id, [categories[item_id]])
+        notifier.notify('item', 'updated', item_id, categories=[categories[item_id]])
+    return jsonify(response), 201
 
-@transactions_bp.route('/transactions/<int:transaction_id>', methods=['DELETE'])
-@jwt_required()
-@admin_required
-def delete_transaction(transaction_id):
-    """Delete transaction (admin only)"""
-    transaction = Transaction.query.get_or_404(transaction_id)
-    db.session.delete(transaction)
-    db.session.commit()
+def _batch_response(lines, errors, created, mode):
+    """Build the per-line result list of a batch posting"""
+    results = []
+    for index in range(len(lines)):
+        if index in created:
+            results.append({'index': index, 'status': 'created', 'transaction': created[index].to_dict()})
+        elif index in errors:
+            results.append({'index': index, 'status': 'failed', 'message': errors[index]})
+        else:
+            results.append({'index': index, 'status': 'not_applied'})
     
-    return jsonify({'message': 'Transaction deleted successfully'}), 200
\ No newline at end of file
+    return {
+        'mode': mode,
+        'created': len(created),
+        'failed': len(errors),
+        'results': results
+    }
@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The app reads its configuration at import time
+DATA_DIR = tempfile.mkdtemp(prefix='invguard-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(DATA_DIR, 'inventory.db')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret-key-' + 'x' * 32)
+os.environ['BACKGROUND_TASKS'] = 'false'
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@contextmanager
+def count_queries(app):
+    """Count the SQL statements executed inside the block"""
+    from models import db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def create_item(client, headers, sku, quantity, **fields):
+    """Create an item through the API and return its JSON"""
+    payload = {'name': f'Item {sku}', 'sku': sku, 'category': 'Tests', 'quantity': quantity, 'price': 1.0}
+    payload.update(fields)
+    response = client.post('/api/items', json=payload, headers=headers)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()
+
+def login(client, username, password):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+@pytest.fixture
+def admin_headers(client):
+    return login(client, 'admin', 'admin')
+
+@pytest.fixture
+def viewer_headers(client):
+    return login(client, 'viewer', 'viewer123')
@@ -0,0 +1,97 @@
+import pytest
+import threading
+import time
+from conftest import create_item
+from sqlalchemy import text
+from models import db, Item
+from utils.analytics_cache import AnalyticsCache, read_snapshot
+
+def _stats(client, headers):
+    return client.get('/api/analytics/cache-stats', headers=headers).get_json()
+
+def test_version_bump_invalidates_cached_results(client, admin_headers):
+    item = create_item(client, admin_headers, 'CACHE-TOP', 1000, price=1000000.0)
+    url = '/api/analytics/top-items?probe=cache-invalidation'
+
+    first = client.get(url, headers=admin_headers).get_json()
+    before = _stats(client, admin_headers)
+    assert client.get(url, headers=admin_headers).get_json() == first
+    after = _stats(client, admin_headers)
+    assert (after['hits'], after['misses']) == (before['hits'] + 1, before['misses'])
+    assert first[0]['id'] == item['id']
+
+    client.put(f"/api/items/{item['id']}", json={'price': 2000000.0}, headers=admin_headers)
+    refreshed = client.get(url, headers=admin_headers).get_json()
+    assert _stats(client, admin_headers)['misses'] == after['misses'] + 1
+    assert refreshed[0]['total_value'] == 2 * first[0]['total_value']
+
+def test_concurrent_misses_compute_once():
+    cache = AnalyticsCache(max_size=4, ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    def lookup():
+        results.append(cache.get_or_compute('key', compute))
+
+    leader = threading.Thread(target=lookup)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lookup) for _ in range(7)]
+    for thread in followers:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()['coalesced'] < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['result'] * 8
+    assert cache.stats()['coalesced'] == 7
+    assert cache.get_or_compute('key', compute) == 'result'
+    assert len(calls) == 1
+
+def test_uncacheable_results_are_recomputed():
+    cache = AnalyticsCache(max_size=4, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (400, b'{}', 'application/json')
+
+    for _ in range(2):
+        cache.get_or_compute('key', compute, cacheable=lambda value: value[0] == 200)
+    assert len(calls) == 2
+
+def test_read_snapshot_holds_one_transaction(app, client, admin_headers):
+    item = create_item(client, admin_headers, 'CACHE-SNAPSHOT', 4)
+    with app.app_context():
+        in_transaction = lambda: db.session.connection().connection.driver_connection.in_transaction
+        with read_snapshot():
+            assert db.session.get(Item, item['id']).quantity == 4
+            assert in_transaction()
+        assert not in_transaction()
+
+        db.session.execute(text('UPDATE items SET quantity = 9 WHERE id = :id'), {'id': item['id']})
+        with pytest.raises(RuntimeError):
+            with read_snapshot():
+                pass
+        db.session.rollback()
+        assert db.session.get(Item, item['id'], populate_existing=True).quantity == 4
+
+def test_bundle_sections_match_the_single_endpoints(client, admin_headers):
+    create_item(client, admin_headers, 'CACHE-BUNDLE', 2)
+    bundle = client.get('/api/analytics/bundle?sections=low-stock,category-summary,top-items,dashboard',
+                        headers=admin_headers).get_json()
+    assert sorted(bundle) == ['category-summary', 'dashboard', 'low-stock', 'top-items']
+    for name, section in bundle.items():
+        assert client.get(f'/api/analytics/{name}', headers=admin_headers).get_json() == section
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime, timedelta
+from conftest import count_queries, create_item
+from models import db, Audit
+from utils.audit_compact import compact_item_audit_changes
+
+def _pages(client, headers, url):
+    """Follow X-Next-Cursor to the end; returns (entries, number of pages)"""
+    entries, pages, cursor = [], 0, None
+    while True:
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200
+        entries.extend(response.get_json())
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return entries, pages
+
+def test_audit_log_pages_newest_first_with_filters(app, client, admin_headers):
+    item_id = create_item(client, admin_headers, 'AUDIT-PAGE', 1)['id']
+    for price in range(2, 7):
+        client.put(f'/api/items/{item_id}', json={'price': float(price)}, headers=admin_headers)
+
+    entries, pages = _pages(client, admin_headers, f'/api/audit/resource/Item/{item_id}?limit=2')
+    assert pages == 3
+    assert [entry['action'] for entry in entries] == ['UPDATE'] * 5 + ['CREATE']
+    keys = [(entry['timestamp'], entry['id']) for entry in entries]
+    assert keys == sorted(set(keys), reverse=True)
+    assert {entry['user_name'] for entry in entries} == {'admin'}
+
+    updates, _ = _pages(client, admin_headers,
+                        f'/api/audit?action=update&resource_type=Item&resource_id={item_id}&user=admin&limit=50')
+    assert [entry['id'] for entry in updates] == [entry['id'] for entry in entries[:5]]
+    assert client.get(f'/api/audit?resource_type=Item&resource_id={item_id}&user=viewer',
+                      headers=admin_headers).get_json() == []
+
+def test_audit_page_queries_do_not_grow_with_page_size(app, client, admin_headers):
+    """Usernames are joined into the page, not loaded per record"""
+    item_id = create_item(client, admin_headers, 'AUDIT-QUERIES', 1)['id']
+    for price in range(2, 8):
+        client.put(f'/api/items/{item_id}', json={'price': float(price)}, headers=admin_headers)
+
+    with count_queries(app) as small:
+        assert len(client.get(f'/api/audit/resource/Item/{item_id}?limit=1', headers=admin_headers).get_json()) == 1
+    with count_queries(app) as large:
+        assert len(client.get(f'/api/audit/resource/Item/{item_id}?limit=7', headers=admin_headers).get_json()) == 7
+    assert len(large) == len(small)
+
+def _changes(client, headers, item_id):
+    """Audit changes of an item, oldest first"""
+    entries = client.get(f'/api/audit/resource/Item/{item_id}?limit=50', headers=headers).get_json()
+    return [(entry['action'], entry['changes']) for entry in reversed(entries)]
+
+def test_item_audit_records_hold_only_changed_fields(client, admin_headers):
+    item = create_item(client, admin_headers, 'AUDIT-DIFF', 1, name='Diffed item')
+    client.put(f"/api/items/{item['id']}", json={'name': 'Diffed item', 'price': 2.5}, headers=admin_headers)
+    client.put(f"/api/items/{item['id']}", json={'name': 'Diffed item', 'price': 2.5}, headers=admin_headers)
+    client.put(f"/api/items/{item['id']}", json={'quantity': 5, 'category': 'Diffs'}, headers=admin_headers)
+
+    create, *updates = _changes(client, admin_headers, item['id'])
+    assert create == ('CREATE', {
+        'name': 'Diffed item', 'sku': 'AUDIT-DIFF', 'category': 'Tests', 'quantity': 1,
+        'price': 1.0, 'reorder_level': 10, 'description': ''
+    })
+    assert updates == [
+        ('UPDATE', {'price': [1.0, 2.5]}),
+        ('UPDATE', None),
+        ('UPDATE', {'category': ['Tests', 'Diffs'], 'quantity': [1, 5]}),
+    ]
+
+def test_compaction_turns_snapshots_into_diffs(app):
+    resource_id = 900001
+    snapshot = {'name': 'Legacy', 'sku': 'LEGACY', 'category': 'Old', 'quantity': 3, 'price': 1.0, 'reorder_level': 2}
+    created = dict(snapshot, id=resource_id, description='', created_at='2024-01-01T00:00:00')
+    start = datetime.utcnow() - timedelta(days=1)
+    with app.app_context():
+        db.session.add_all([
+            Audit(action='CREATE', resource_type='Item', resource_id=resource_id, user_id=1,
+                  changes=json.dumps(created), timestamp=start),
+            Audit(action='UPDATE', resource_type='Item', resource_id=resource_id, user_id=1,
+                  changes=json.dumps(dict(snapshot, price=2.0)), timestamp=start + timedelta(minutes=1)),
+            Audit(action='UPDATE', resource_type='Item', resource_id=resource_id, user_id=1,
+                  changes=json.dumps(dict(snapshot, price=2.0, quantity=7)), timestamp=start + timedelta(minutes=2)),
+        ])
+        db.session.commit()
+
+        compact_item_audit_changes(vacuum=False)
+        rows = Audit.query.filter_by(resource_type='Item', resource_id=resource_id).order_by(Audit.timestamp)
+        assert [json.loads(row.changes) for row in rows] == [
+            dict(snapshot, description=''),
+            {'price': [1.0, 2.0]},
+            {'quantity': [3, 7]},
+        ]
+        assert compact_item_audit_changes(vacuum=False)['rewritten'] == 0
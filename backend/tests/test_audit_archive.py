@@ -0,0 +1,68 @@
+import json
+import os
+from datetime import datetime, timedelta
+from conftest import DATA_DIR
+from models import db, Audit
+from utils import audit_archive
+from utils.audit_archive import archive_audit_logs, query_audit_archive
+
+def _counting_codec(monkeypatch):
+    """Count the blocks decompressed by archive queries"""
+    decompressed = []
+    codec = audit_archive._codec
+
+    def counting(compression):
+        compress, decompress = codec(compression)
+        return compress, lambda data: decompressed.append(1) or decompress(data)
+
+    monkeypatch.setattr(audit_archive, '_codec', counting)
+    return decompressed
+
+def test_archive_round_trip_reads_only_matching_blocks(app, client, admin_headers, monkeypatch):
+    monkeypatch.setenv('AUDIT_ARCHIVE_PATH', os.path.join(DATA_DIR, 'audit-archive-test'))
+    monkeypatch.setattr(audit_archive, 'AUDIT_BLOCK_ROWS', 10)
+    start = datetime.utcnow() - timedelta(days=200)
+
+    with app.app_context():
+        # Even resource IDs 2..100, ten per block; one DELETE in the third block
+        db.session.add_all([Audit(
+            action='DELETE' if n == 25 else 'UPDATE', resource_type='Archived', resource_id=2 * n,
+            user_id=1, changes=json.dumps({'price': [n, n + 1]}), timestamp=start + timedelta(minutes=n)
+        ) for n in range(1, 51)])
+        db.session.add(Audit(action='UPDATE', resource_type='Archived', resource_id=102, user_id=1,
+                             changes=None, timestamp=datetime.utcnow()))
+        db.session.commit()
+        expected = [(row.id, row.resource_id, json.loads(row.changes) if row.changes else None)
+                    for row in Audit.query.filter_by(resource_type='Archived').order_by(Audit.timestamp.desc())]
+
+        result = archive_audit_logs(retention_days=90, vacuum=False)
+        assert result['records'] >= 50
+        assert Audit.query.filter_by(resource_type='Archived').count() == 1
+
+    # Paging runs from the database into the archive without gaps
+    entries, cursor = [], None
+    while True:
+        url = '/api/audit?resource_type=Archived&include_archive=true&limit=7'
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''), headers=admin_headers)
+        entries.extend(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert [(entry['id'], entry['resource_id'], entry['changes']) for entry in entries] == expected
+    assert {entry['user_name'] for entry in entries} == {'admin'}
+
+    decompressed = _counting_codec(monkeypatch)
+    with app.app_context():
+        records = query_audit_archive({'resource_type': 'Archived', 'resource_id': 34})
+        assert [record['resource_id'] for record in records] == [34]
+        assert len(decompressed) == 1
+
+        # Inside a block's ID span, but the Bloom filter knows it is absent
+        decompressed.clear()
+        assert query_audit_archive({'resource_type': 'Archived', 'resource_id': 35}) == []
+        assert len(decompressed) == 0
+
+        decompressed.clear()
+        records = query_audit_archive({'resource_type': 'Archived', 'action': 'DELETE'})
+        assert [record['resource_id'] for record in records] == [50]
+        assert len(decompressed) == 1
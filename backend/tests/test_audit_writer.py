@@ -0,0 +1,36 @@
+import threading
+import time
+from utils import audit
+from utils.audit import AuditWriter
+
+def test_stop_returns_when_the_writer_is_stuck(app, monkeypatch):
+    """A full queue behind a hung write is flushed by stop() instead of blocking it"""
+    monkeypatch.setattr(audit, 'AUDIT_SHUTDOWN_TIMEOUT_SECONDS', 0.2)
+    writer = AuditWriter(max_size=2, batch_size=1)
+    release = threading.Event()
+    written = []
+
+    def write(batch):
+        if threading.current_thread().name == 'audit-writer':
+            release.wait(5)
+        written.extend(record['resource_id'] for record in batch)
+        return list(range(len(batch)))
+
+    monkeypatch.setattr(writer, '_write', write)
+    monkeypatch.setattr(writer, '_notify', lambda batch, ids: None)
+    writer.start(app)
+    try:
+        writer.submit({'resource_id': 1})
+        deadline = time.monotonic() + 5
+        while writer.pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.submit({'resource_id': 2})
+        writer.submit({'resource_id': 3})
+        assert writer.pending() == 2
+
+        started = time.monotonic()
+        writer.stop()
+        assert time.monotonic() - started < 2
+        assert written == [2, 3]
+    finally:
+        release.set()
@@ -0,0 +1,49 @@
+from sqlalchemy import func, case
+from conftest import create_item
+from models import db, Transaction, DailyMovement
+
+def _ledger_totals(item_ids):
+    """The daily totals as a GROUP BY over the ledger would compute them"""
+    day = func.date(Transaction.created_at)
+    rows = db.session.query(
+        day, Transaction.item_id,
+        func.sum(case((Transaction.transaction_type == 'IN', Transaction.quantity), else_=0)),
+        func.sum(case((Transaction.transaction_type == 'OUT', Transaction.quantity), else_=0))
+    ).filter(Transaction.item_id.in_(item_ids)).group_by(day, Transaction.item_id)
+    return {(date, item_id): (stock_in, stock_out) for date, item_id, stock_in, stock_out in rows}
+
+def _daily_totals(item_ids):
+    rows = DailyMovement.query.filter(DailyMovement.item_id.in_(item_ids))
+    return {(row.date.isoformat(), row.item_id): (row.stock_in, row.stock_out) for row in rows}
+
+def test_daily_totals_follow_every_write_path(app, client, admin_headers):
+    first = create_item(client, admin_headers, 'DAILY-1', 10)['id']
+    second = create_item(client, admin_headers, 'DAILY-2', 0)['id']
+    removed = create_item(client, admin_headers, 'DAILY-3', 4)['id']
+    item_ids = [first, second, removed]
+
+    response = client.post('/api/transactions', json={
+        'item_id': first, 'transaction_type': 'OUT', 'quantity': 3
+    }, headers=admin_headers)
+    undone = response.get_json()['id']
+    response = client.post('/api/transactions/batch', json={'lines': [
+        {'item_id': second, 'transaction_type': 'IN', 'quantity': 9},
+        {'item_id': first, 'transaction_type': 'IN', 'quantity': 2},
+        {'item_id': second, 'transaction_type': 'OUT', 'quantity': 4},
+        {'item_id': removed, 'transaction_type': 'OUT', 'quantity': 1},
+    ]}, headers=admin_headers)
+    assert response.status_code == 201
+    client.put(f'/api/items/{second}', json={'quantity': 1}, headers=admin_headers)
+
+    with app.app_context():
+        totals = _daily_totals(item_ids)
+        assert totals == _ledger_totals(item_ids)
+        assert sum(stock_out for _, stock_out in totals.values()) == 3 + 4 + 1 + 4
+
+    assert client.delete(f'/api/transactions/{undone}', headers=admin_headers).status_code == 200
+    assert client.delete(f'/api/items/{removed}', headers=admin_headers).status_code == 200
+
+    with app.app_context():
+        totals = _daily_totals(item_ids)
+        assert totals == _ledger_totals(item_ids)
+        assert not any(item_id == removed for _, item_id in totals)
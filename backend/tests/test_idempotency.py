@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from conftest import create_item
+from models import db, IdempotencyKey
+from utils import idempotency
+
+def _post(client, headers, key, payload):
+    return client.post('/api/transactions', json=payload, headers={**headers, 'Idempotency-Key': key})
+
+def _quantity(client, headers, item_id):
+    return client.get(f'/api/items/{item_id}', headers=headers).get_json()['quantity']
+
+def test_retry_replays_the_stored_response(client, admin_headers, monkeypatch):
+    item = create_item(client, admin_headers, 'IDEM-REPLAY', 10)
+    payload = {'item_id': item['id'], 'transaction_type': 'OUT', 'quantity': 3}
+
+    first = _post(client, admin_headers, 'replay-1', payload)
+    assert first.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+
+    retry = _post(client, admin_headers, 'replay-1', payload)
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+
+    # Another worker has an empty cache and answers from the table
+    monkeypatch.setattr(idempotency, '_cache', idempotency.ResponseCache(10, 60))
+    retry = _post(client, admin_headers, 'replay-1', payload)
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+
+    assert _quantity(client, admin_headers, item['id']) == 7
+
+def test_reused_key_with_a_different_body_is_rejected(client, admin_headers):
+    item = create_item(client, admin_headers, 'IDEM-MISMATCH', 10)
+    payload = {'item_id': item['id'], 'transaction_type': 'OUT', 'quantity': 3}
+    assert _post(client, admin_headers, 'mismatch-1', payload).status_code == 201
+
+    response = _post(client, admin_headers, 'mismatch-1', {**payload, 'quantity': 4})
+    assert response.status_code == 422
+    assert _quantity(client, admin_headers, item['id']) == 7
+
+def test_failed_request_releases_its_key(client, admin_headers):
+    item = create_item(client, admin_headers, 'IDEM-RELEASE', 1)
+    payload = {'item_id': item['id'], 'transaction_type': 'OUT', 'quantity': 3}
+
+    response = _post(client, admin_headers, 'release-1', payload)
+    assert response.status_code == 400
+    assert 'Idempotent-Replayed' not in response.headers
+
+    client.post('/api/transactions', json={
+        'item_id': item['id'], 'transaction_type': 'IN', 'quantity': 5
+    }, headers=admin_headers)
+    response = _post(client, admin_headers, 'release-1', payload)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert _quantity(client, admin_headers, item['id']) == 3
+
+def test_prune_drops_expired_keys_and_caps_the_table(app, monkeypatch):
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY_MAX_KEYS', 3)
+    expired = datetime.utcnow() - timedelta(seconds=idempotency.IDEMPOTENCY_TTL_SECONDS + 60)
+    with app.app_context():
+        db.session.add_all(
+            [IdempotencyKey(username='prune', key=f'old-{n}', fingerprint='x', created_at=expired) for n in range(2)]
+            + [IdempotencyKey(username='prune', key=f'new-{n}', fingerprint='x') for n in range(5)]
+        )
+        db.session.commit()
+
+        idempotency._prune()
+        db.session.commit()
+
+        kept = [record.key for record in IdempotencyKey.query.order_by(IdempotencyKey.id)]
+        assert kept == ['new-2', 'new-3', 'new-4']
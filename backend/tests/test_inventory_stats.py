@@ -0,0 +1,32 @@
+import threading
+from utils.inventory_stats import rebuild_inventory_stats
+
+def test_concurrent_item_edits_keep_counters_exact(app, client, admin_headers):
+    """Counter deltas start from the state each edit actually replaced"""
+    response = client.post('/api/items', json={
+        'name': 'Edited item', 'sku': 'EDIT-001', 'category': 'Edits',
+        'quantity': 10, 'price': 1.0, 'reorder_level': 20
+    }, headers=admin_headers)
+    item_id = response.get_json()['id']
+    errors = []
+
+    def edit(worker):
+        edit_client = app.test_client()
+        for step in range(25):
+            response = edit_client.put(f'/api/items/{item_id}', json={
+                'quantity': worker * 10 + step,
+                'price': float(worker + 1),
+                'category': f'Edits {worker % 2}'
+            }, headers=admin_headers)
+            if response.status_code != 200:
+                errors.append(response.get_data(as_text=True))
+
+    threads = [threading.Thread(target=edit, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        assert rebuild_inventory_stats() == {}
@@ -0,0 +1,33 @@
+import pytest
+
+@pytest.mark.parametrize('quantity', ['5', -1, 2.5, True, None])
+def test_create_item_rejects_invalid_quantity(client, admin_headers, quantity):
+    response = client.post('/api/items', json={
+        'name': 'Invalid item', 'sku': 'INVALID-QTY', 'category': 'Validation',
+        'quantity': quantity, 'price': 1.0
+    }, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Quantity must be a non-negative integer'
+    assert client.get('/api/items?sku=INVALID-QTY', headers=admin_headers).get_json() == []
+
+def test_update_item_posts_quantity_change_to_the_ledger(client, admin_headers):
+    response = client.post('/api/items', json={
+        'name': 'Adjusted item', 'sku': 'ADJUST-001', 'category': 'Adjustments',
+        'quantity': 10, 'price': 1.0
+    }, headers=admin_headers)
+    item_id = response.get_json()['id']
+
+    for quantity in [4, 4, 12]:
+        response = client.put(f'/api/items/{item_id}', json={'quantity': quantity}, headers=admin_headers)
+        assert response.status_code == 200
+    response = client.put(f'/api/items/{item_id}', json={'quantity': '7'}, headers=admin_headers)
+    assert response.status_code == 400
+
+    ledger = client.get(f'/api/transactions?item_id={item_id}', headers=admin_headers).get_json()
+    movements = sorted((t['id'], t['transaction_type'], t['quantity'], t['notes']) for t in ledger)
+    assert [movement[1:] for movement in movements] == [
+        ('IN', 10, 'Opening balance'),
+        ('OUT', 6, 'Stock adjustment'),
+        ('IN', 8, 'Stock adjustment'),
+    ]
+    assert client.get(f'/api/items/{item_id}', headers=admin_headers).get_json()['quantity'] == 12
@@ -0,0 +1,62 @@
+from flask_jwt_extended import create_access_token
+from conftest import create_item
+
+def notification_client(app, role='admin'):
+    with app.app_context():
+        token = create_access_token(identity=role, additional_claims={'role': role})
+    return app.socketio.test_client(app, auth={'token': token})
+
+def _move(client, headers, item_id, transaction_type, quantity):
+    response = client.post('/api/transactions', json={
+        'item_id': item_id, 'transaction_type': transaction_type, 'quantity': quantity
+    }, headers=headers)
+    assert response.status_code == 201
+
+def _crossings(socket_client):
+    return [(event['args'][0]['item_id'], event['args'][0]['state'], event['args'][0]['quantity'])
+            for event in socket_client.get_received() if event['name'] == 'stock_threshold']
+
+def _low_ids(client, headers):
+    return {entry['id'] for entry in client.get('/api/analytics/low-stock', headers=headers).get_json()}
+
+def test_threshold_crossings_are_pushed_once(app, client, admin_headers):
+    item_id = create_item(client, admin_headers, 'LOW-CROSS', 10, reorder_level=5)['id']
+    socket_client = notification_client(app)
+    assert socket_client.emit('subscribe', {'rooms': [f'item:{item_id}']}, callback=True)['ok']
+    socket_client.get_received()
+
+    _move(client, admin_headers, item_id, 'OUT', 5)
+    assert _crossings(socket_client) == [(item_id, 'low', 5)]
+    assert item_id in _low_ids(client, admin_headers)
+
+    # Still low: no new event
+    _move(client, admin_headers, item_id, 'OUT', 1)
+    assert _crossings(socket_client) == []
+
+    _move(client, admin_headers, item_id, 'IN', 3)
+    assert _crossings(socket_client) == [(item_id, 'ok', 7)]
+    assert item_id not in _low_ids(client, admin_headers)
+
+    # Raising the reorder level crosses without any movement
+    client.put(f'/api/items/{item_id}', json={'reorder_level': 8}, headers=admin_headers)
+    assert _crossings(socket_client) == [(item_id, 'low', 7)]
+    socket_client.disconnect()
+
+def test_batch_reports_each_item_crossing(app, client, admin_headers):
+    first = create_item(client, admin_headers, 'LOW-BATCH-1', 6, reorder_level=5)['id']
+    second = create_item(client, admin_headers, 'LOW-BATCH-2', 2, reorder_level=5)['id']
+    socket_client = notification_client(app)
+    socket_client.emit('subscribe', {'rooms': ['category:Tests']}, callback=True)
+    socket_client.get_received()
+
+    response = client.post('/api/transactions/batch', json={'lines': [
+        {'item_id': first, 'transaction_type': 'OUT', 'quantity': 4},
+        {'item_id': second, 'transaction_type': 'IN', 'quantity': 2},
+        {'item_id': second, 'transaction_type': 'IN', 'quantity': 2},
+    ]}, headers=admin_headers)
+    assert response.status_code == 201
+
+    assert sorted(_crossings(socket_client)) == sorted([(first, 'low', 2), (second, 'ok', 6)])
+    low = _low_ids(client, admin_headers)
+    assert first in low and second not in low
+    socket_client.disconnect()
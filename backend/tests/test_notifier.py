@@ -0,0 +1,61 @@
+import pytest
+from utils.notifier import ChangeNotifier, NOTIFY_EVENT
+
+class RecordingSocketIO:
+    def __init__(self):
+        self.frames = []
+
+    def emit(self, event, data, to=None, ignore_queue=False):
+        assert event == NOTIFY_EVENT
+        self.frames.append((to, data))
+
+def recording_notifier(max_rate=2):
+    """A notifier flushed by hand instead of by its thread"""
+    notifier = ChangeNotifier(window_ms=0, client_max_rate=max_rate)
+    notifier._socketio = RecordingSocketIO()
+    return notifier, notifier._socketio.frames
+
+def test_window_changes_merge_into_one_frame():
+    notifier, frames = recording_notifier()
+    notifier.connect('client')
+    notifier.subscribe('client', ['resource:item'])
+
+    notifier.notify('item', 'created', 1)
+    notifier.notify('item', 'updated', 1)
+    notifier.notify('item', 'updated', 2)
+    notifier.notify('item', 'updated', 2)
+    notifier.notify('item', 'updated', 3)
+    notifier.notify('item', 'deleted', 3)
+    notifier.flush(now=100.0)
+
+    assert frames == [('client', {'seq': 1, 'events': 6, 'changes': {
+        'item': {'created': [1], 'updated': [2], 'deleted': [3]}
+    }})]
+    assert notifier.stats()['frames_out'] == 1
+
+def test_rate_limited_client_gets_missed_changes_merged():
+    notifier, frames = recording_notifier(max_rate=2)
+    notifier.connect('client')
+    notifier.subscribe('client', ['resource:item'])
+    notifier.notify('item', 'updated', 1)
+    notifier.flush(now=100.0)
+    frames.clear()
+
+    notifier.notify('item', 'updated', 4)
+    assert notifier.flush(now=100.1) == pytest.approx(0.4)
+    notifier.notify('item', 'created', 5)
+    notifier.notify('item', 'deleted', 4)
+    assert notifier.flush(now=100.3) == pytest.approx(0.2)
+    assert frames == []
+
+    assert notifier.flush(now=100.5) is None
+    assert frames == [('client', {'seq': 3, 'events': 3, 'changes': {
+        'item': {'created': [5], 'deleted': [4]}
+    }})]
+
+def test_idle_windows_send_nothing():
+    notifier, frames = recording_notifier()
+    notifier.connect('client')
+    notifier.subscribe('client', ['resource:item'])
+    assert notifier.flush(now=100.0) is None
+    assert frames == []
@@ -0,0 +1,30 @@
+import os
+from conftest import DATA_DIR
+from utils.reconcile import reconcile_stock
+
+def _discrepant_items(work_dir):
+    result = reconcile_stock(os.environ['DATABASE_PATH'], work_dir, sample_size=100000)
+    return {row['item_id'] for row in result['sample']}
+
+def test_reconcile_after_deleting_the_newest_transaction(client, admin_headers):
+    """A movement posted after the newest one was deleted never reuses its ID"""
+    work_dir = os.path.join(DATA_DIR, 'reconcile-reuse')
+    response = client.post('/api/items', json={
+        'name': 'Reconciled item', 'sku': 'RECON-001', 'category': 'Reconcile',
+        'quantity': 0, 'price': 1.0, 'reorder_level': 0
+    }, headers=admin_headers)
+    item_id = response.get_json()['id']
+
+    response = client.post('/api/transactions', json={
+        'item_id': item_id, 'transaction_type': 'IN', 'quantity': 5
+    }, headers=admin_headers)
+    deleted_id = response.get_json()['id']
+    assert item_id not in _discrepant_items(work_dir)
+
+    assert client.delete(f'/api/transactions/{deleted_id}', headers=admin_headers).status_code == 200
+    response = client.post('/api/transactions', json={
+        'item_id': item_id, 'transaction_type': 'IN', 'quantity': 3
+    }, headers=admin_headers)
+    assert response.get_json()['id'] > deleted_id
+
+    assert item_id not in _discrepant_items(work_dir)
@@ -0,0 +1,63 @@
+from flask_jwt_extended import create_access_token
+from conftest import create_item
+from test_notifier import recording_notifier
+
+def notification_client(app, role):
+    with app.app_context():
+        token = create_access_token(identity=role, additional_claims={'role': role})
+    return app.socketio.test_client(app, auth={'token': token})
+
+def _frame_clients(frames):
+    return sorted(sid for sid, _ in frames)
+
+def test_changes_reach_only_subscribed_rooms():
+    notifier, frames = recording_notifier(max_rate=0)
+    for sid, rooms in [('by-item', ['item:5']), ('by-category', ['category:Tools']),
+                       ('by-resource', ['resource:transaction']), ('other', ['item:6'])]:
+        notifier.connect(sid)
+        notifier.subscribe(sid, rooms)
+
+    notifier.notify('transaction', 'created', 10, item_id=5, categories=['Tools'])
+    notifier.flush(now=100.0)
+    assert _frame_clients(frames) == ['by-category', 'by-item', 'by-resource']
+    assert all(frame['changes'] == {'transaction': {'created': [10]}} for _, frame in frames)
+
+    # An item moved between categories reaches subscribers of both
+    frames.clear()
+    notifier.subscribe('other', ['category:Garden'])
+    notifier.notify('item', 'updated', 7, categories=['Tools', 'Garden'])
+    notifier.flush(now=101.0)
+    assert _frame_clients(frames) == ['by-category', 'other']
+
+    frames.clear()
+    notifier.unsubscribe('by-category', ['category:Tools'])
+    notifier.disconnect('other')
+    notifier.notify('item', 'updated', 7, categories=['Tools', 'Garden'])
+    notifier.flush(now=102.0)
+    assert frames == []
+    assert notifier.stats()['rooms'] == 2
+
+def test_subscribe_rejects_unknown_rooms(app):
+    client = notification_client(app, 'viewer')
+    assert client.emit('subscribe', {'rooms': ['role:admin']}, callback=True) == {
+        'ok': False, 'message': "Invalid rooms: ['role:admin']"
+    }
+    assert client.emit('subscribe', {'rooms': []}, callback=True)['ok'] is False
+    assert client.emit('subscribe', {'rooms': ['item:1', 'item:1', 'category:Tools']}, callback=True) == {
+        'ok': True, 'rooms': ['item:1', 'category:Tools']
+    }
+    client.disconnect()
+
+def test_audit_records_go_to_admins_only(app, client, admin_headers):
+    admin = notification_client(app, 'admin')
+    viewer = notification_client(app, 'viewer')
+    admin.get_received()
+    viewer.get_received()
+
+    item = create_item(client, admin_headers, 'ROOMS-AUDIT', 1)
+
+    audit_events = [event for event in admin.get_received() if event['name'] == 'audit_records']
+    assert [record['resource_id'] for event in audit_events for record in event['args'][0]['records']] == [item['id']]
+    assert [event for event in viewer.get_received() if event['name'] == 'audit_records'] == []
+    admin.disconnect()
+    viewer.disconnect()
@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import func
+from conftest import create_item
+from models import db, Transaction, StockSnapshot
+from utils import snapshots
+from utils.snapshots import quantities_as_of
+from utils.stock import signed_quantity
+
+def _move(client, headers, item_id, transaction_type, quantity):
+    response = client.post('/api/transactions', json={
+        'item_id': item_id, 'transaction_type': transaction_type, 'quantity': quantity
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+def test_quantities_as_of_match_a_ledger_replay(app, client, admin_headers, monkeypatch):
+    """Snapshot plus replay window gives what replaying the whole ledger gives"""
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_INTERVAL', 3)
+    with app.app_context():
+        snapshots_before = db.session.query(func.count(func.distinct(StockSnapshot.taken_at))).scalar()
+
+    item_ids = [create_item(client, admin_headers, 'ASOF-1', 5)['id'],
+                create_item(client, admin_headers, 'ASOF-2', 0)['id']]
+    moments = [datetime.utcnow()]
+    posted = []
+    for index, transaction_type, quantity in [
+        (0, 'IN', 4), (1, 'IN', 6), (0, 'OUT', 7), (1, 'OUT', 1),
+        (0, 'IN', 2), (1, 'IN', 3), (0, 'OUT', 1), (1, 'OUT', 2),
+    ]:
+        posted.append(_move(client, admin_headers, item_ids[index], transaction_type, quantity))
+        moments.append(datetime.utcnow())
+    # Deleting a movement rewrites the past, snapshots included
+    assert client.delete(f'/api/transactions/{posted[2]}', headers=admin_headers).status_code == 200
+    moments.append(datetime.utcnow())
+
+    with app.app_context():
+        assert db.session.query(func.count(func.distinct(StockSnapshot.taken_at))).scalar() > snapshots_before
+        ledger = Transaction.query.filter(Transaction.item_id.in_(item_ids)).all()
+        for moment in moments:
+            replayed = {
+                item_id: sum(signed_quantity(t.transaction_type, t.quantity)
+                             for t in ledger if t.item_id == item_id and t.created_at < moment)
+                for item_id in item_ids
+            }
+            quantities = quantities_as_of(moment)
+            assert {item_id: quantities[item_id] for item_id in item_ids} == replayed
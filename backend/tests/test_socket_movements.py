@@ -0,0 +1,25 @@
+import routes.socket_events
+from flask_jwt_extended import create_access_token
+
+def stock_client(app):
+    with app.app_context():
+        token = create_access_token(identity='admin', additional_claims={'role': 'admin'})
+    return app.socketio.test_client(app, namespace='/stock', auth={'token': token})
+
+def test_movement_is_acknowledged(app):
+    client = stock_client(app)
+    ack = client.emit('movement', {'item_id': 1, 'transaction_type': 'IN', 'quantity': 1},
+                      namespace='/stock', callback=True)
+    assert ack['ok'] and ack['status'] == 201
+    assert ack['transaction']['item_id'] == 1
+
+def test_unexpected_error_still_acknowledged(app, monkeypatch):
+    """A failing write answers with an error ack instead of leaving the client waiting"""
+    def fail(data, created_by):
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(routes.socket_events, 'record_movement', fail)
+    client = stock_client(app)
+    ack = client.emit('movement', {'item_id': 1, 'transaction_type': 'IN', 'quantity': 1},
+                      namespace='/stock', callback=True)
+    assert ack == {'ok': False, 'status': 500, 'message': 'Internal server error'}
@@ -0,0 +1,65 @@
+import multiprocessing
+from sqlalchemy import func
+from models import db, Item, Transaction
+from utils.inventory_stats import rebuild_inventory_stats
+from utils.stock import signed_quantity_expr
+
+WORKERS = 4
+REQUESTS_PER_WORKER = 30
+OPENING_STOCK = 60
+
+def _post_movements(item_id, use_batch, barrier, results):
+    """Worker process: hammer one item with OUT movements through its own app instance"""
+    from app import app
+    client = app.test_client()
+    token = client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    line = {'item_id': item_id, 'transaction_type': 'OUT', 'quantity': 1}
+
+    barrier.wait()
+    taken = 0
+    for _ in range(REQUESTS_PER_WORKER):
+        if use_batch:
+            response = client.post('/api/transactions/batch', json={'lines': [line, line]}, headers=headers)
+            if response.status_code == 201:
+                taken += response.get_json()['created']
+        else:
+            response = client.post('/api/transactions', json=line, headers=headers)
+            if response.status_code == 201:
+                taken += 1
+        assert response.status_code in (201, 400), response.get_data(as_text=True)
+    results.put(taken)
+
+def test_concurrent_out_movements_never_oversell(app, client, admin_headers):
+    """Worker processes racing for the same stock take exactly what there is"""
+    response = client.post('/api/items', json={
+        'name': 'Contended item', 'sku': 'STRESS-001', 'category': 'Stress',
+        'quantity': OPENING_STOCK, 'price': 2.5, 'reorder_level': 0
+    }, headers=admin_headers)
+    item_id = response.get_json()['id']
+
+    # Fresh interpreters, like separate gunicorn workers
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(WORKERS)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_post_movements, args=(item_id, index % 2 == 1, barrier, results))
+        for index in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    taken = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    # More was requested than there was; exactly the opening stock went out
+    assert WORKERS * REQUESTS_PER_WORKER > OPENING_STOCK
+    assert sum(taken) == OPENING_STOCK
+
+    with app.app_context():
+        assert db.session.get(Item, item_id).quantity == 0
+        ledger = db.session.query(func.sum(signed_quantity_expr())).filter(Transaction.item_id == item_id).scalar()
+        assert ledger == 0
+        assert Transaction.query.filter_by(item_id=item_id, transaction_type='OUT').count() == OPENING_STOCK
+        assert rebuild_inventory_stats() == {}
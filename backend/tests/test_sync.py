@@ -0,0 +1,74 @@
+from conftest import create_item
+import utils.sync
+
+def _current_seq(client, headers):
+    return client.get('/api/sync?since=0&limit=1', headers=headers).get_json()['seq']
+
+def _move(client, headers, item_id, transaction_type, quantity):
+    response = client.post('/api/transactions', json={
+        'item_id': item_id, 'transaction_type': transaction_type, 'quantity': quantity
+    }, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+def test_cursor_pages_through_every_change_once(client, admin_headers):
+    since = _current_seq(client, admin_headers)
+    item_ids = [create_item(client, admin_headers, f'SYNC-PAGE-{n}', 10)['id'] for n in range(3)]
+    transaction_ids = [_move(client, admin_headers, item_id, 'OUT', 1) for item_id in item_ids]
+
+    items, transactions, pages = [], [], 0
+    page = client.get(f'/api/sync?since={since}&limit=2', headers=admin_headers).get_json()
+    while True:
+        pages += 1
+        items.extend(item['id'] for item in page['items'])
+        transactions.extend(transaction['id'] for transaction in page['transactions'])
+        if page['next_cursor'] is None:
+            break
+        page = client.get(f"/api/sync?cursor={page['next_cursor']}&limit=2", headers=admin_headers).get_json()
+
+    # Each item appears once, with its latest state, although it changed twice
+    assert sorted(items) == item_ids
+    assert sorted(transactions) == sorted(transaction_ids + _opening_ids(client, admin_headers, item_ids))
+    assert pages > 1
+    assert page['seq'] == _current_seq(client, admin_headers)
+
+def _opening_ids(client, headers, item_ids):
+    return [
+        t['id'] for item_id in item_ids
+        for t in client.get(f'/api/transactions?item_id={item_id}', headers=headers).get_json()
+        if t['notes'] == 'Opening balance'
+    ]
+
+def test_page_is_cut_at_the_sequence_read_first(client, admin_headers, monkeypatch):
+    """Writes numbered after the page's sequence wait for the next sync"""
+    since = _current_seq(client, admin_headers)
+    early = create_item(client, admin_headers, 'SYNC-CUT-1', 0)
+    cut = _current_seq(client, admin_headers)
+    late = create_item(client, admin_headers, 'SYNC-CUT-2', 0)
+
+    monkeypatch.setattr(utils.sync, 'current_change_seq', lambda: cut)
+    page = client.get(f'/api/sync?since={since}', headers=admin_headers).get_json()
+    assert page['seq'] == cut
+    assert [item['id'] for item in page['items']] == [early['id']]
+
+    monkeypatch.undo()
+    page = client.get(f"/api/sync?since={page['seq']}", headers=admin_headers).get_json()
+    assert [item['id'] for item in page['items']] == [late['id']]
+
+def test_deletes_leave_tombstones(client, admin_headers):
+    kept = create_item(client, admin_headers, 'SYNC-DEL-1', 10)
+    removed = create_item(client, admin_headers, 'SYNC-DEL-2', 10)
+    removed_movement = _move(client, admin_headers, removed['id'], 'OUT', 2)
+    undone = _move(client, admin_headers, kept['id'], 'OUT', 3)
+    since = _current_seq(client, admin_headers)
+
+    assert client.delete(f'/api/transactions/{undone}', headers=admin_headers).status_code == 200
+    assert client.delete(f"/api/items/{removed['id']}", headers=admin_headers).status_code == 200
+
+    page = client.get(f'/api/sync?since={since}', headers=admin_headers).get_json()
+    assert page['deleted']['item'] == [removed['id']]
+    assert undone in page['deleted']['transaction']
+    assert removed_movement in page['deleted']['transaction']
+    # Deleting the movement put the stock back, so the kept item changed too
+    assert [(item['id'], item['quantity']) for item in page['items']] == [(kept['id'], 10)]
+    assert page['transactions'] == []
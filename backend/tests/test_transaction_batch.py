@@ -0,0 +1,93 @@
+from conftest import count_queries, create_item
+
+def _quantity(client, headers, item_id):
+    return client.get(f'/api/items/{item_id}', headers=headers).get_json()['quantity']
+
+def _ledger_size(client, headers, item_id):
+    return len(client.get(f'/api/transactions?item_id={item_id}', headers=headers).get_json())
+
+def test_atomic_batch_rolls_back_on_one_insufficient_line(client, admin_headers):
+    stocked = create_item(client, admin_headers, 'BATCH-ATOMIC-1', 10)
+    short = create_item(client, admin_headers, 'BATCH-ATOMIC-2', 2)
+
+    response = client.post('/api/transactions/batch', json={'lines': [
+        {'item_id': stocked['id'], 'transaction_type': 'IN', 'quantity': 5},
+        {'item_id': short['id'], 'transaction_type': 'OUT', 'quantity': 3},
+    ]}, headers=admin_headers)
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert (body['mode'], body['created'], body['failed']) == ('atomic', 0, 1)
+    assert body['results'] == [
+        {'index': 0, 'status': 'not_applied'},
+        {'index': 1, 'status': 'failed', 'message': 'Insufficient stock'},
+    ]
+    assert _quantity(client, admin_headers, stocked['id']) == 10
+    assert _quantity(client, admin_headers, short['id']) == 2
+    assert _ledger_size(client, admin_headers, stocked['id']) == 1
+
+def test_best_effort_batch_posts_the_lines_that_fit(client, admin_headers):
+    stocked = create_item(client, admin_headers, 'BATCH-BEST-1', 10)
+    short = create_item(client, admin_headers, 'BATCH-BEST-2', 2)
+
+    response = client.post('/api/transactions/batch', json={'mode': 'best_effort', 'lines': [
+        {'item_id': stocked['id'], 'transaction_type': 'OUT', 'quantity': 4},
+        {'item_id': short['id'], 'transaction_type': 'OUT', 'quantity': 3},
+        {'item_id': short['id'], 'transaction_type': 'OUT', 'quantity': 2},
+    ]}, headers=admin_headers)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (2, 1)
+    assert [result['status'] for result in body['results']] == ['created', 'failed', 'created']
+    assert body['results'][1]['message'] == 'Insufficient stock'
+    assert body['results'][2]['transaction']['quantity'] == 2
+    assert _quantity(client, admin_headers, stocked['id']) == 6
+    assert _quantity(client, admin_headers, short['id']) == 0
+
+def test_batch_aggregates_lines_into_one_update_per_item(app, client, admin_headers):
+    """Lines replay in order per item, then each item is updated once"""
+    first = create_item(client, admin_headers, 'BATCH-AGG-1', 5)
+    second = create_item(client, admin_headers, 'BATCH-AGG-2', 0)
+    lines = [
+        {'item_id': first['id'], 'transaction_type': 'IN', 'quantity': 5},
+        {'item_id': second['id'], 'transaction_type': 'IN', 'quantity': 7},
+        {'item_id': first['id'], 'transaction_type': 'OUT', 'quantity': 8},
+        {'item_id': second['id'], 'transaction_type': 'OUT', 'quantity': 7},
+        {'item_id': first['id'], 'transaction_type': 'OUT', 'quantity': 2},
+    ]
+
+    with count_queries(app) as statements:
+        response = client.post('/api/transactions/batch', json={'lines': lines}, headers=admin_headers)
+
+    assert response.status_code == 201
+    assert response.get_json()['created'] == 5
+    stock_updates = [s for s in statements if s.lstrip().upper().startswith('UPDATE ITEMS')]
+    assert len(stock_updates) == 2
+    assert _quantity(client, admin_headers, first['id']) == 0
+    assert _quantity(client, admin_headers, second['id']) == 0
+    assert _ledger_size(client, admin_headers, first['id']) == 4
+
+def test_batch_reports_validation_errors_by_index(client, admin_headers):
+    item = create_item(client, admin_headers, 'BATCH-INVALID', 10)
+
+    response = client.post('/api/transactions/batch', json={'lines': [
+        {'item_id': item['id'], 'transaction_type': 'IN', 'quantity': 1},
+        {'item_id': str(item['id']), 'transaction_type': 'IN', 'quantity': 1},
+        {'item_id': item['id'], 'quantity': 1},
+        {'item_id': item['id'], 'transaction_type': 'MOVE', 'quantity': 1},
+        {'item_id': item['id'], 'transaction_type': 'OUT', 'quantity': 0},
+        {'item_id': 999999, 'transaction_type': 'IN', 'quantity': 1},
+    ]}, headers=admin_headers)
+
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert results[0] == {'index': 0, 'status': 'not_applied'}
+    assert [result['message'] for result in results[1:]] == [
+        'Item ID must be an integer',
+        'Missing required fields',
+        'Invalid transaction type. Use IN or OUT',
+        'Quantity must be a positive integer',
+        'Resource not found',
+    ]
+    assert _quantity(client, admin_headers, item['id']) == 10
@@ -0,0 +1,71 @@
+from datetime import datetime
+from conftest import count_queries
+from models import db, Transaction
+from utils.ledger_archive import archive_ledger, archived_periods, MAX_ATTACHED_ARCHIVES
+
+def test_listing_query_count_does_not_grow_with_page_size(app, client, admin_headers):
+    """Item names are loaded with the page, not with one query per row"""
+    item_ids = []
+    for index in range(10):
+        response = client.post('/api/items', json={
+            'name': f'Listed item {index}', 'sku': f'LIST-{index:03d}', 'category': 'Listing',
+            'quantity': 100, 'price': 1.0
+        }, headers=admin_headers)
+        item_ids.append(response.get_json()['id'])
+    for round_ in range(6):
+        for item_id in item_ids:
+            response = client.post('/api/transactions', json={
+                'item_id': item_id, 'transaction_type': 'OUT', 'quantity': 1, 'notes': f'round {round_}'
+            }, headers=admin_headers)
+            assert response.status_code == 201
+
+    with count_queries(app) as small:
+        response = client.get('/api/transactions?limit=5', headers=admin_headers)
+    assert len(response.get_json()) == 5
+
+    with count_queries(app) as large:
+        response = client.get('/api/transactions?limit=50', headers=admin_headers)
+    page = response.get_json()
+    assert len(page) == 50
+    assert len({transaction['item_id'] for transaction in page}) == len(item_ids)
+    assert all(transaction['item_name'] for transaction in page)
+
+    assert len(large) == len(small)
+    assert len(large) <= 2, large
+
+def test_listing_pages_through_more_archives_than_can_be_attached(app, client, admin_headers):
+    """Archived years are read one at a time, so any number of them can be listed"""
+    response = client.post('/api/items', json={
+        'name': 'Archived item', 'sku': 'ARCH-001', 'category': 'Archive', 'quantity': 5, 'price': 1.0
+    }, headers=admin_headers)
+    item_id = response.get_json()['id']
+    years = range(2005, 2005 + MAX_ATTACHED_ARCHIVES + 3)
+    with app.app_context():
+        db.session.add_all([
+            Transaction(item_id=item_id, transaction_type='IN', quantity=1, created_by='admin',
+                        created_at=datetime(year, month, 1))
+            for year in years for month in (3, 6, 9)
+        ])
+        db.session.commit()
+        archive_ledger(hot_days=365, vacuum=False)
+        assert len(archived_periods()) >= len(years)
+
+    seen = []
+    cursor = None
+    while True:
+        url = f'/api/transactions?item_id={item_id}&limit=7' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=admin_headers)
+        assert response.status_code == 200, response.get_json()
+        seen.extend(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    # The opening balance, then every archived movement, newest first without gaps or repeats
+    assert len(seen) == 1 + 3 * len(years)
+    assert seen[0]['notes'] == 'Opening balance'
+    keys = [(row['created_at'], row['id']) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert [row['created_at'][:7] for row in seen[1:]] == [
+        f'{year}-{month:02d}' for year in reversed(years) for month in (9, 6, 3)
+    ]
@@ -0,0 +1,78 @@
+from datetime import datetime, time, timedelta
+from conftest import create_item
+from models import db, Item, Transaction
+from utils.daily_movements import add_daily_movements
+
+def _backdate_movements(app, item_id, movements):
+    """Write (created_at, type, quantity) ledger rows the way the write path folds them"""
+    with app.app_context():
+        item = db.session.get(Item, item_id)
+        item.created_at = min(created_at for created_at, _, _ in movements) - timedelta(days=1)
+        rows = [Transaction(item_id=item_id, transaction_type=transaction_type, quantity=quantity,
+                            created_at=created_at, created_by='tests')
+                for created_at, transaction_type, quantity in movements]
+        db.session.add_all(rows)
+        db.session.flush()
+        add_daily_movements(rows)
+        item.quantity += sum(q if t == 'IN' else -q for _, t, q in movements)
+        db.session.commit()
+
+def test_daily_trends_fill_gaps_with_zero_buckets(app, client, admin_headers):
+    item_id = create_item(client, admin_headers, 'TREND-DAY', 0)['id']
+    first_day = datetime.combine(datetime.utcnow().date() - timedelta(days=20), time.min)
+    _backdate_movements(app, item_id, [
+        (first_day + timedelta(days=1, hours=9), 'IN', 5),
+        (first_day + timedelta(days=1, hours=15), 'IN', 1),
+        (first_day + timedelta(days=4, hours=10), 'OUT', 2),
+        (first_day + timedelta(days=8, hours=12), 'IN', 4),
+    ])
+
+    last_day = first_day + timedelta(days=9)
+    response = client.get(
+        f'/api/analytics/stock-trends?item_id={item_id}&window=2'
+        f'&from={first_day.date().isoformat()}&to={last_day.date().isoformat()}',
+        headers=admin_headers
+    )
+    assert response.status_code == 200, response.get_json()
+    buckets = response.get_json()
+
+    assert [bucket['date'] for bucket in buckets] == [
+        (first_day + timedelta(days=n)).date().isoformat() for n in range(10)
+    ]
+    assert [bucket['net_change'] for bucket in buckets] == [0, 6, 0, 0, -2, 0, 0, 0, 4, 0]
+    balances = [bucket['balance'] for bucket in buckets]
+    assert [later - earlier for earlier, later in zip(balances, balances[1:])] == [6, 0, 0, -2, 0, 0, 0, 4, 0]
+    assert [bucket['stock_out_avg'] for bucket in buckets[3:6]] == [0.0, 1.0, 1.0]
+
+def test_weekly_and_hourly_buckets_cover_the_whole_range(app, client, admin_headers):
+    item_id = create_item(client, admin_headers, 'TREND-HOUR', 0)['id']
+    # A Monday, so weekly buckets line up with it
+    day = datetime.combine(datetime.utcnow().date() - timedelta(days=30), time.min)
+    day -= timedelta(days=day.weekday())
+    _backdate_movements(app, item_id, [
+        (day + timedelta(hours=2, minutes=30), 'IN', 3),
+        (day + timedelta(days=15), 'IN', 2),
+    ])
+
+    hours = client.get(
+        f'/api/analytics/stock-trends?item_id={item_id}&granularity=hour'
+        f'&from={day.isoformat()}&to={(day + timedelta(hours=5, minutes=59, seconds=59)).isoformat()}',
+        headers=admin_headers
+    ).get_json()
+    assert [bucket['date'] for bucket in hours] == [
+        (day + timedelta(hours=n)).isoformat() for n in range(6)
+    ]
+    assert [bucket['stock_in'] for bucket in hours] == [0, 0, 3, 0, 0, 0]
+
+    # Starting mid-week widens the first bucket back to its Monday
+    weeks = client.get(
+        f'/api/analytics/stock-trends?item_id={item_id}&granularity=week'
+        f'&from={(day + timedelta(days=2)).date().isoformat()}&to={(day + timedelta(days=27)).date().isoformat()}',
+        headers=admin_headers
+    ).get_json()
+    assert [bucket['date'] for bucket in weeks] == [
+        (day + timedelta(weeks=n)).date().isoformat() for n in range(4)
+    ]
+    assert [bucket['stock_in'] for bucket in weeks] == [3, 0, 2, 0]
+    balances = [bucket['balance'] for bucket in weeks]
+    assert [later - earlier for earlier, later in zip(balances, balances[1:])] == [0, 2, 0]
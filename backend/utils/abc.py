@@ -0,0 +1,128 @@
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, and_
+from models import db, Item, DailyMovement
+
+ABC_CLASSES = ['A', 'B', 'C']
+DEFAULT_ABC_DAYS = 90
+DEFAULT_A_SHARE = 0.8
+DEFAULT_B_SHARE = 0.95
+CURVE_POINTS = 100
+
+def _consumption_columns(start, end):
+    """Per-item OUT quantity over [start, end) from daily_movements, one grouped query"""
+    window = and_(
+        DailyMovement.item_id == Item.id,
+        DailyMovement.date >= start.date(),
+        DailyMovement.date <= (end - timedelta(microseconds=1)).date()
+    )
+    rows = db.session.execute(
+        select(Item.id, Item.category, Item.price, func.coalesce(func.sum(DailyMovement.stock_out), 0))
+        .outerjoin(DailyMovement, window).group_by(Item.id)
+    ).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0), np.empty(0)
+
+    item_id, category, price, quantity = zip(*rows)
+    return (
+        np.array(item_id, dtype=np.int64),
+        np.array(category, dtype=object),
+        np.array(price, dtype=np.float64),
+        np.array(quantity, dtype=np.float64)
+    )
+
+def abc_report(start=None, end=None, a_share=DEFAULT_A_SHARE, b_share=DEFAULT_B_SHARE):
+    """
+    ABC (Pareto) classification of the catalog by consumption value
+
+    Consumption value is the OUT quantity over the window times the
+    current price. Items are sorted once by value; an item is class A
+    while the value before it is below a_share of the total, B below
+    b_share and C otherwise. Items without consumption are always C.
+
+    Args:
+        start (datetime): Window start, default DEFAULT_ABC_DAYS before end
+        end (datetime): Exclusive window end, default now
+        a_share (float): Cumulative value share covered by class A
+        b_share (float): Cumulative value share covered by classes A and B
+
+    Returns:
+        dict: Class totals, the cumulative value curve, the per-category
+        breakdown and 'ranked', an iterator of (item_id, quantity, value,
+        cumulative_share, class) tuples, highest value first
+
+    Raises:
+        ValueError: If the shares or the window are invalid
+    """
+    if not 0 < a_share < b_share <= 1:
+        raise ValueError('Shares must satisfy 0 < a_share < b_share <= 1')
+
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=DEFAULT_ABC_DAYS)
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+
+    item_id, category, price, quantity = _consumption_columns(start, end)
+    value = quantity * price
+
+    order = np.argsort(-value, kind='stable')
+    sorted_value = value[order]
+    total = float(sorted_value.sum())
+    cumulative = np.cumsum(sorted_value)
+    share = cumulative / total if total > 0 else np.zeros_like(cumulative)
+    share_before = share - (sorted_value / total if total > 0 else 0)
+
+    # 0 = A, 1 = B, 2 = C, in sorted order
+    klass = np.where(share_before < a_share, 0, np.where(share_before < b_share, 1, 2))
+    klass[sorted_value <= 0] = 2
+
+    classes = {}
+    for index, name in enumerate(ABC_CLASSES):
+        members = klass == index
+        class_value = float(sorted_value[members].sum())
+        classes[name] = {
+            'items': int(members.sum()),
+            'value': round(class_value, 2),
+            'share': round(class_value / total, 4) if total > 0 else 0.0
+        }
+
+    # Value share reached by the top k% of items, k = 0..CURVE_POINTS
+    count = len(sorted_value)
+    curve = []
+    if count:
+        positions = np.ceil(np.linspace(0, count, CURVE_POINTS + 1)).astype(np.int64)
+        reached = np.concatenate(([0.0], share))[positions]
+        curve = [
+            {'item_share': round(point / CURVE_POINTS, 2), 'value_share': round(float(reached_share), 4)}
+            for point, reached_share in enumerate(reached.tolist())
+        ]
+
+    # Category x class totals in one pass
+    names, category_index = np.unique(category[order].astype(str), return_inverse=True)
+    cells = category_index * len(ABC_CLASSES) + klass
+    size = len(names) * len(ABC_CLASSES)
+    counts = np.bincount(cells, minlength=size).reshape(len(names), len(ABC_CLASSES))
+    values = np.bincount(cells, weights=sorted_value, minlength=size).reshape(len(names), len(ABC_CLASSES))
+    categories = []
+    for row, name in enumerate(names.tolist()):
+        entry = {'category': name, 'total_value': round(float(values[row].sum()), 2)}
+        for index, class_name in enumerate(ABC_CLASSES):
+            entry[class_name] = {'items': int(counts[row, index]), 'value': round(float(values[row, index]), 2)}
+        categories.append(entry)
+    categories.sort(key=lambda entry: -entry['total_value'])
+
+    ranked = zip(
+        item_id[order].tolist(), quantity[order].astype(np.int64).tolist(), sorted_value.tolist(),
+        share.tolist(), [ABC_CLASSES[index] for index in klass.tolist()]
+    )
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'total_value': round(total, 2),
+        'thresholds': {'A': a_share, 'B': b_share},
+        'classes': classes,
+        'curve': curve,
+        'categories': categories,
+        'ranked': ranked
+    }
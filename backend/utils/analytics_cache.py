@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from flask import request, current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, TableVersion
+
+# Results are keyed by table versions, so writes invalidate them; the TTL
+# only bounds how long time-relative windows ("last 30 days") can lag
+ANALYTICS_CACHE_SIZE = int(os.getenv('ANALYTICS_CACHE_SIZE', '256'))
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv('ANALYTICS_CACHE_TTL_SECONDS', '300'))
+
+def bump_versions(*tables, connection=None):
+    """
+    Mark tables as changed inside the caller's transaction
+
+    The bump commits or rolls back together with the write, and every
+    worker process reads the same counters, so no cached result built
+    from older data is served after the write is visible. Writers on
+    their own connection pass it so the bump joins their transaction.
+
+    Returns:
+        dict: The new version of each table
+    """
+    table = TableVersion.__table__
+    stmt = sqlite_insert(table).values([{'name': name, 'version': 1} for name in tables])
+    rows = (connection or db.session).execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'version': table.c.version + 1}
+    ).returning(table.c.name, table.c.version))
+    return dict(rows.all())
+
+def current_versions(tables):
+    """Return the version counters of the given tables as a tuple"""
+    rows = dict(db.session.query(TableVersion.name, TableVersion.version).filter(
+        TableVersion.name.in_(tables)
+    ).all())
+    return tuple(rows.get(name, 0) for name in tables)
+
+@contextmanager
+def read_snapshot():
+    """
+    Run the session's queries inside the block in one read transaction
+
+    pysqlite only opens a transaction before a write, so consecutive
+    SELECTs would each see the latest commit. This issues BEGIN on the
+    session's connection and rolls back afterwards; the block must not
+    write.
+
+    Raises:
+        RuntimeError: If the session holds uncommitted writes
+    """
+    connection = db.session.connection()
+    if connection.connection.driver_connection.in_transaction:
+        raise RuntimeError('Commit or roll back pending writes before opening a read snapshot')
+    connection.exec_driver_sql('BEGIN')
+    try:
+        yield
+    finally:
+        db.session.rollback()
+
+class _Flight:
+    """A computation in progress that identical requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class AnalyticsCache:
+    """Thread-safe LRU of computed results with single-flight misses"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        """
+        Return the cached value for key, computing it at most once at a time
+
+        Concurrent callers with the same key wait for the first one's
+        result instead of running compute themselves.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and cacheable(flight.value):
+                    self._put(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def _put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+            }
+
+_cache = AnalyticsCache(ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL_SECONDS)
+
+def cached_analytics(*tables):
+    """
+    Decorator to serve an analytics endpoint from the versioned result cache
+
+    The key combines the endpoint, its query arguments and the versions
+    of the tables the result is computed from. Only 200 responses are
+    kept.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (
+                request.endpoint,
+                tuple(sorted(request.args.items(multi=True))),
+                current_versions(tables)
+            )
+
+            def compute():
+                response = current_app.make_response(fn(*args, **kwargs))
+                return response.status_code, response.get_data(), response.mimetype
+
+            status_code, body, mimetype = _cache.get_or_compute(
+                key, compute, cacheable=lambda value: value[0] == 200
+            )
+            return current_app.response_class(body, status=status_code, mimetype=mimetype)
+        return wrapper
+    return decorator
+
+def cache_stats():
+    """Hit-rate metrics of the analytics result cache"""
+    return _cache.stats()
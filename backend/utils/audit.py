@@ -1,12 +1,62 @@
-from models import db, Audit
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
 from flask import current_app
-from flask_socketio import emit
+from sqlalchemy import insert, select, inspect
+from sqlalchemy.exc import OperationalError
+from models import db, Audit, User
+from utils.notifier import ADMIN_ROOM
 import json
 
+# Strict compliance mode: write each record in the request, before it returns
+AUDIT_SYNC = os.getenv('AUDIT_SYNC', 'false').lower() == 'true'
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_SHUTDOWN_TIMEOUT_SECONDS = 10
+AUDIT_RETRY_MAX_SECONDS = 5
+
+# Item fields recorded in audit changes; id and timestamps are on the record itself
+ITEM_AUDIT_FIELDS = ['name', 'sku', 'category', 'quantity', 'price', 'reorder_level', 'description']
+
+def field_values(instance, fields):
+    """Audit changes for a created record: its initial field values"""
+    return {field: getattr(instance, field) for field in fields}
+
+def field_changes(instance, fields):
+    """
+    Audit changes for an update: [before, after] for each modified field
+
+    Uses SQLAlchemy's attribute history, so it must be called after the
+    attributes are set and before the session flushes them (any query,
+    including bump_versions(), may autoflush).
+
+    Returns:
+        dict: {field: [before, after]} for the fields whose value differs
+    """
+    state = inspect(instance)
+    changes = {}
+    for field in fields:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        before = history.deleted[0] if history.deleted else None
+        after = history.added[0] if history.added else None
+        if before != after:
+            changes[field] = [before, after]
+    return changes
+
 def log_audit(action, resource_type, resource_id, user_id, changes=None):
     """
-    Log an audit entry and emit a socket event
-    
+    Log an audit entry and send it to connected admins
+
+    The entry is queued for the background writer, which stores it and
+    emits it to the admin room; with AUDIT_SYNC, or when the queue is
+    full, it is written before this returns.
+
     Args:
         action (str): The action performed (CREATE, UPDATE, DELETE)
         resource_type (str): The type of resource (Item, Transaction, etc.)
@@ -14,23 +64,200 @@ def log_audit(action, resource_type, resource_id, user_id, changes=None):
         user_id (int): The ID of the user performing the action
         changes (dict, optional): Dictionary of changes made
     """
-    audit = Audit(
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        user_id=user_id,
-        changes=json.dumps(changes) if changes else None
-    )
-    
-    db.session.add(audit)
-    db.session.commit()
-    
-    # Emit socket event with audit information
-    socket_data = {
-        'type': f'{resource_type.lower()}_changed',
+    record = {
         'action': action,
+        'resource_type': resource_type,
         'resource_id': resource_id,
-        'audit': audit.to_dict()
+        'user_id': user_id,
+        'changes': json.dumps(changes) if changes else None,
+        'timestamp': datetime.utcnow()
     }
-    
-    current_app.socketio.emit('inventory_update', socket_data, broadcast=True)
\ No newline at end of file
+    audit_writer.submit(record)
+
+class AuditWriter:
+    """
+    Background writer that stores queued audit records in batches
+
+    One daemon thread per worker process takes everything waiting in the
+    queue, up to AUDIT_BATCH_SIZE records, and stores it with a single
+    executemany INSERT and one commit, so audited requests no longer pay
+    for a second commit. Records still queued at exit are flushed by an
+    atexit hook.
+    """
+
+    def __init__(self, max_size=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_size)
+        self._app = None
+        self._thread = None
+        self._usernames = {}
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+
+    def start(self, app):
+        """Start the writer thread for this process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, record):
+        """Queue a record, or write it now in synchronous mode or when the queue is full"""
+        if AUDIT_SYNC or self._thread is None:
+            self._notify([record], self._write([record]))
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Back-pressure instead of dropping records
+            self._notify([record], self._write([record]))
+
+    def stop(self):
+        """Flush the queued records and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
+        except queue.Full:
+            # The thread is stuck on a write and the queue is full; the
+            # records are flushed from here instead
+            print("⚠ Audit writer is not taking records; flushing the queue directly", file=sys.stderr)
+        thread.join(AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
+        # Whatever the thread did not get to is written here, batch by batch
+        with self._app.app_context():
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                self._write_with_retry(batch, attempts=3)
+
+    def pending(self):
+        """Number of records waiting to be written"""
+        return self._queue.qsize()
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                break
+            batch.append(record)
+        return batch
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            # Everything that queued up during the previous write goes in one batch
+            with self._app.app_context():
+                try:
+                    self._write_with_retry(self._drain(record))
+                finally:
+                    db.session.remove()
+
+    def _write_with_retry(self, batch, attempts=None):
+        """
+        Write a batch, retrying while the database is unavailable or locked
+
+        A batch rejected for other reasons is written record by record so
+        one invalid record does not hold up the rest; records that still
+        fail, or outlast the attempts, are printed to stderr. Only the
+        insert is retried: once the commit succeeds the batch is stored,
+        whatever happens to its notification.
+        """
+        delay = 0.1
+        attempt = 0
+        while batch:
+            attempt += 1
+            try:
+                ids = self._write(batch)
+            except OperationalError as e:
+                if attempts is not None and attempt >= attempts:
+                    self._report_lost(batch, e)
+                    return
+                print(f"⚠ Audit batch of {len(batch)} records failed, retrying: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_MAX_SECONDS)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._report_lost(batch, e)
+                    return
+                for record in batch:
+                    self._write_with_retry([record], attempts)
+                return
+            self._notify(batch, ids)
+            return
+
+    def _report_lost(self, batch, error):
+        # Last resort: keep the records in the logs rather than lose them
+        print(f"✗ {len(batch)} audit records could not be written: {error}", file=sys.stderr)
+        for record in batch:
+            print(json.dumps(record, default=str), file=sys.stderr)
+
+    def _write(self, batch):
+        """
+        Insert a batch with one statement and commit
+
+        Returns:
+            list: The IDs of the stored records, in batch order
+        """
+        if not batch:
+            return []
+        table = Audit.__table__
+        try:
+            ids = db.session.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), batch
+            ).scalars().all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+        return ids
+
+    def _notify(self, batch, ids):
+        """
+        Emit stored records to the admin room
+
+        The records are already committed, so a failure here is only
+        logged; it never causes the batch to be written again.
+        """
+        if not batch:
+            return
+        try:
+            # Audit details are for admins only; viewers are never in this room
+            usernames = self._resolve_usernames({record['user_id'] for record in batch})
+            current_app.socketio.emit('audit_records', {'records': [{
+                'id': audit_id,
+                'action': record['action'],
+                'resource_type': record['resource_type'],
+                'resource_id': record['resource_id'],
+                'user_id': record['user_id'],
+                'user_name': usernames.get(record['user_id']),
+                'changes': json.loads(record['changes']) if record['changes'] else None,
+                'timestamp': record['timestamp'].isoformat()
+            } for audit_id, record in zip(ids, batch)]}, to=ADMIN_ROOM)
+        except Exception as e:
+            print(f"⚠ Notification of {len(batch)} stored audit records failed: {e}", file=sys.stderr)
+
+    def _resolve_usernames(self, user_ids):
+        """Usernames for the batch, with one query for the IDs not seen before"""
+        missing = [user_id for user_id in user_ids if user_id not in self._usernames]
+        if missing:
+            rows = db.session.execute(select(User.id, User.username).where(User.id.in_(missing))).all()
+            self._usernames.update({row.id: row.username for row in rows})
+        return self._usernames
+
+audit_writer = AuditWriter()
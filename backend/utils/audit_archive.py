@@ -0,0 +1,304 @@
+import base64
+import gzip
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, tuple_
+from models import db, Audit, User
+
+# Audit records older than this many days are moved to archive segments
+AUDIT_RETENTION_DAYS = int(os.getenv('AUDIT_RETENTION_DAYS', '90'))
+AUDIT_ARCHIVE_MINUTES = int(os.getenv('AUDIT_ARCHIVE_MINUTES', '1440'))
+# gzip, or zstd if the zstandard package is installed
+AUDIT_ARCHIVE_COMPRESSION = os.getenv('AUDIT_ARCHIVE_COMPRESSION', 'gzip')
+AUDIT_SEGMENT_ROWS = int(os.getenv('AUDIT_SEGMENT_ROWS', '100000'))
+# Records per independently compressed block; the unit the index can skip
+AUDIT_BLOCK_ROWS = 1000
+# Per-block Bloom filter over (resource_type, resource_id): ~2% false positives at 1000 records
+RESOURCE_BLOOM_BITS = 8192
+RESOURCE_BLOOM_HASHES = 4
+
+SEGMENT_EXTENSIONS = {'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst'}
+INDEX_FILE_PATTERN = re.compile(r'^(audit_\d{8}T\d{6}_\d+)\.idx\.json$')
+
+def audit_archive_dir():
+    """Directory holding the audit segments, next to the main database by default"""
+    configured = os.getenv('AUDIT_ARCHIVE_PATH')
+    if configured:
+        return configured
+    return os.path.join(os.path.dirname(db.engine.url.database), 'audit_archive')
+
+def _codec(compression):
+    """Return (compress, decompress) functions for a block"""
+    if compression == 'gzip':
+        return gzip.compress, gzip.decompress
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('zstd audit archives need the zstandard package (pip install zstandard)')
+        return zstandard.ZstdCompressor().compress, lambda data: zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown audit archive compression '{compression}'; use gzip or zstd")
+
+def _bloom_positions(resource_type, resource_id):
+    data = f'{resource_type}:{resource_id}'.encode()
+    first, step = zlib.crc32(data), zlib.adler32(data) | 1
+    return [(first + i * step) % RESOURCE_BLOOM_BITS for i in range(RESOURCE_BLOOM_HASHES)]
+
+def _resource_bloom(records):
+    bits = bytearray(RESOURCE_BLOOM_BITS // 8)
+    for record in records:
+        for position in _bloom_positions(record['resource_type'], record['resource_id']):
+            bits[position // 8] |= 1 << (position % 8)
+    return base64.b64encode(bytes(bits)).decode()
+
+def _bloom_contains(bloom, resource_type, resource_id):
+    bits = base64.b64decode(bloom)
+    return all(bits[position // 8] & (1 << (position % 8)) for position in _bloom_positions(resource_type, resource_id))
+
+def _key(record):
+    return record['timestamp'], record['id']
+
+def _write_segment(directory, records, compression):
+    """
+    Write records, oldest first, as one segment file plus its index
+
+    The segment is a series of compressed NDJSON blocks, which together
+    still form one valid .gz/.zst stream. The index lists every block's
+    byte range with its time and id span, the actions and users it
+    contains, the id range per resource type and a Bloom filter of the
+    individual resources. The index is renamed into place last, so a
+    segment only counts once both files are complete.
+    """
+    compress, _ = _codec(compression)
+    first = records[0]
+    name = f"audit_{first['timestamp'][:19].replace('-', '').replace(':', '')}_{first['id']}"
+    segment_file = name + SEGMENT_EXTENSIONS[compression]
+
+    blocks = []
+    with open(os.path.join(directory, segment_file + '.tmp'), 'wb') as handle:
+        for start in range(0, len(records), AUDIT_BLOCK_ROWS):
+            chunk = records[start:start + AUDIT_BLOCK_ROWS]
+            data = compress(''.join(record['line'] for record in chunk).encode())
+            resources = {}
+            for record in chunk:
+                span = resources.setdefault(record['resource_type'], [record['resource_id'], record['resource_id']])
+                span[0] = min(span[0], record['resource_id'])
+                span[1] = max(span[1], record['resource_id'])
+            blocks.append({
+                'offset': handle.tell(),
+                'length': len(data),
+                'rows': len(chunk),
+                'first': list(_key(chunk[0])),
+                'last': list(_key(chunk[-1])),
+                'actions': sorted({record['action'] for record in chunk}),
+                'users': sorted({record['user_id'] for record in chunk}),
+                'resources': resources,
+                'resource_bloom': _resource_bloom(chunk)
+            })
+            handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    index = {
+        'segment': segment_file,
+        'compression': compression,
+        'rows': len(records),
+        'first': list(_key(records[0])),
+        'last': list(_key(records[-1])),
+        'blocks': blocks
+    }
+    with open(os.path.join(directory, name + '.idx.json.tmp'), 'w') as handle:
+        json.dump(index, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    os.replace(os.path.join(directory, segment_file + '.tmp'), os.path.join(directory, segment_file))
+    os.replace(os.path.join(directory, name + '.idx.json.tmp'), os.path.join(directory, name + '.idx.json'))
+    os.chmod(os.path.join(directory, segment_file), 0o600)
+    os.chmod(os.path.join(directory, name + '.idx.json'), 0o600)
+    return index
+
+def _archived_watermark(directory):
+    """(timestamp, id) of the newest archived record, or None"""
+    newest = None
+    for index in _load_indexes(directory):
+        last = tuple(index['last'])
+        if newest is None or last > newest:
+            newest = last
+    return newest
+
+def archive_audit_logs(retention_days=AUDIT_RETENTION_DAYS, compression=AUDIT_ARCHIVE_COMPRESSION, vacuum=True):
+    """
+    Move audit records older than the retention window into archive segments
+
+    Records are taken oldest first, AUDIT_SEGMENT_ROWS at a time; each
+    segment is written and synced before its rows are deleted from the
+    database. A run interrupted between the two finishes the delete the
+    next time, since everything up to the newest archived (timestamp, id)
+    is known to be in the archive.
+
+    Returns:
+        dict: Number of records and segments archived
+    """
+    _codec(compression)
+    directory = audit_archive_dir()
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    for entry in os.listdir(directory):
+        if entry.endswith('.tmp'):
+            os.remove(os.path.join(directory, entry))
+
+    key = tuple_(Audit.timestamp, Audit.id)
+    watermark = _archived_watermark(directory)
+    if watermark is not None:
+        db.session.execute(delete(Audit).where(key <= (datetime.fromisoformat(watermark[0]), watermark[1])))
+        db.session.commit()
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    archived = segments = 0
+    while True:
+        rows = db.session.execute(
+            select(
+                Audit.id, Audit.action, Audit.resource_type, Audit.resource_id,
+                Audit.user_id, User.username.label('user_name'), Audit.changes, Audit.timestamp
+            ).outerjoin(User, User.id == Audit.user_id)
+            .where(Audit.timestamp < cutoff)
+            .order_by(Audit.timestamp, Audit.id).limit(AUDIT_SEGMENT_ROWS)
+        ).all()
+        db.session.commit()
+        if not rows:
+            break
+
+        records = []
+        for row in rows:
+            record = {
+                'id': row.id,
+                'action': row.action,
+                'resource_type': row.resource_type,
+                'resource_id': row.resource_id,
+                'user_id': row.user_id,
+                'user_name': row.user_name,
+                'timestamp': row.timestamp.isoformat()
+            }
+            # The stored changes JSON is copied in as-is
+            record['line'] = json.dumps(record)[:-1] + ', "changes": ' + (row.changes or 'null') + '}\n'
+            records.append(record)
+
+        _write_segment(directory, records, compression)
+        last = rows[-1]
+        db.session.execute(delete(Audit).where(key <= (last.timestamp, last.id)))
+        db.session.commit()
+        archived += len(rows)
+        segments += 1
+
+    if archived and vacuum:
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('VACUUM')
+
+    return {'records': archived, 'segments': segments}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def _load_indexes(directory):
+    """Indexes of all complete segments, newest first; segments never change, so they are cached"""
+    if not os.path.isdir(directory):
+        return []
+    names = [entry for entry in os.listdir(directory) if INDEX_FILE_PATTERN.match(entry)]
+    result = []
+    for entry in names:
+        path = os.path.join(directory, entry)
+        with _indexes_lock:
+            index = _indexes.get(path)
+        if index is None:
+            with open(path) as handle:
+                index = json.load(handle)
+            with _indexes_lock:
+                _indexes[path] = index
+        result.append(index)
+    result.sort(key=lambda index: tuple(index['last']), reverse=True)
+    return result
+
+def _block_matches(block, filters, before):
+    if before is not None and tuple(block['first']) >= before:
+        return False
+    if filters.get('date_from') and block['last'][0] < filters['date_from']:
+        return False
+    if filters.get('date_to') and block['first'][0] >= filters['date_to']:
+        return False
+    if filters.get('action') and filters['action'] not in block['actions']:
+        return False
+    if filters.get('user_id') is not None and filters['user_id'] not in block['users']:
+        return False
+    if filters.get('resource_type'):
+        span = block['resources'].get(filters['resource_type'])
+        if span is None:
+            return False
+        resource_id = filters.get('resource_id')
+        if resource_id is not None and not (
+            span[0] <= resource_id <= span[1]
+            and _bloom_contains(block['resource_bloom'], filters['resource_type'], resource_id)
+        ):
+            return False
+    return True
+
+def _record_matches(record, filters, before):
+    if before is not None and _key(record) >= before:
+        return False
+    if filters.get('date_from') and record['timestamp'] < filters['date_from']:
+        return False
+    if filters.get('date_to') and record['timestamp'] >= filters['date_to']:
+        return False
+    for field in ('action', 'user_id', 'resource_type', 'resource_id'):
+        if filters.get(field) is not None and record[field] != filters[field]:
+            return False
+    return True
+
+def query_audit_archive(filters, before=None, limit=100):
+    """
+    Read archived audit records newest first, decompressing only matching blocks
+
+    Args:
+        filters (dict): Any of action, resource_type, resource_id,
+            user_id, and date_from/date_to as datetimes
+        before (tuple): Only records with (timestamp, id) below this key
+        limit (int): Maximum number of records
+
+    Returns:
+        list: Records as dicts, changes decoded, newest first
+    """
+    filters = dict(filters)
+    for bound in ('date_from', 'date_to'):
+        if filters.get(bound):
+            filters[bound] = filters[bound].isoformat()
+    if before is not None:
+        before = (before[0].isoformat(), before[1])
+
+    directory = audit_archive_dir()
+    results = []
+    for index in _load_indexes(directory):
+        if before is not None and tuple(index['first']) >= before:
+            continue
+        if filters.get('date_from') and index['last'][0] < filters['date_from']:
+            continue
+        if filters.get('date_to') and index['first'][0] >= filters['date_to']:
+            continue
+
+        blocks = [block for block in index['blocks'] if _block_matches(block, filters, before)]
+        if not blocks:
+            continue
+        _, decompress = _codec(index['compression'])
+        with open(os.path.join(directory, index['segment']), 'rb') as handle:
+            for block in reversed(blocks):
+                handle.seek(block['offset'])
+                lines = decompress(handle.read(block['length'])).decode().splitlines()
+                for line in reversed(lines):
+                    record = json.loads(line)
+                    if _record_matches(record, filters, before):
+                        results.append(record)
+                        if len(results) >= limit:
+                            return results
+    return results
@@ -0,0 +1,97 @@
+import json
+from sqlalchemy import select, update, func, tuple_, bindparam
+from models import db, Audit
+from utils.audit import ITEM_AUDIT_FIELDS
+
+AUDIT_COMPACT_CHUNK_SIZE = 20000
+
+def _is_diff(changes):
+    """Whether stored UPDATE changes are already {field: [before, after]}"""
+    return all(isinstance(value, list) and len(value) == 2 for value in changes.values())
+
+def compact_item_audit_changes(chunk_size=AUDIT_COMPACT_CHUNK_SIZE, vacuum=True):
+    """
+    Rewrite historical Item audit records from full snapshots into diffs
+
+    Older records stored the whole item on CREATE (to_dict(), including
+    id and timestamps) and six fields on every UPDATE. Records are
+    replayed per item in (timestamp, id) order: CREATE keeps only the
+    audited fields, and an UPDATE snapshot becomes [before, after] for
+    the fields that differ from the item's previous known state. An
+    UPDATE with no earlier state to compare with (its CREATE was
+    archived or never logged) is left as it is. Records already in diff
+    form only advance the state, so the rewrite can be run repeatedly.
+    Archived segments are not touched.
+
+    Returns:
+        dict: Records scanned, rewritten and left as snapshots, and the
+        total size of the Item changes before and after
+    """
+    is_item = Audit.resource_type == 'Item'
+    size = select(func.coalesce(func.sum(func.length(Audit.changes)), 0)).where(is_item)
+    bytes_before = db.session.execute(size).scalar()
+
+    table = Audit.__table__
+    rewrite = update(table).where(table.c.id == bindparam('audit_id')).values(changes=bindparam('new_changes'))
+    order = (Audit.resource_id, Audit.timestamp, Audit.id)
+
+    scanned = rewritten = skipped = 0
+    last = None
+    current_item, state = None, None
+    while True:
+        query = select(Audit.id, Audit.action, Audit.resource_id, Audit.timestamp, Audit.changes).where(is_item)
+        if last is not None:
+            query = query.where(tuple_(*order) > last)
+        rows = db.session.execute(query.order_by(*order).limit(chunk_size)).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            if row.resource_id != current_item:
+                current_item, state = row.resource_id, None
+            changes = json.loads(row.changes) if row.changes else None
+            compact = changes
+
+            if row.action == 'CREATE' and changes is not None:
+                compact = {field: changes[field] for field in ITEM_AUDIT_FIELDS if field in changes}
+                state = dict(compact)
+            elif row.action == 'UPDATE' and changes:
+                if _is_diff(changes):
+                    if state is not None:
+                        state.update({field: after for field, (_, after) in changes.items()})
+                elif state is None:
+                    skipped += 1
+                    state = dict(changes)
+                else:
+                    compact = {
+                        field: [state.get(field), value]
+                        for field, value in changes.items() if state.get(field) != value
+                    }
+                    state.update(changes)
+            elif row.action == 'DELETE':
+                state = None
+
+            if compact is not changes and compact != changes:
+                updates.append({'audit_id': row.id, 'new_changes': json.dumps(compact) if compact else None})
+
+        if updates:
+            db.session.execute(rewrite, updates)
+        db.session.commit()
+        scanned += len(rows)
+        rewritten += len(updates)
+        last = tuple(getattr(rows[-1], column.key) for column in order)
+
+    bytes_after = db.session.execute(size).scalar()
+    db.session.commit()
+    if rewritten and vacuum:
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('VACUUM')
+
+    return {
+        'scanned': scanned,
+        'rewritten': rewritten,
+        'skipped': skipped,
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after
+    }
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from datetime import datetime, time
+from sqlalchemy import func, case, delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, DailyMovement
+from utils.ledger_archive import ledger_source
+from utils.analytics_cache import bump_versions
+
+def add_daily_movements(transactions, sign=1):
+    """
+    Fold freshly flushed ledger rows into the daily_movements table
+
+    Rows are grouped by (date, item) first, so a batch costs one upsert
+    statement however many lines it has. Runs inside the caller's
+    transaction; the caller commits.
+
+    Args:
+        transactions (iterable): Flushed Transaction objects
+        sign (int): -1 to take deleted rows back out of their days
+    """
+    totals = defaultdict(lambda: {'stock_in': 0, 'stock_out': 0})
+    for transaction in transactions:
+        column = 'stock_in' if transaction.transaction_type == 'IN' else 'stock_out'
+        totals[(transaction.created_at.date(), transaction.item_id)][column] += sign * transaction.quantity
+
+    if not totals:
+        return
+
+    table = DailyMovement.__table__
+    stmt = sqlite_insert(table).values([
+        {'date': day, 'item_id': item_id, **amounts}
+        for (day, item_id), amounts in totals.items()
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.item_id],
+        set_={
+            'stock_in': table.c.stock_in + stmt.excluded.stock_in,
+            'stock_out': table.c.stock_out + stmt.excluded.stock_out
+        }
+    ))
+
+def backfill_daily_movements(date_from=None):
+    """
+    Rebuild daily_movements from the ledger, from date_from onwards
+
+    Days on or after date_from are deleted and recomputed with one grouped
+    INSERT ... SELECT; archived years in range are read from their files.
+    Commits the result.
+
+    Args:
+        date_from (datetime): First day to rebuild, or None for the whole ledger
+
+    Returns:
+        int: Number of (date, item) rows written
+
+    Raises:
+        ValueError: If the range spans more archives than can be attached
+    """
+    if date_from is not None:
+        date_from = datetime.combine(date_from.date(), time.min)
+
+    # A dedicated connection: archives can only be detached once the
+    # rebuild is committed
+    with db.engine.connect() as connection:
+        with ledger_source(date_from, connection=connection) as ledger:
+            day = func.date(ledger.created_at)
+            rows = select(
+                day,
+                ledger.item_id,
+                func.sum(case((ledger.transaction_type == 'IN', ledger.quantity), else_=0)),
+                func.sum(case((ledger.transaction_type == 'OUT', ledger.quantity), else_=0))
+            ).group_by(day, ledger.item_id)
+            stale = delete(DailyMovement)
+            if date_from is not None:
+                rows = rows.where(ledger.created_at >= date_from)
+                stale = stale.where(DailyMovement.date >= date_from.date())
+
+            try:
+                connection.execute(stale)
+                written = connection.execute(
+                    insert(DailyMovement).from_select(['date', 'item_id', 'stock_in', 'stock_out'], rows)
+                ).rowcount
+                bump_versions('transactions', connection=connection)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+    return written
@@ -1,7 +1,14 @@
 import os
 import sqlite3
-from models import db, User, Item
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateTable
+from models import db, User, Item, Transaction, DailyMovement, StockSnapshot
 from utils.init_data import init_admin
+from utils.snapshots import take_snapshot
+from utils.daily_movements import add_daily_movements, backfill_daily_movements
+from utils.ledger_archive import LEDGER_HOT_DAYS
+from utils.inventory_stats import StatsDelta, item_state, rebuild_inventory_stats
 
 def init_db(app):
     """Initialize database with tables and default data"""
@@ -35,6 +42,9 @@ def init_db(app):
         try:
             # Create all tables
             db.create_all()
+            ensure_columns()
+            ensure_transaction_autoincrement()
+            ensure_indexes()
             print("✓ Database tables created successfully")
             
             # Initialize admin user
@@ -72,9 +82,41 @@ def init_db(app):
                 ]
                 for item in sample_items:
                     db.session.add(item)
+                db.session.flush()
+                openings = [
+                    Transaction(item_id=item.id, transaction_type='IN', quantity=item.quantity,
+                                notes='Opening balance', created_by='system')
+                    for item in sample_items
+                ]
+                db.session.add_all(openings)
+                db.session.flush()
+                add_daily_movements(openings)
+                # Count the samples like any other created item, so the
+                # check below finds nothing to correct on a fresh install
+                stats = StatsDelta()
+                for item in sample_items:
+                    stats.change(None, item_state(item))
+                stats.apply()
                 db.session.commit()
                 print(f"✓ Added {len(sample_items)} sample items")
             
+            # Seed the first stock snapshot so point-in-time queries have a baseline
+            if StockSnapshot.query.first() is None:
+                take_snapshot()
+                db.session.commit()
+                print("✓ Initial stock snapshot recorded")
+            
+            # Build the daily movement totals for the hot ledger on first start
+            if DailyMovement.query.first() is None and Transaction.query.first() is not None:
+                rows = backfill_daily_movements(datetime.utcnow() - timedelta(days=LEDGER_HOT_DAYS))
+                print(f"✓ Daily movement totals built ({rows} rows)")
+            
+            # Verify the dashboard counters; anything written while the API
+            # was down (restores, manual SQL) is corrected here
+            drift = rebuild_inventory_stats()
+            if drift:
+                print(f"⚠ Dashboard counters corrected: {', '.join(sorted(drift))}")
+            
             print("✓ Database initialized successfully!")
             
             # Set secure permissions on the database file
@@ -84,6 +126,66 @@ def init_db(app):
             print(f"✗ Error initializing database: {e}")
             raise
 
+def ensure_columns():
+    """Add nullable or defaulted model columns that are missing from existing tables"""
+    # create_all() never alters a table that already exists
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+    db.session.commit()
+
+def ensure_transaction_autoincrement():
+    """Rebuild a transactions table created before it was declared AUTOINCREMENT"""
+    table = Transaction.__table__
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        # Taking the write lock first means only one worker rebuilds
+        cursor.execute('BEGIN IMMEDIATE')
+        created = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+        ).fetchone()[0]
+        if 'AUTOINCREMENT' in created.upper():
+            connection.rollback()
+            return
+
+        ddl = str(CreateTable(table).compile(dialect=db.engine.dialect))
+        rebuild = f'{table.name}_rebuild'
+        cursor.execute(ddl.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE {rebuild} ', 1))
+        columns = ', '.join(column.name for column in table.columns)
+        cursor.execute(f'INSERT INTO {rebuild} ({columns}) SELECT {columns} FROM {table.name}')
+        cursor.execute(f'DROP TABLE {table.name}')
+        cursor.execute(f'ALTER TABLE {rebuild} RENAME TO {table.name}')
+
+        # IDs of rows already deleted may still be named by tombstones and
+        # snapshots; start the sequence past them too
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table.name,))
+        cursor.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT ?, MAX("
+            "(SELECT COALESCE(MAX(id), 0) FROM transactions), "
+            "(SELECT COALESCE(MAX(resource_id), 0) FROM sync_tombstones WHERE resource_type = 'transaction'), "
+            "(SELECT COALESCE(MAX(last_transaction_id), 0) FROM stock_snapshots))",
+            (table.name,)
+        )
+        connection.commit()
+        print("✓ Rebuilt transactions table with AUTOINCREMENT IDs")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def ensure_indexes():
+    """Create model indexes that are missing from an existing database"""
+    # create_all() skips tables that already exist, including their indexes
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 def set_db_permissions(db_path):
     """Set secure permissions for database file (chmod 600)"""
     try:
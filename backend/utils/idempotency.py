@@ -0,0 +1,172 @@
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Keys are honoured for this long; the in-memory LRU and the table are bounded
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '100000'))
+PRUNE_EVERY = 1000
+
+class ResponseCache:
+    """Thread-safe LRU of completed responses with a per-entry expiry"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+_cache = ResponseCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+_completed = itertools.count(1)
+
+def idempotent(fn):
+    """
+    Decorator to make a write endpoint safe to retry
+
+    A request carrying an Idempotency-Key header that was already served
+    successfully gets the stored response back without running the
+    handler again. The key is reserved inside the handler's own database
+    transaction, so concurrent retries on other workers wait for it and
+    never apply the write twice. Failed requests release their key.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return fn(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'message': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        username = get_jwt_identity()
+        fingerprint = _fingerprint()
+
+        cached = _cache.get((username, key))
+        if cached:
+            return _replay(cached, fingerprint)
+
+        record, existing = _reserve(username, key, fingerprint)
+        if existing:
+            return _replay(existing, fingerprint)
+
+        response = current_app.make_response(fn(*args, **kwargs))
+
+        if 200 <= response.status_code < 300:
+            _complete(record, username, key, fingerprint, response)
+        else:
+            _release(username, key)
+
+        return response
+    return wrapper
+
+def _fingerprint():
+    """Hash of the request so a reused key with a different payload is rejected"""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+def _reserve(username, key, fingerprint):
+    """
+    Insert a pending key row in the current transaction
+
+    Returns:
+        tuple: (record, None) when reserved, or (None, stored) where stored
+        is the (fingerprint, status_code, body) of an earlier request
+    """
+    for _ in range(2):
+        record = IdempotencyKey(username=username, key=key, fingerprint=fingerprint)
+        db.session.add(record)
+        try:
+            db.session.flush()
+            return record, None
+        except IntegrityError:
+            db.session.rollback()
+
+        existing = IdempotencyKey.query.filter_by(username=username, key=key).first()
+        if existing is None:
+            continue
+        if existing.created_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS):
+            db.session.delete(existing)
+            db.session.commit()
+            continue
+
+        stored = (existing.fingerprint, existing.status_code, existing.response_body)
+        if existing.status_code is not None:
+            _cache.put((username, key), stored)
+        db.session.rollback()
+        return None, stored
+
+    return None, (fingerprint, None, None)
+
+def _complete(record, username, key, fingerprint, response):
+    """Store the successful response with its key"""
+    body = response.get_data(as_text=True)
+    record.status_code = response.status_code
+    record.response_body = body
+    if next(_completed) % PRUNE_EVERY == 0:
+        _prune()
+    db.session.commit()
+    _cache.put((username, key), (fingerprint, response.status_code, body))
+
+def _release(username, key):
+    """Drop the reservation of a failed request so it can be retried"""
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(username=username, key=key, status_code=None).delete()
+    db.session.commit()
+
+def _prune():
+    """Delete expired keys and keep the table within IDEMPOTENCY_MAX_KEYS rows"""
+    cutoff = datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete()
+
+    oldest_kept = db.session.query(IdempotencyKey.id).order_by(
+        IdempotencyKey.id.desc()
+    ).offset(IDEMPOTENCY_MAX_KEYS).limit(1).scalar()
+    if oldest_kept is not None:
+        IdempotencyKey.query.filter(IdempotencyKey.id <= oldest_kept).delete()
+
+def _replay(stored, fingerprint):
+    """Answer a repeated key from its stored response"""
+    stored_fingerprint, status_code, body = stored
+    if stored_fingerprint != fingerprint:
+        return jsonify({'message': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422
+    if status_code is None:
+        return jsonify({'message': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'}), 409
+
+    response = current_app.response_class(body, status=status_code, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
@@ -0,0 +1,168 @@
+import threading
+from collections import Counter, deque
+from sqlalchemy import func, case, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from models import db, Item, Transaction, InventoryStat, CategoryStat
+
+STAT_NAMES = ['total_items', 'total_categories', 'total_inventory_value', 'low_stock_alerts']
+RECENT_TRANSACTIONS = 5
+RECENT_VERSION_TABLES = ('items', 'transactions')
+
+def item_state(item):
+    """The fields of an item the dashboard counters depend on"""
+    return (item.category, item.quantity, item.price, item.reorder_level)
+
+class StatsDelta:
+    """Counter changes collected over one write and applied in one go"""
+
+    def __init__(self):
+        self.totals = Counter()
+        self.categories = Counter()
+
+    def change(self, before, after):
+        """
+        Record an item going from one state to another
+
+        Args:
+            before (tuple): item_state() before the write, or None if created
+            after (tuple): item_state() after the write, or None if deleted
+        """
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            category, quantity, price, reorder_level = state
+            # Same NULL handling as the SQL aggregates these counters replace
+            if quantity is not None and price is not None:
+                self.totals['total_inventory_value'] += sign * quantity * price
+            if quantity is not None and reorder_level is not None and quantity <= reorder_level:
+                self.totals['low_stock_alerts'] += sign
+            self.totals['total_items'] += sign
+            self.categories[category] += sign
+
+    def apply(self):
+        """Adjust the stored counters inside the caller's transaction"""
+        category_table = CategoryStat.__table__
+        for category, change in self.categories.items():
+            if change == 0:
+                continue
+            stmt = sqlite_insert(category_table).values(category=category, item_count=change)
+            count = db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[category_table.c.category],
+                set_={'item_count': category_table.c.item_count + change}
+            ).returning(category_table.c.item_count)).scalar()
+            if count - change <= 0 < count:
+                self.totals['total_categories'] += 1
+            elif count <= 0 < count - change:
+                self.totals['total_categories'] -= 1
+                db.session.execute(delete(CategoryStat).where(CategoryStat.category == category))
+
+        changes = [{'name': name, 'value': value} for name, value in self.totals.items() if value]
+        if changes:
+            stat_table = InventoryStat.__table__
+            stmt = sqlite_insert(stat_table).values(changes)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[stat_table.c.name],
+                set_={'value': stat_table.c.value + stmt.excluded.value}
+            ))
+
+def read_inventory_stats():
+    """Return the dashboard counters with a single primary-key read"""
+    stored = dict(db.session.query(InventoryStat.name, InventoryStat.value).all())
+    stats = {name: int(stored.get(name, 0)) for name in STAT_NAMES}
+    stats['total_inventory_value'] = float(stored.get('total_inventory_value', 0))
+    return stats
+
+def rebuild_inventory_stats():
+    """
+    Recompute the dashboard counters from the items table and store them
+
+    Run at startup and from the CLI to repair counters after writes that
+    bypass the API (restores, manual SQL). Commits the result.
+
+    Returns:
+        dict: (stored, actual) pairs for the counters that had drifted
+    """
+    summary = db.session.query(
+        Item.category,
+        func.count(Item.id),
+        func.sum(Item.quantity * Item.price),
+        func.sum(case((Item.quantity <= Item.reorder_level, 1), else_=0))
+    ).group_by(Item.category).all()
+
+    actual = {
+        'total_items': sum(row[1] for row in summary),
+        'total_categories': len(summary),
+        'total_inventory_value': float(sum(row[2] or 0 for row in summary)),
+        'low_stock_alerts': sum(row[3] for row in summary)
+    }
+    stored = read_inventory_stats()
+    drift = {
+        name: (stored[name], actual[name]) for name in STAT_NAMES
+        if abs(stored[name] - actual[name]) > 0.005
+    }
+
+    db.session.execute(delete(CategoryStat))
+    if summary:
+        db.session.execute(sqlite_insert(CategoryStat).values([
+            {'category': row[0], 'item_count': row[1]} for row in summary
+        ]))
+    db.session.execute(delete(InventoryStat))
+    db.session.execute(sqlite_insert(InventoryStat).values([
+        {'name': name, 'value': value} for name, value in actual.items()
+    ]))
+    db.session.commit()
+    return drift
+
+class RecentTransactions:
+    """
+    Thread-safe ring buffer of the newest ledger rows, serialized
+
+    The buffer remembers the table versions it reflects. Rows this worker
+    writes are pushed on directly; a write from anywhere else changes the
+    versions and the next read reloads the buffer from the database.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = deque(maxlen=size)
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def get(self, versions):
+        """Return the buffered rows, reloading them if versions moved on"""
+        with self._lock:
+            if self._versions == versions:
+                return list(self._entries)
+
+        recent = Transaction.query.options(
+            joinedload(Transaction.item)
+        ).order_by(
+            Transaction.created_at.desc(), Transaction.id.desc()
+        ).limit(self.size).all()
+        entries = [t.to_dict() for t in recent]
+
+        with self._lock:
+            self._entries = deque(entries, maxlen=self.size)
+            self._versions = versions
+        return entries
+
+    def push(self, transactions, versions):
+        """
+        Add rows committed by this worker
+
+        Args:
+            transactions (list): Serialized rows, oldest first
+            versions (dict): Versions returned by the write's bump_versions()
+        """
+        after = tuple(versions[name] for name in RECENT_VERSION_TABLES)
+        before = tuple(version - 1 for version in after)
+        with self._lock:
+            if self._versions != before:
+                self._versions = None
+                return
+            for transaction in transactions:
+                self._entries.appendleft(transaction)
+            self._versions = after
+
+recent_transactions = RecentTransactions(RECENT_TRANSACTIONS)
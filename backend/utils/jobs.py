@@ -0,0 +1,74 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, ScheduledJob
+
+# How often idle workers check whether a job is due
+JOB_POLL_SECONDS = 60
+
+def claim_job(name, interval):
+    """
+    Atomically claim a periodic job if its interval has elapsed
+
+    Every worker process polls; the conditional upsert lets exactly one of
+    them move last_run_at forward, and only that one runs the job.
+
+    Args:
+        name (str): Job name
+        interval (timedelta): Minimum time between two runs
+
+    Returns:
+        bool: True if the caller should run the job now
+    """
+    now = datetime.utcnow()
+    table = ScheduledJob.__table__
+    stmt = sqlite_insert(table).values(name=name, last_run_at=now)
+    claimed = db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={'last_run_at': now},
+        where=table.c.last_run_at <= now - interval
+    ).returning(table.c.name)).first()
+    db.session.commit()
+    return claimed is not None
+
+def schedule_job(app, name, minutes, job, shared=True):
+    """
+    Run job every `minutes` in one of the worker processes
+
+    Starts a daemon thread that polls claim_job(); a non-positive
+    interval disables the job. A plain thread rather than a Socket.IO
+    background task, which never runs under gunicorn's gthread workers
+    without eventlet monkey patching. Jobs that maintain per-process
+    state pass shared=False to run in every worker instead.
+
+    Args:
+        app: Flask application
+        name (str): Job name, unique across jobs
+        minutes (int): Interval between runs
+        job (callable): Called with no arguments inside an app context
+        shared (bool): Claim each run so only one worker performs it
+    """
+    if minutes <= 0:
+        return
+
+    interval = timedelta(minutes=minutes)
+    poll = min(JOB_POLL_SECONDS, interval.total_seconds()) if shared else interval.total_seconds()
+
+    def loop():
+        # Spread the first poll so workers started together don't all contend
+        time.sleep(random.uniform(0, poll))
+        while True:
+            with app.app_context():
+                try:
+                    if not shared or claim_job(name, interval):
+                        job()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"✗ Scheduled job {name} failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(poll)
+
+    threading.Thread(target=loop, name=f'job-{name}', daemon=True).start()
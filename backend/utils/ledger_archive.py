@@ -0,0 +1,223 @@
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, Column, Index, select, insert, delete, func, literal, union_all
+from sqlalchemy.orm import aliased
+from models import db, Transaction
+
+# Transactions older than this many days are moved to yearly archive files
+LEDGER_HOT_DAYS = int(os.getenv('LEDGER_HOT_DAYS', '365'))
+
+# SQLite attaches at most 10 databases per connection by default
+MAX_ATTACHED_ARCHIVES = 9
+
+ARCHIVE_FILE_PATTERN = re.compile(r'^transactions_(\d{4})\.db$')
+ARCHIVE_SUMMARY_USER = 'system:archive'
+# Only meaningful in the hot table; archive files do not carry them
+HOT_ONLY_COLUMNS = ['change_seq']
+
+def archive_dir():
+    """Directory holding the archive files, next to the main database by default"""
+    configured = os.getenv('LEDGER_ARCHIVE_PATH')
+    if configured:
+        return configured
+    return os.path.join(os.path.dirname(db.engine.url.database), 'archive')
+
+def archive_file(period):
+    return os.path.join(archive_dir(), f'transactions_{period}.db')
+
+def period_bounds(period):
+    """Return the [start, end) datetimes covered by a yearly period"""
+    year = int(period)
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+def archived_periods(date_from=None, date_to=None):
+    """List archived periods, oldest first, that overlap [date_from, date_to)"""
+    directory = archive_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    periods = []
+    for filename in sorted(os.listdir(directory)):
+        match = ARCHIVE_FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        start, end = period_bounds(match.group(1))
+        if (date_from is None or date_from < end) and (date_to is None or date_to > start):
+            periods.append(match.group(1))
+    return periods
+
+def _archive_table(schema):
+    """The transactions table as it lives in an attached archive database"""
+    # Same columns and indexes, but no foreign key: items live in the main file
+    hot = Transaction.__table__
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key)
+        for column in hot.columns if column.name not in HOT_ONLY_COLUMNS
+    ]
+    indexes = [
+        Index(index.name, *[column.name for column in index.columns]) for index in hot.indexes
+        if not any(column.name in HOT_ONLY_COLUMNS for column in index.columns)
+    ]
+    return Table(hot.name, MetaData(), *columns, *indexes, schema=schema)
+
+def _ledger_columns(table):
+    return [
+        table.c[column.name] if column.name in table.c else literal(0).label(column.name)
+        for column in Transaction.__table__.columns
+    ]
+
+def hot_ledger():
+    """Entity over the live transactions, without archive summary rows"""
+    hot = Transaction.__table__
+    return aliased(
+        Transaction,
+        select(*_ledger_columns(hot)).where(hot.c.archived_period.is_(None)).subquery('ledger')
+    )
+
+@contextmanager
+def ledger_source(date_from=None, date_to=None, connection=None):
+    """
+    Yield an entity over every ledger row in [date_from, date_to)
+
+    Archive files are attached read-only only when the range reaches back
+    past the hot table; otherwise this is just the hot ledger. Queries must
+    run inside the with-block, before the archives are detached. Archives
+    go on the session's connection unless another connection is given;
+    writers pass their own so they can commit before the detach.
+
+    Raises:
+        ValueError: If the range spans more archives than can be attached
+    """
+    periods = archived_periods(date_from, date_to)
+    if not periods:
+        yield hot_ledger()
+        return
+
+    if len(periods) > MAX_ATTACHED_ARCHIVES:
+        raise ValueError(
+            f'Requested range spans {len(periods)} archived years; '
+            f'narrow it to at most {MAX_ATTACHED_ARCHIVES}'
+        )
+
+    if connection is None:
+        connection = db.session.connection()
+    attached = []
+    try:
+        hot = Transaction.__table__
+        selects = [select(*_ledger_columns(hot)).where(hot.c.archived_period.is_(None))]
+        for period in periods:
+            schema = f'archive_{period}'
+            connection.exec_driver_sql(
+                f'ATTACH DATABASE ? AS {schema}', (f'file:{archive_file(period)}?mode=ro',)
+            )
+            attached.append(schema)
+            selects.append(select(*_ledger_columns(_archive_table(schema))))
+
+        yield aliased(Transaction, union_all(*selects).subquery('ledger'))
+    finally:
+        for schema in attached:
+            connection.exec_driver_sql(f'DETACH DATABASE {schema}')
+
+@contextmanager
+def archived_ledger(period, connection=None):
+    """
+    Yield an entity over the rows of one archive file only
+
+    For readers that walk the archives one at a time instead of attaching
+    all of them at once; like ledger_source, queries must run inside the
+    with-block.
+    """
+    if connection is None:
+        connection = db.session.connection()
+    schema = f'archive_{period}'
+    connection.exec_driver_sql(f'ATTACH DATABASE ? AS {schema}', (f'file:{archive_file(period)}?mode=ro',))
+    try:
+        # The archive table is not the mapped one, so columns are matched by name
+        yield aliased(
+            Transaction, select(*_ledger_columns(_archive_table(schema))).subquery('ledger'), adapt_on_names=True
+        )
+    finally:
+        connection.exec_driver_sql(f'DETACH DATABASE {schema}')
+
+def archive_ledger(hot_days=LEDGER_HOT_DAYS, vacuum=True):
+    """
+    Move transactions older than the hot horizon into yearly archive files
+
+    Whole years before the horizon are copied into transactions_<year>.db,
+    replaced in the hot table by one summary row per item and movement type
+    (so ledger sums still match on-hand stock), and deleted from the hot
+    table, all in one transaction per year.
+
+    Returns:
+        dict: Number of archived rows keyed by period
+    """
+    horizon = datetime.utcnow() - timedelta(days=hot_days)
+    cutoff = datetime(horizon.year, 1, 1)
+    hot = Transaction.__table__
+    pending = hot.c.archived_period.is_(None)
+
+    periods = [row[0] for row in db.session.execute(
+        select(func.strftime('%Y', hot.c.created_at)).where(
+            pending, hot.c.created_at < cutoff
+        ).distinct()
+    )]
+    db.session.commit()
+
+    os.makedirs(archive_dir(), mode=0o700, exist_ok=True)
+    archived = {}
+    for period in sorted(periods):
+        archived[period] = _archive_period(period, pending)
+
+    if archived and vacuum:
+        # Give the freed pages back so backups of the main file shrink
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('VACUUM')
+
+    return archived
+
+def _archive_period(period, pending):
+    """Move one year of hot transactions into its archive file"""
+    start, end = period_bounds(period)
+    hot = Transaction.__table__
+    in_period = [pending, hot.c.created_at >= start, hot.c.created_at < end]
+    schema = f'archive_{period}'
+    path = archive_file(period)
+
+    # A fresh connection: ATTACH is not allowed inside an open transaction
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql(f'ATTACH DATABASE ? AS {schema}', (path,))
+        try:
+            archive = _archive_table(schema)
+            archive.create(connection, checkfirst=True)
+
+            columns = [column.name for column in archive.columns]
+            moved = connection.execute(
+                insert(archive).from_select(columns, select(*[hot.c[name] for name in columns]).where(*in_period))
+            ).rowcount
+
+            connection.execute(insert(hot).from_select(
+                ['item_id', 'transaction_type', 'quantity', 'notes',
+                 'created_at', 'created_by', 'archived_period'],
+                select(
+                    hot.c.item_id,
+                    hot.c.transaction_type,
+                    func.sum(hot.c.quantity),
+                    literal(f'Summary of movements archived to {os.path.basename(path)}'),
+                    literal(start, hot.c.created_at.type),
+                    literal(ARCHIVE_SUMMARY_USER),
+                    literal(period)
+                ).where(*in_period).group_by(hot.c.item_id, hot.c.transaction_type)
+            ))
+
+            connection.execute(delete(hot).where(*in_period))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.exec_driver_sql(f'DETACH DATABASE {schema}')
+
+    os.chmod(path, 0o600)
+    return moved
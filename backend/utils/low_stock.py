@@ -0,0 +1,185 @@
+import os
+import threading
+from flask import current_app
+from models import db, Item
+from utils.analytics_cache import current_versions, read_snapshot
+from utils.notifier import change_rooms
+
+LOW_STOCK_VERIFY_MINUTES = int(os.getenv('LOW_STOCK_VERIFY_MINUTES', '10'))
+
+def is_low(state):
+    """Whether an item_state() is at or below its reorder level"""
+    if state is None:
+        return False
+    _, quantity, _, reorder_level = state
+    return quantity is not None and reorder_level is not None and quantity <= reorder_level
+
+def low_stock_entry(item):
+    """Serialize an item (or a row with the same fields) for the low-stock list"""
+    return {
+        'id': item.id,
+        'name': item.name,
+        'sku': item.sku,
+        'category': item.category,
+        'current_stock': item.quantity,
+        'reorder_level': item.reorder_level,
+        'shortage': item.reorder_level - item.quantity
+    }
+
+class LowStockChanges:
+    """Low-stock set changes collected over one write and published after commit"""
+
+    def __init__(self):
+        self._states = {}
+        self.updates = {}
+        self.crossings = []
+
+    def change(self, item_id, before, after, item=None):
+        """
+        Record an item going from one state to another
+
+        Args:
+            item_id (int): The item's ID
+            before (tuple): item_state() before the write, or None if created
+            after (tuple): item_state() after the write, or None if deleted
+            item (Item): The item itself, if loaded, to avoid looking it up
+        """
+        was_low = self._states[item_id][0] if item_id in self._states else is_low(before)
+        self._states[item_id] = (was_low, after, item)
+
+    def resolve(self):
+        """
+        Build the set updates and crossing events inside the write's transaction
+
+        Only items that are low after the write or cross the threshold
+        need their name and SKU; those not passed in are read with one
+        query.
+        """
+        missing = [
+            item_id for item_id, (was_low, after, item) in self._states.items()
+            if item is None and after is not None and (was_low or is_low(after))
+        ]
+        rows = {}
+        if missing:
+            rows = {row.id: row for row in db.session.execute(db.select(
+                Item.id, Item.name, Item.sku, Item.category, Item.quantity, Item.reorder_level
+            ).where(Item.id.in_(missing)))}
+
+        for item_id, (was_low, after, item) in self._states.items():
+            now_low = is_low(after)
+            entry = low_stock_entry(item or rows[item_id]) if now_low else None
+            self.updates[item_id] = entry
+            if after is not None and was_low != now_low:
+                _, quantity, _, reorder_level = after
+                source = item or rows[item_id]
+                self.crossings.append({
+                    'item_id': item_id,
+                    'name': source.name,
+                    'sku': source.sku,
+                    'category': source.category,
+                    'quantity': quantity,
+                    'reorder_level': reorder_level,
+                    'state': 'low' if now_low else 'ok'
+                })
+
+    def publish(self, versions):
+        """
+        Apply the updates to this worker's set and emit the crossing events
+
+        Each crossing goes to the rooms of its item, its category and
+        resource:item, so only clients watching the item hear about it.
+
+        Args:
+            versions (dict): Versions returned by the write's bump_versions()
+        """
+        low_stock.apply(self.updates, versions['items'])
+        for crossing in self.crossings:
+            rooms = change_rooms('item', crossing['item_id'], categories=[crossing['category']])
+            current_app.socketio.emit('stock_threshold', crossing, to=sorted(rooms))
+
+class LowStockSet:
+    """
+    Thread-safe in-memory set of the items at or below their reorder level
+
+    Like the recent-transactions buffer, the set remembers the items
+    version it reflects. Writes from this worker are applied directly; a
+    write from another worker moves the version on and the next read
+    reloads the set from the database.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the low-stock entries ordered by item ID"""
+        version = current_versions(('items',))[0]
+        with self._lock:
+            if self._version == version:
+                return [self._entries[key] for key in sorted(self._entries)]
+
+        entries = self._load()
+        with self._lock:
+            self._entries = entries
+            self._version = version
+        return [entries[key] for key in sorted(entries)]
+
+    def apply(self, updates, version):
+        """
+        Apply changes committed by this worker
+
+        Args:
+            updates (dict): Entry, or None to remove, keyed by item ID
+            version (int): The items version the write committed
+        """
+        with self._lock:
+            if self._version != version - 1:
+                self._version = None
+                return
+            for item_id, entry in updates.items():
+                if entry is None:
+                    self._entries.pop(item_id, None)
+                else:
+                    self._entries[item_id] = entry
+            self._version = version
+
+    def verify(self):
+        """
+        Compare the set with the database and replace it
+
+        Catches drift from writes that bypass the API. The version and the
+        scan are read in one transaction so they describe the same data.
+
+        Returns:
+            list: IDs of the items whose entry was missing, extra or stale
+        """
+        with read_snapshot():
+            version = current_versions(('items',))[0]
+            entries = self._load()
+
+        with self._lock:
+            drift = []
+            if self._version == version:
+                drift = sorted(
+                    key for key in set(self._entries) | set(entries)
+                    if self._entries.get(key) != entries.get(key)
+                )
+            if self._version is None or self._version <= version:
+                self._entries = entries
+                self._version = version
+        return drift
+
+    def _load(self):
+        rows = db.session.execute(db.select(
+            Item.id, Item.name, Item.sku, Item.category, Item.quantity, Item.reorder_level
+        ).where(Item.quantity <= Item.reorder_level)).all()
+        return {row.id: low_stock_entry(row) for row in rows}
+
+def verify_low_stock():
+    """Scheduled check of this worker's low-stock set"""
+    drift = low_stock.verify()
+    if drift:
+        print(f"⚠ Low-stock set corrected for {len(drift)} items: {drift[:20]}")
+
+low_stock = LowStockSet()
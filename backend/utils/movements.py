@@ -0,0 +1,123 @@
+from models import db, Item, Transaction
+from utils.snapshots import maybe_snapshot, remove_from_snapshots
+from utils.daily_movements import add_daily_movements
+from utils.analytics_cache import bump_versions
+from utils.inventory_stats import StatsDelta, recent_transactions
+from utils.low_stock import LowStockChanges
+from utils.notifier import notifier
+from utils.sync import next_change_seq, record_deletions
+from utils.stock import validate_movement, signed_quantity, apply_stock_change, stock_state_before
+
+def record_movement(data, created_by):
+    """
+    Validate, apply and commit a single stock movement
+
+    Shared by the HTTP and Socket.IO write paths so both behave the same.
+
+    Args:
+        data (dict): Movement with item_id, transaction_type, quantity and optional notes
+        created_by (str): Username recorded on the ledger row
+
+    Returns:
+        tuple: (transaction dict, None, 201) on success or
+        (None, error message, HTTP status code) on failure
+    """
+    error = validate_movement(data)
+    if error:
+        return None, error, 400
+    
+    # Update item quantity with a single conditional UPDATE; OUT movements
+    # only match while the item still holds enough stock
+    quantity = data['quantity']
+    required = quantity if data['transaction_type'] == 'OUT' else 0
+    delta = signed_quantity(data['transaction_type'], quantity)
+    
+    seq = next_change_seq()
+    updated = apply_stock_change(data['item_id'], delta, required=required, change_seq=seq)
+    if updated is None:
+        db.session.rollback()
+        if db.session.get(Item, data['item_id']) is None:
+            return None, 'Resource not found', 404
+        return None, 'Insufficient stock', 400
+    
+    transaction = Transaction(
+        item_id=data['item_id'],
+        transaction_type=data['transaction_type'],
+        quantity=quantity,
+        notes=data.get('notes', ''),
+        created_by=created_by,
+        change_seq=seq
+    )
+    
+    db.session.add(transaction)
+    db.session.flush()
+    maybe_snapshot(transaction.id, transaction.id)
+    add_daily_movements([transaction])
+    before = stock_state_before(updated, delta)
+    stats = StatsDelta()
+    stats.change(before, tuple(updated))
+    stats.apply()
+    low_stock_changes = LowStockChanges()
+    low_stock_changes.change(data['item_id'], before, tuple(updated))
+    low_stock_changes.resolve()
+    versions = bump_versions('items', 'transactions')
+    result = transaction.to_dict()
+    db.session.commit()
+    recent_transactions.push([result], versions)
+    low_stock_changes.publish(versions)
+    notifier.notify('transaction', 'created', transaction.id, data['item_id'], [updated.category])
+    notifier.notify('item', 'updated', data['item_id'], categories=[updated.category])
+    
+    return result, None, 201
+
+def delete_movement(transaction_id):
+    """
+    Delete a ledger row and reverse its effect on stock
+
+    The reversal goes through the same conditional UPDATE as a new
+    movement, so deleting an IN fails rather than taking the item below
+    zero. Daily totals, snapshots, dashboard counters and the sync feed
+    are adjusted in the same transaction.
+
+    Args:
+        transaction_id (int): ID of the ledger row
+
+    Returns:
+        tuple: (None, None, 200) on success or
+        (None, error message, HTTP status code) on failure
+    """
+    transaction = db.session.get(Transaction, transaction_id)
+    if transaction is None:
+        return None, 'Resource not found', 404
+    if transaction.archived_period is not None:
+        return None, 'Archived transactions cannot be deleted', 400
+    
+    delta = -signed_quantity(transaction.transaction_type, transaction.quantity)
+    required = -delta if delta < 0 else 0
+    
+    seq = next_change_seq()
+    updated = apply_stock_change(transaction.item_id, delta, required=required, change_seq=seq)
+    if updated is None:
+        db.session.rollback()
+        return None, 'Insufficient stock', 400
+    
+    item_id = transaction.item_id
+    add_daily_movements([transaction], sign=-1)
+    remove_from_snapshots(transaction)
+    before = stock_state_before(updated, delta)
+    stats = StatsDelta()
+    stats.change(before, tuple(updated))
+    stats.apply()
+    low_stock_changes = LowStockChanges()
+    low_stock_changes.change(item_id, before, tuple(updated))
+    low_stock_changes.resolve()
+    record_deletions('transaction', [transaction_id], seq)
+    db.session.delete(transaction)
+    # No push: the recent-transactions buffer reloads on the version change
+    versions = bump_versions('items', 'transactions')
+    db.session.commit()
+    low_stock_changes.publish(versions)
+    notifier.notify('transaction', 'deleted', transaction_id, item_id, [updated.category])
+    notifier.notify('item', 'updated', item_id, categories=[updated.category])
+    
+    return None, None, 200
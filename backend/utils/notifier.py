@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+import time
+
+NOTIFY_WINDOW_MS = int(os.getenv('NOTIFY_WINDOW_MS', '200'))
+# Frames per second any one client receives at most; changes in between are merged
+NOTIFY_CLIENT_MAX_RATE = float(os.getenv('NOTIFY_CLIENT_MAX_RATE', '2'))
+NOTIFY_EVENT = 'inventory_delta'
+
+# Rooms a client may subscribe to; its role:<role> room is joined on connect
+SUBSCRIBABLE_ROOM = re.compile(r'^(resource:(item|transaction)|item:\d+|category:.+)$')
+ADMIN_ROOM = 'role:admin'
+
+def role_room(role):
+    return f'role:{role}'
+
+def change_rooms(resource, resource_id, item_id=None, categories=()):
+    """
+    Rooms interested in a change: its resource type, its item and the item's categories
+
+    Args:
+        resource (str): 'item' or 'transaction'
+        resource_id (int): ID of the changed row
+        item_id (int, optional): Item a transaction moved; an item is its own
+        categories (iterable, optional): Categories the item is or was in
+
+    Returns:
+        set: Room names
+    """
+    if resource == 'item':
+        item_id = resource_id
+    rooms = {f'resource:{resource}'}
+    if item_id is not None:
+        rooms.add(f'item:{item_id}')
+    rooms.update(f'category:{category}' for category in categories if category)
+    return rooms
+
+def merge_change(previous, action):
+    """
+    Combine two changes to the same row into the one a client needs to see
+
+    A row created and then updated is still new to the client; a deleted
+    row is deleted whatever happened before.
+    """
+    if previous == 'created' and action == 'updated':
+        return 'created'
+    return action
+
+def build_frame(changes, seq, events):
+    """
+    Render merged changes as a delta frame
+
+    Args:
+        changes (dict): Action keyed by (resource, id)
+        seq (int): Sequence number of the newest window included
+        events (int): Number of notifications the frame stands for
+
+    Returns:
+        dict: {'seq', 'events', 'changes': {resource: {action: [ids]}}}
+    """
+    grouped = {}
+    for (resource, resource_id), action in changes.items():
+        grouped.setdefault(resource, {}).setdefault(action, []).append(resource_id)
+    for actions in grouped.values():
+        for ids in actions.values():
+            ids.sort()
+    return {'seq': seq, 'events': events, 'changes': grouped}
+
+class ChangeNotifier:
+    """
+    Coalesces change notifications into periodic delta frames per client
+
+    Write paths call notify() for every row they touch. A background
+    thread closes a window every NOTIFY_WINDOW_MS, deduplicating the
+    window's changes by resource and id, and hands each change only to
+    the clients subscribed to one of its rooms (see change_rooms()), so
+    the work grows with the interested clients rather than with everyone
+    connected. Each of those clients then gets one 'inventory_delta'
+    frame with everything it has not seen yet. A client that got a frame
+    less than 1/NOTIFY_CLIENT_MAX_RATE seconds ago waits, and then
+    receives the changes it missed merged into one frame.
+
+    Each worker only knows its own clients. With a message queue, every
+    worker relays the changes made in it once per window, and the other
+    workers merge them into their next window.
+    """
+
+    def __init__(self, window_ms=NOTIFY_WINDOW_MS, client_max_rate=NOTIFY_CLIENT_MAX_RATE):
+        self.window = window_ms / 1000
+        self.min_interval = 1 / client_max_rate if client_max_rate > 0 else 0
+        self._pending = {}
+        # Changes made in this worker, for the other workers
+        self._outgoing = {}
+        self._relay = None
+        self._seq = 0
+        self._clients = {}
+        self._members = {}
+        # Clients holding changes not sent yet
+        self._due = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._socketio = None
+        self._thread = None
+        self.events_in = 0
+        self.relayed_in = 0
+        self.deliveries = 0
+        self.frames_out = 0
+        self.windows = 0
+
+    def start(self, socketio):
+        """Start the flush thread for this process"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._socketio = socketio
+            manager = socketio.server.manager
+            self._relay = getattr(manager, 'relay', None)
+            if self._relay is not None:
+                manager.on_relay = self.receive
+            self._thread = threading.Thread(target=self._run, name='change-notifier', daemon=True)
+            self._thread.start()
+
+    def notify(self, resource, action, resource_id, item_id=None, categories=()):
+        """
+        Record a change to be sent with the next frames
+
+        Args:
+            resource (str): Resource name, 'item' or 'transaction'
+            action (str): 'created', 'updated' or 'deleted'
+            resource_id (int): ID of the changed row
+            item_id (int, optional): Item a transaction moved
+            categories (iterable, optional): Categories of the item; both
+                the old and the new one when an update moves it
+        """
+        rooms = change_rooms(resource, resource_id, item_id, categories)
+        with self._lock:
+            self._merge(self._pending, (resource, resource_id), action, rooms, 1)
+            if self._relay is not None:
+                self._merge(self._outgoing, (resource, resource_id), action, rooms, 1)
+            self.events_in += 1
+        self._wake.set()
+
+    def receive(self, changes):
+        """Merge changes relayed by another worker into the next window"""
+        with self._lock:
+            for resource, resource_id, action, rooms, events in changes:
+                self._merge(self._pending, (resource, resource_id), action, set(rooms), events)
+            self.relayed_in += len(changes)
+        self._wake.set()
+
+    def _merge(self, pending, key, action, rooms, events):
+        entry = pending.get(key)
+        if entry is None:
+            pending[key] = [action, set(rooms), events]
+        else:
+            entry[0] = merge_change(entry[0], action)
+            entry[1] |= rooms
+            entry[2] += events
+
+    def connect(self, sid):
+        """Register a client; it receives changes for the rooms it subscribes to"""
+        with self._lock:
+            self._clients[sid] = {'rooms': set(), 'changes': {}, 'events': 0, 'sent_at': 0.0}
+
+    def disconnect(self, sid):
+        with self._lock:
+            client = self._clients.pop(sid, None)
+            self._due.discard(sid)
+            for room in client['rooms'] if client else ():
+                self._leave(sid, room)
+
+    def subscribe(self, sid, rooms):
+        """Send a client the changes in these rooms, from the next window on"""
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return
+            for room in rooms:
+                client['rooms'].add(room)
+                self._members.setdefault(room, set()).add(sid)
+
+    def unsubscribe(self, sid, rooms):
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return
+            for room in rooms:
+                if room in client['rooms']:
+                    client['rooms'].discard(room)
+                    self._leave(sid, room)
+
+    def _leave(self, sid, room):
+        members = self._members[room]
+        members.discard(sid)
+        if not members:
+            del self._members[room]
+
+    def stats(self):
+        """Counters of notifications in versus deliveries to clients and frames out"""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'rooms': len(self._members),
+                'events_in': self.events_in,
+                'relayed_in': self.relayed_in,
+                'windows': self.windows,
+                'deliveries': self.deliveries,
+                'frames_out': self.frames_out,
+                'events_per_frame': round(self.events_in / self.frames_out, 2) if self.frames_out else None
+            }
+
+    def _run(self):
+        retry_in = None
+        while True:
+            # Woken by a notification, or when a rate-limited client is due
+            self._wake.wait(retry_in)
+            # Let the window fill before closing it
+            time.sleep(self.window)
+            self._wake.clear()
+            retry_in = self.flush()
+
+    def flush(self, now=None):
+        """
+        Close the current window and send the frames that are due
+
+        Returns:
+            float: Seconds until a rate-limited client is due, or None
+        """
+        now = time.monotonic() if now is None else now
+        sends = []
+        retry_in = None
+        with self._lock:
+            outgoing, self._outgoing = self._outgoing, {}
+            if self._pending:
+                self._seq += 1
+                self.windows += 1
+                window, self._pending = self._pending, {}
+                # Each change goes only to the members of its rooms
+                for key, (action, rooms, events) in window.items():
+                    interested = set()
+                    for room in rooms:
+                        interested |= self._members.get(room, set())
+                    for sid in interested:
+                        client = self._clients[sid]
+                        client['changes'][key] = merge_change(client['changes'].get(key), action)
+                        client['events'] += events
+                    self._due |= interested
+                    self.deliveries += len(interested)
+
+            for sid in list(self._due):
+                client = self._clients[sid]
+                wait = client['sent_at'] + self.min_interval - now
+                if wait > 0:
+                    retry_in = wait if retry_in is None else min(retry_in, wait)
+                    continue
+                sends.append((sid, build_frame(client['changes'], self._seq, client['events'])))
+                client['changes'], client['events'] = {}, 0
+                client['sent_at'] = now
+                self._due.discard(sid)
+            self.frames_out += len(sends)
+
+        if outgoing:
+            self._relay([
+                [resource, resource_id, action, sorted(rooms), events]
+                for (resource, resource_id), (action, rooms, events) in outgoing.items()
+            ])
+        # The clients are this worker's own, so the frames skip the queue
+        for sid, frame in sends:
+            self._socketio.emit(NOTIFY_EVENT, frame, to=sid, ignore_queue=True)
+        return retry_in
+
+notifier = ChangeNotifier()
@@ -0,0 +1,80 @@
+import base64
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE):
+    """Clamp a requested page size to the range 1..MAX_PAGE_SIZE"""
+    if requested is None:
+        requested = default
+    return max(1, min(requested, MAX_PAGE_SIZE))
+
+def encode_cursor(timestamp, row_id):
+    """Encode the (timestamp, id) key of the last row on a page"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_date_range(date_from, date_to):
+    """
+    Parse ISO 8601 'from'/'to' query arguments
+
+    A bare date in 'to' covers that whole day.
+
+    Returns:
+        tuple: (start, end) datetimes, either may be None; end is exclusive
+
+    Raises:
+        ValueError: If either value is not an ISO 8601 date or datetime
+    """
+    try:
+        start = datetime.fromisoformat(date_from) if date_from else None
+        end = None
+        if date_to:
+            end = datetime.fromisoformat(date_to)
+            end += timedelta(days=1) if len(date_to) == 10 else timedelta(microseconds=1)
+    except ValueError:
+        raise ValueError('Invalid date. Use ISO 8601 (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)')
+    return start, end
+
+def keyset_page(query, timestamp_column, id_column, cursor, limit):
+    """
+    Fetch one page of a query ordered newest first by (timestamp, id)
+
+    Args:
+        query: SQLAlchemy query to paginate
+        timestamp_column: Column holding the row timestamp
+        id_column: Primary key column used as tie-breaker
+        cursor (str): Cursor returned with the previous page, or None
+        limit (int): Page size
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if cursor:
+        query = query.filter(tuple_(timestamp_column, id_column) < decode_cursor(cursor))
+
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
@@ -0,0 +1,151 @@
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, delete, insert, and_
+from models import db, Item, DailyMovement, ReorderSuggestion
+from utils.analytics_cache import bump_versions
+
+REORDER_LOOKBACK_DAYS = int(os.getenv('REORDER_LOOKBACK_DAYS', '90'))
+REORDER_LEAD_TIME_DAYS = float(os.getenv('REORDER_LEAD_TIME_DAYS', '7'))
+REORDER_REVIEW_DAYS = float(os.getenv('REORDER_REVIEW_DAYS', '14'))
+# Safety stock in standard deviations of lead-time demand (1.65 ~ 95% service level)
+REORDER_SERVICE_LEVEL_Z = float(os.getenv('REORDER_SERVICE_LEVEL_Z', '1.65'))
+REORDER_CHUNK_SIZE = int(os.getenv('REORDER_CHUNK_SIZE', '20000'))
+REORDER_REFRESH_MINUTES = int(os.getenv('REORDER_REFRESH_MINUTES', '60'))
+
+def _demand_columns(today, lookback_days, chunk_size):
+    """
+    Per-item demand sums over the lookback window, read in id-range chunks
+
+    SQLite reduces the daily OUT totals to one row per item (quantity,
+    age in days, sum and sum of squares of demand); days without
+    movements contribute zeros, so nothing else leaves the database.
+
+    Returns:
+        dict: Equal-length numpy arrays keyed by column name
+    """
+    since = today - timedelta(days=lookback_days)
+    demand = DailyMovement.stock_out
+    # Whole days only, from the later of the window start and the item's
+    # creation; today's movements are still coming in
+    first_day = func.max(since.isoformat(), func.date(Item.created_at))
+    window = and_(DailyMovement.item_id == Item.id, DailyMovement.date >= first_day, DailyMovement.date < today)
+
+    chunks = []
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(
+                Item.id,
+                Item.quantity,
+                func.julianday(today) - func.julianday(func.date(Item.created_at)),
+                func.coalesce(func.sum(demand), 0),
+                func.coalesce(func.sum(demand * demand), 0)
+            ).outerjoin(DailyMovement, window).where(Item.id > last_id)
+            .group_by(Item.id).order_by(Item.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        # Plain tuples: numpy converts Row objects element by element
+        chunks.append(np.array(list(map(tuple, rows)), dtype=np.float64))
+        last_id = rows[-1][0]
+
+    columns = np.concatenate(chunks) if chunks else np.empty((0, 5))
+    item_id, quantity, age_days, total, squares = columns.T
+    return {
+        'item_id': item_id.astype(np.int64),
+        'quantity': np.nan_to_num(quantity),
+        'age_days': np.nan_to_num(age_days, nan=lookback_days),
+        'total': total,
+        'squares': squares
+    }
+
+def compute_reorder_suggestions(today=None, lookback_days=REORDER_LOOKBACK_DAYS,
+                                lead_time_days=REORDER_LEAD_TIME_DAYS, review_days=REORDER_REVIEW_DAYS,
+                                service_level_z=REORDER_SERVICE_LEVEL_Z, chunk_size=REORDER_CHUNK_SIZE):
+    """
+    Demand statistics and reorder suggestions for the whole catalog
+
+    Daily demand is the OUT quantity per UTC day over the lookback window
+    (or since the item was created, if later). The reorder point covers
+    expected lead-time demand plus safety stock; an item at or below it
+    should be ordered up to the reorder point plus one review period of
+    demand.
+
+    Args:
+        today (date): First day not counted, default the current UTC day
+        lookback_days (int): Length of the demand history in days
+        lead_time_days (float): Days between ordering and receiving stock
+        review_days (float): Days of demand one order should cover
+        service_level_z (float): Safety stock in standard deviations
+        chunk_size (int): Number of items read per query
+
+    Returns:
+        dict: Numpy arrays, one entry per item, keyed by column name
+    """
+    today = today or datetime.utcnow().date()
+    columns = _demand_columns(today, lookback_days, chunk_size)
+
+    days = np.clip(np.floor(columns['age_days']), 1, lookback_days)
+    mean = columns['total'] / days
+    # Sample variance including the zero-demand days
+    variance = np.where(
+        days > 1,
+        (columns['squares'] - days * mean * mean) / np.maximum(days - 1, 1),
+        0.0
+    )
+    std = np.sqrt(np.maximum(variance, 0.0))
+
+    quantity = columns['quantity']
+    safety_stock = service_level_z * std * np.sqrt(lead_time_days)
+    reorder_point = np.ceil(mean * lead_time_days + safety_stock)
+    order_up_to = reorder_point + np.ceil(mean * review_days)
+    order_quantity = np.where(quantity <= reorder_point, np.maximum(order_up_to - quantity, 0), 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(mean > 0, np.maximum(quantity, 0) / mean, np.nan)
+
+    return {
+        'item_id': columns['item_id'],
+        'avg_daily_demand': mean,
+        'demand_std': std,
+        'days_of_cover': days_of_cover,
+        'reorder_point': reorder_point.astype(np.int64),
+        'order_up_to': order_up_to.astype(np.int64),
+        'order_quantity': order_quantity.astype(np.int64)
+    }
+
+def refresh_reorder_suggestions():
+    """
+    Recompute the stored demand statistics for every item
+
+    The catalog is read first and the results replace the previous run in
+    one short write transaction. Commits the result.
+
+    Returns:
+        dict: Number of items computed and of items due for reorder
+    """
+    result = compute_reorder_suggestions()
+    computed_at = datetime.utcnow()
+
+    rows = [{
+        'item_id': item_id,
+        'avg_daily_demand': avg,
+        'demand_std': std,
+        'reorder_point': point,
+        'order_up_to': target,
+        'computed_at': computed_at
+    } for item_id, avg, std, point, target in zip(
+        result['item_id'].tolist(),
+        np.round(result['avg_daily_demand'], 3).tolist(),
+        np.round(result['demand_std'], 3).tolist(),
+        result['reorder_point'].tolist(),
+        result['order_up_to'].tolist()
+    )]
+
+    db.session.execute(delete(ReorderSuggestion))
+    if rows:
+        db.session.execute(insert(ReorderSuggestion.__table__), rows)
+    bump_versions('reorder_suggestions')
+    db.session.commit()
+    return {'items': len(rows), 'reorder': int(np.count_nonzero(result['order_quantity']))}
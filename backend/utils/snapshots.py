@@ -0,0 +1,132 @@
+import os
+from datetime import datetime
+from sqlalchemy import func, insert, select, update, literal, case
+from models import db, Item, Transaction, StockSnapshot
+from utils.ledger_archive import ledger_source
+from utils.stock import signed_quantity, signed_quantity_expr
+from utils.pagination import parse_date_range
+
+# Number of ledger rows between automatic snapshots; bounds the replay
+# needed to answer any point-in-time query
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '1000'))
+
+def take_snapshot():
+    """
+    Record the current quantity of every item in one INSERT ... SELECT
+
+    Runs inside the caller's transaction; the caller commits.
+
+    Returns:
+        int: Number of items snapshotted
+    """
+    last_transaction_id = db.session.query(func.max(Transaction.id)).scalar() or 0
+    taken_at = datetime.utcnow()
+
+    result = db.session.execute(
+        insert(StockSnapshot).from_select(
+            ['item_id', 'quantity', 'last_transaction_id', 'taken_at'],
+            select(
+                Item.id,
+                func.coalesce(Item.quantity, 0),
+                literal(last_transaction_id),
+                literal(taken_at, StockSnapshot.taken_at.type)
+            )
+        )
+    )
+    return result.rowcount
+
+def remove_from_snapshots(transaction):
+    """
+    Take a deleted ledger row's movement out of the snapshots that include it
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    db.session.execute(
+        update(StockSnapshot).where(
+            StockSnapshot.item_id == transaction.item_id,
+            StockSnapshot.last_transaction_id >= transaction.id
+        ).values(
+            quantity=StockSnapshot.quantity - signed_quantity(transaction.transaction_type, transaction.quantity)
+        )
+    )
+
+def maybe_snapshot(first_transaction_id, last_transaction_id):
+    """Take a snapshot when a write crosses a multiple of SNAPSHOT_INTERVAL ledger rows"""
+    if last_transaction_id // SNAPSHOT_INTERVAL > (first_transaction_id - 1) // SNAPSHOT_INTERVAL:
+        take_snapshot()
+
+def _snapshot_at(taken_at):
+    """Return {item_id: (quantity, last_transaction_id)} for one snapshot time"""
+    if taken_at is None:
+        return {}
+    rows = db.session.query(
+        StockSnapshot.item_id, StockSnapshot.quantity, StockSnapshot.last_transaction_id
+    ).filter(StockSnapshot.taken_at == taken_at).all()
+    return {row.item_id: (row.quantity, row.last_transaction_id) for row in rows}
+
+def quantities_as_of(as_of):
+    """
+    Compute on-hand quantities at a point in time
+
+    Starts from the nearest snapshot before as_of and replays only the
+    ledger rows between it and the next snapshot, so the cost depends on
+    the snapshot interval rather than the length of the ledger. Items
+    created after the earlier snapshot are replayed backwards from the
+    next snapshot, or from the live quantity if there is none.
+
+    Args:
+        as_of (datetime): Exclusive upper bound; movements before it count
+
+    Returns:
+        dict: Quantity keyed by item ID for items that existed at as_of
+    """
+    before_at = db.session.query(func.max(StockSnapshot.taken_at)).filter(
+        StockSnapshot.taken_at < as_of
+    ).scalar()
+    after_at = db.session.query(func.min(StockSnapshot.taken_at)).filter(
+        StockSnapshot.taken_at >= as_of
+    ).scalar()
+    before = _snapshot_at(before_at)
+    after = _snapshot_at(after_at)
+
+    # Replay window: ledger rows written between the two snapshots
+    low = max((last for _, last in before.values()), default=0)
+    high = min((last for _, last in after.values()), default=None)
+
+    # Archived years are only attached when the window reaches back into
+    # them; without an earlier snapshot only movements since as_of count
+    with ledger_source(before_at or as_of, after_at) as ledger:
+        delta = signed_quantity_expr(ledger)
+        window = db.session.query(
+            ledger.item_id,
+            func.sum(case((ledger.created_at < as_of, delta), else_=0)).label('until'),
+            func.sum(case((ledger.created_at >= as_of, delta), else_=0)).label('since')
+        ).filter(ledger.id > low)
+        if high is not None:
+            window = window.filter(ledger.id <= high)
+        movements = {row.item_id: (row.until or 0, row.since or 0)
+                     for row in window.group_by(ledger.item_id)}
+
+    current = db.session.query(Item.id, Item.quantity).filter(Item.created_at < as_of)
+
+    quantities = {}
+    for item_id, live_quantity in current:
+        until, since = movements.get(item_id, (0, 0))
+        if item_id in before:
+            quantities[item_id] = before[item_id][0] + until
+        elif item_id in after:
+            quantities[item_id] = after[item_id][0] - since
+        else:
+            quantities[item_id] = (live_quantity or 0) - since
+    return quantities
+
+def parse_as_of(value):
+    """
+    Parse an as_of query argument into an exclusive datetime bound
+
+    A bare date means the end of that day.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or datetime
+    """
+    return parse_date_range(None, value)[1]
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+import socketio
+
+# Message queue shared by all worker processes, e.g. redis://redis:6379/0,
+# or sqlite to use a queue file next to the database; unset for one process
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+SOCKETIO_CHANNEL = 'flask-socketio'
+SOCKETIO_QUEUE_POLL_MS = int(os.getenv('SOCKETIO_QUEUE_POLL_MS', '20'))
+# Messages are only needed until every worker has polled them
+SOCKETIO_QUEUE_RETENTION_SECONDS = 60
+SOCKETIO_QUEUE_PRUNE_SECONDS = 10
+
+# Reserved event that carries notifier windows between workers instead of
+# being emitted to clients
+RELAY_EVENT = 'notifier_relay'
+RELAY_NAMESPACE = '/_relay'
+
+class RelayMixin:
+    """
+    Lets the change notifiers of all workers share their windows
+
+    Notifier windows travel over the manager's own channel as emit
+    messages with a reserved event and namespace, which the receiving
+    manager hands to on_relay instead of emitting them, so any pub/sub
+    backend can carry them.
+
+    The listener runs in a plain daemon thread: Socket.IO background
+    tasks never run under gunicorn's gthread workers.
+    """
+
+    on_relay = None
+
+    def initialize(self):
+        # The base Manager setup, without PubSubManager's background task
+        super(socketio.PubSubManager, self).initialize()
+        if not self.write_only:
+            self.thread = threading.Thread(target=self._thread, name='socketio-queue', daemon=True)
+            self.thread.start()
+        self._get_logger().info(self.name + ' backend initialized.')
+
+    def relay(self, data):
+        """Publish data to the other workers' on_relay"""
+        self._publish({
+            'method': 'emit', 'event': RELAY_EVENT, 'data': [data], 'binary': False,
+            'namespace': RELAY_NAMESPACE, 'room': None, 'skip_sid': None,
+            'callback': None, 'host_id': self.host_id
+        })
+
+    def _handle_emit(self, message):
+        if message.get('event') == RELAY_EVENT and message.get('namespace') == RELAY_NAMESPACE:
+            if self.on_relay is not None:
+                self.on_relay(message['data'][0])
+            return
+        super()._handle_emit(message)
+
+class SQLiteManager(RelayMixin, socketio.PubSubManager):
+    """
+    Socket.IO pub/sub backend on a SQLite file, with no extra service
+
+    Published messages are appended to a table; each worker polls for
+    rows newer than the last it has seen every SOCKETIO_QUEUE_POLL_MS
+    and prunes rows older than SOCKETIO_QUEUE_RETENTION_SECONDS. The
+    queue lives in its own file in WAL mode, so publishing never waits
+    for the main database's write lock. All workers must be on one host
+    (or share the file on a filesystem with working locks).
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, channel=SOCKETIO_CHANNEL, write_only=False, logger=None, json=None,
+                 poll_ms=SOCKETIO_QUEUE_POLL_MS):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self._local = threading.local()
+        self.published = 0
+        self.received = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Messages only matter while workers run; no need to survive power loss
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS socketio_messages ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+                'payload TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _publish(self, data):
+        # AUTOINCREMENT never reuses IDs, so pollers can go by id alone
+        self._connection().execute(
+            'INSERT INTO socketio_messages (channel, payload, created_at) VALUES (?, ?, ?)',
+            (self.channel, self.json.dumps(data), time.time())
+        )
+        self.published += 1
+
+    def _listen(self):
+        connection = self._connection()
+        # Start from the end; messages published before this worker started are not for it
+        last_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_messages').fetchone()[0]
+        pruned_at = time.monotonic()
+        while True:
+            rows = connection.execute(
+                'SELECT id, payload FROM socketio_messages WHERE id > ? AND channel = ? ORDER BY id LIMIT 500',
+                (last_id, self.channel)
+            ).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                self.received += 1
+                yield payload
+            if time.monotonic() - pruned_at > SOCKETIO_QUEUE_PRUNE_SECONDS:
+                connection.execute(
+                    'DELETE FROM socketio_messages WHERE created_at < ?',
+                    (time.time() - SOCKETIO_QUEUE_RETENTION_SECONDS,)
+                )
+                pruned_at = time.monotonic()
+            if len(rows) < 500:
+                time.sleep(self.poll_interval)
+
+class RedisRelayManager(RelayMixin, socketio.RedisManager):
+    pass
+
+class KafkaRelayManager(RelayMixin, socketio.KafkaManager):
+    pass
+
+class ZmqRelayManager(RelayMixin, socketio.ZmqManager):
+    pass
+
+class KombuRelayManager(RelayMixin, socketio.KombuManager):
+    pass
+
+def client_manager(url, database_uri, write_only=False):
+    """
+    Build the Socket.IO client manager for a message queue URL
+
+    Args:
+        url (str): redis://, rediss://, kafka://, zmq+tcp://, an AMQP
+            URL for kombu, 'sqlite' for a queue file next to the database
+            or sqlite:///<path> for another file
+        database_uri (str): The app's SQLALCHEMY_DATABASE_URI
+        write_only (bool): Only publish, for processes without clients
+
+    Returns:
+        PubSubManager: The manager, or None without a URL
+
+    Raises:
+        RuntimeError: If the queue's client package is not installed
+    """
+    if not url:
+        return None
+    if url == 'sqlite' or url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):] if url != 'sqlite' else os.path.join(
+            os.path.dirname(database_uri.replace('sqlite:///', '')), 'socketio_queue.db'
+        )
+        return SQLiteManager(path, write_only=write_only)
+    if url.startswith(('redis://', 'rediss://')):
+        manager_class, package = RedisRelayManager, 'redis'
+    elif url.startswith('kafka://'):
+        manager_class, package = KafkaRelayManager, 'kafka-python'
+    elif url.startswith('zmq'):
+        manager_class, package = ZmqRelayManager, 'pyzmq'
+    else:
+        manager_class, package = KombuRelayManager, 'kombu'
+    try:
+        return manager_class(url, channel=SOCKETIO_CHANNEL, write_only=write_only)
+    except RuntimeError:
+        raise RuntimeError(f'SOCKETIO_MESSAGE_QUEUE={url} needs the {package} package (pip install {package})')
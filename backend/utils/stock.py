@@ -0,0 +1,129 @@
+from sqlalchemy import update, case
+from models import db, Item, Transaction
+
+TRANSACTION_TYPES = ['IN', 'OUT']
+
+def validate_movement(data):
+    """
+    Validate a stock movement payload
+
+    Args:
+        data (dict): Movement with item_id, transaction_type and quantity
+
+    Returns:
+        str: An error message, or None if the movement is valid
+    """
+    required = ['item_id', 'transaction_type', 'quantity']
+    if not isinstance(data, dict) or not all(field in data for field in required):
+        return 'Missing required fields'
+
+    item_id = data['item_id']
+    if not isinstance(item_id, int) or isinstance(item_id, bool):
+        return 'Item ID must be an integer'
+
+    if data['transaction_type'] not in TRANSACTION_TYPES:
+        return 'Invalid transaction type. Use IN or OUT'
+
+    quantity = data['quantity']
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return 'Quantity must be a positive integer'
+
+    return None
+
+def validate_stock_level(quantity):
+    """
+    Validate an on-hand quantity set directly on an item
+
+    Args:
+        quantity: Value from the request payload
+
+    Returns:
+        str: An error message, or None if the quantity is valid
+    """
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+        return 'Quantity must be a non-negative integer'
+    return None
+
+def signed_quantity(transaction_type, quantity):
+    """Return the stock delta of a movement (positive for IN, negative for OUT)"""
+    return quantity if transaction_type == 'IN' else -quantity
+
+def signed_quantity_expr(ledger=Transaction):
+    """SQL expression for the stock delta of a transactions row"""
+    return case(
+        (ledger.transaction_type == 'IN', ledger.quantity),
+        else_=-ledger.quantity
+    )
+
+def apply_stock_change(item_id, delta, required=0, change_seq=None):
+    """
+    Atomically change an item's quantity with a single conditional UPDATE
+
+    The check and the write happen in one statement, so concurrent workers
+    can never oversell stock or lose each other's updates:
+    UPDATE items SET quantity = quantity + :delta
+    WHERE id = :item_id AND quantity >= :required
+
+    Args:
+        item_id (int): The ID of the item
+        delta (int): Signed quantity to add to the current stock
+        required (int): Minimum stock the item must hold for the update to apply
+        change_seq (int): Change sequence of the write, stamped on the item
+
+    Returns:
+        Row: The item's category, quantity, price and reorder_level after the
+        update, or None if the item is missing or short
+    """
+    stmt = update(Item).where(Item.id == item_id)
+    if required > 0:
+        stmt = stmt.where(Item.quantity >= required)
+    values = {'quantity': Item.quantity + delta}
+    if change_seq is not None:
+        values['change_seq'] = change_seq
+    stmt = stmt.values(**values).returning(
+        Item.category, Item.quantity, Item.price, Item.reorder_level
+    ).execution_options(synchronize_session=False)
+    return db.session.execute(stmt).first()
+
+def stock_state_before(updated, delta):
+    """The item_state() an item had before apply_stock_change() returned updated"""
+    category, quantity, price, reorder_level = updated
+    return (category, quantity - delta, price, reorder_level)
+
+def plan_movements(lines, stock):
+    """
+    Replay a list of movements against a stock snapshot and aggregate them
+
+    Lines are applied in order per item, so an OUT line only passes if the
+    earlier lines of the same batch leave enough stock for it.
+
+    Args:
+        lines (dict): Validated movements keyed by their position in the request
+        stock (dict): Current quantity keyed by item ID
+
+    Returns:
+        tuple: (errors, plans) where errors maps a line index to an error
+        message and plans maps an item ID to its aggregated 'delta', the
+        'required' starting stock that keeps every step non-negative, and
+        the accepted line 'indexes'
+    """
+    errors = {}
+    plans = {}
+
+    for index, line in sorted(lines.items()):
+        item_id = line['item_id']
+        if item_id not in stock:
+            errors[index] = 'Resource not found'
+            continue
+
+        plan = plans.setdefault(item_id, {'delta': 0, 'required': 0, 'indexes': []})
+        delta = plan['delta'] + signed_quantity(line['transaction_type'], line['quantity'])
+        if stock[item_id] + delta < 0:
+            errors[index] = 'Insufficient stock'
+            continue
+
+        plan['delta'] = delta
+        plan['required'] = max(plan['required'], -delta)
+        plan['indexes'].append(index)
+
+    return errors, plans
@@ -0,0 +1,166 @@
+import base64
+import os
+from sqlalchemy import select, literal, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from models import db, Item, Transaction, SyncTombstone, TableVersion
+from utils.analytics_cache import bump_versions
+
+# Counter in table_versions that numbers every write to items and transactions
+CHANGE_SEQ = 'changes'
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '1000'))
+SYNC_MAX_PAGE_SIZE = 5000
+SYNC_RESOURCES = ['item', 'transaction']
+
+def next_change_seq(connection=None):
+    """
+    Allocate the change sequence number of the caller's write
+
+    The counter is bumped inside the write's transaction. SQLite lets
+    one writer in at a time and the bump holds the write lock until
+    commit, so sequence numbers become visible in the order they were
+    handed out: once N is visible, every write numbered below N is too.
+
+    Returns:
+        int: The sequence number to stamp on the rows the write touches
+    """
+    return bump_versions(CHANGE_SEQ, connection=connection)[CHANGE_SEQ]
+
+def record_deletions(resource_type, ids, seq):
+    """
+    Leave tombstones for deleted rows
+
+    Args:
+        resource_type (str): 'item' or 'transaction'
+        ids: List of IDs, or a SELECT of them
+        seq (int): Change sequence of the delete
+    """
+    table = SyncTombstone.__table__
+    if isinstance(ids, list):
+        if not ids:
+            return
+        stmt = sqlite_insert(table).values([
+            {'resource_type': resource_type, 'resource_id': resource_id, 'change_seq': seq}
+            for resource_id in ids
+        ])
+    else:
+        rows = ids.subquery()
+        stmt = sqlite_insert(table).from_select(
+            ['resource_type', 'resource_id', 'change_seq'],
+            select(literal(resource_type), rows.c[0], literal(seq)).where(rows.c[0].is_not(None))
+        )
+    # SQLite may hand a deleted row's ID out again; the newest delete wins
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.resource_type, table.c.resource_id],
+        set_={'change_seq': stmt.excluded.change_seq}
+    ))
+
+def current_change_seq():
+    return db.session.execute(
+        select(TableVersion.version).where(TableVersion.name == CHANGE_SEQ)
+    ).scalar() or 0
+
+def encode_position(position):
+    """Encode a (seq, source, id) position as an opaque cursor"""
+    return base64.urlsafe_b64encode('|'.join(map(str, position)).encode()).decode()
+
+def decode_position(cursor):
+    """
+    Decode a cursor produced by encode_position
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        seq, source, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return int(seq), int(source), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def _sources(resources):
+    """
+    The feed's sources in their fixed order: (resource, kind, query, seq column, id column)
+
+    Rows written before the feed existed carry sequence 0. Transaction
+    summary rows of archived years are not part of the feed; archived
+    movements stay readable through /api/transactions.
+    """
+    sources = []
+    if 'item' in resources:
+        sources.append(('item', 'row', db.session.query(Item), Item.change_seq, Item.id))
+    if 'transaction' in resources:
+        sources.append(('transaction', 'row', db.session.query(Transaction).options(
+            joinedload(Transaction.item)
+        ).filter(Transaction.archived_period.is_(None)), Transaction.change_seq, Transaction.id))
+    for resource in resources:
+        sources.append((resource, 'deleted', db.session.query(SyncTombstone).filter(
+            SyncTombstone.resource_type == resource
+        ), SyncTombstone.change_seq, SyncTombstone.resource_id))
+    return sources
+
+def _after(seq_column, id_column, index, position):
+    """Rows of source number index that come after position in (seq, source, id) order"""
+    seq, source, row_id = position
+    if index < source:
+        return seq_column > seq
+    if index == source:
+        return tuple_(seq_column, id_column) > (seq, row_id)
+    return seq_column >= seq
+
+def read_changes(since=None, cursor=None, resources=SYNC_RESOURCES, limit=SYNC_PAGE_SIZE):
+    """
+    Read the rows created, updated or deleted after a change sequence number
+
+    Changes are ordered by (seq, source, id), so a page can end in the
+    middle of a large write and the next one picks up right after it.
+    Every page is cut at the sequence number read first: rows a later
+    write touches in the meantime carry a higher number and come with
+    the next sync instead.
+
+    Args:
+        since (int): Last sequence number the client has applied; None
+            for everything
+        cursor (str): next_cursor of the previous page, instead of since
+        resources (list): Any of 'item' and 'transaction'
+        limit (int): Maximum number of changes in the page
+
+    Returns:
+        dict: {'seq', 'next_cursor', 'items', 'transactions',
+        'deleted': {resource: [ids]}}; a client stores seq once
+        next_cursor is None
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    sources = _sources(resources)
+    if cursor:
+        position = decode_position(cursor)
+    else:
+        # After every source at since, or before everything
+        position = (since if since is not None else -1, len(sources), 0)
+
+    seq = current_change_seq()
+    merged = []
+    for index, (resource, kind, query, seq_column, id_column) in enumerate(sources):
+        rows = query.filter(
+            _after(seq_column, id_column, index, position), seq_column <= seq
+        ).order_by(seq_column, id_column).limit(limit + 1).all()
+        merged.extend(
+            ((getattr(row, seq_column.key), index, getattr(row, id_column.key)), resource, kind, row)
+            for row in rows
+        )
+    merged.sort(key=lambda change: change[0])
+
+    page = {
+        'seq': seq,
+        'next_cursor': encode_position(merged[limit - 1][0]) if len(merged) > limit else None,
+        'items': [],
+        'transactions': [],
+        'deleted': {resource: [] for resource in resources}
+    }
+    for _, resource, kind, row in merged[:limit]:
+        if kind == 'deleted':
+            page['deleted'][resource].append(row.resource_id)
+        else:
+            page[f'{resource}s'].append(row.to_dict())
+    return page
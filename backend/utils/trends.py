@@ -0,0 +1,155 @@
+import numpy as np
+from datetime import datetime, timedelta
+from sqlalchemy import func, case, cast, select, Integer
+from models import db, Item, DailyMovement
+from utils.ledger_archive import ledger_source
+from utils.snapshots import quantities_as_of
+
+GRANULARITIES = ['hour', 'day', 'week', 'month']
+DEFAULT_RANGE_DAYS = 30
+DEFAULT_WINDOW = 7
+MAX_BUCKETS = 10000
+
+# Bucket arithmetic is done on numpy datetime64 values of this unit
+_UNITS = {'hour': 'h', 'day': 'D', 'week': 'D', 'month': 'M'}
+
+def _floor(values, granularity):
+    """Round datetime64 values down to the start of their bucket"""
+    values = values.astype(f'datetime64[{_UNITS[granularity]}]')
+    if granularity == 'week':
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        days = values.astype(np.int64)
+        values = values - ((days + 3) % 7).astype('timedelta64[D]')
+    return values
+
+def _bucket_axis(start, end, granularity):
+    """Every bucket start covering [start, end), gaps included"""
+    first = _floor(np.array([start], dtype='datetime64[us]'), granularity)[0]
+    last = _floor(np.array([end - timedelta(microseconds=1)], dtype='datetime64[us]'), granularity)[0]
+    step = 7 if granularity == 'week' else 1
+    return np.arange(first, last + step, step)
+
+def _movement_arrays(start, end, granularity, items, filtered):
+    """
+    Fetch (time, stock_in, stock_out) arrays for [start, end) in one query
+
+    Day and coarser granularities read the daily_movements totals; hourly
+    trends group the ledger itself by hour, attaching archives if needed.
+    Only the grouped totals leave SQLite, one row per hour or day.
+    """
+    if granularity == 'hour':
+        with ledger_source(start, end) as ledger:
+            hour = cast(func.strftime('%s', ledger.created_at), Integer) / 3600
+            query = db.session.query(
+                hour,
+                func.sum(case((ledger.transaction_type == 'IN', ledger.quantity), else_=0)),
+                func.sum(case((ledger.transaction_type == 'OUT', ledger.quantity), else_=0))
+            ).filter(
+                ledger.created_at >= start, ledger.created_at < end, ledger.item_id.in_(items)
+            )
+            # Like daily_movements, only items that still exist
+            rows = query.group_by(hour).all()
+        times = np.array([row[0] for row in rows], dtype=np.int64).astype('datetime64[h]')
+    else:
+        query = db.session.query(
+            DailyMovement.date,
+            func.sum(DailyMovement.stock_in),
+            func.sum(DailyMovement.stock_out)
+        ).filter(
+            DailyMovement.date >= start.date(),
+            DailyMovement.date <= (end - timedelta(microseconds=1)).date()
+        )
+        if filtered:
+            query = query.filter(DailyMovement.item_id.in_(items))
+        rows = query.group_by(DailyMovement.date).all()
+        times = np.array([row[0] for row in rows], dtype='datetime64[D]')
+
+    stock_in = np.array([row[1] or 0 for row in rows], dtype=np.int64)
+    stock_out = np.array([row[2] or 0 for row in rows], dtype=np.int64)
+    return times, stock_in, stock_out
+
+def _rolling_mean(values, window):
+    """Trailing mean over up to `window` buckets (shorter at the start)"""
+    sums = np.concatenate(([0], np.cumsum(values, dtype=np.float64)))
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    return (sums[upper] - sums[lower]) / (upper - lower)
+
+def stock_trends(start=None, end=None, granularity='day', item_id=None, category=None, window=DEFAULT_WINDOW):
+    """
+    Bucketed stock movements with gap filling, rolling averages and balances
+
+    Buckets without movements are reported with zeros. The running
+    balance starts from the on-hand quantity of the selected items at the
+    first bucket (from the stock snapshots) and adds each bucket's net
+    change.
+
+    Args:
+        start (datetime): Range start, default DEFAULT_RANGE_DAYS before end
+        end (datetime): Exclusive range end, default now
+        granularity (str): 'hour', 'day', 'week' or 'month'
+        item_id (int): Only movements of this item
+        category (str): Only movements of items in this category
+        window (int): Number of buckets in the rolling averages
+
+    Returns:
+        list: One dict per bucket, oldest first
+
+    Raises:
+        ValueError: If the arguments are invalid or the range has too many buckets
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Invalid granularity. Use {', '.join(GRANULARITIES)}")
+    if window < 1:
+        raise ValueError('Window must be a positive integer')
+
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS)
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+
+    axis = _bucket_axis(start, end, granularity)
+    if len(axis) > MAX_BUCKETS:
+        raise ValueError(f'Range spans {len(axis)} buckets; use a coarser granularity or a shorter range')
+
+    # Whole buckets: the first one may start before the requested time
+    start = axis[0].astype('datetime64[us]').item()
+
+    items = select(Item.id)
+    if item_id is not None:
+        items = items.where(Item.id == item_id)
+    if category:
+        items = items.where(Item.category == category)
+    filtered = item_id is not None or bool(category)
+
+    times, stock_in, stock_out = _movement_arrays(start, end, granularity, items, filtered)
+
+    # Scatter the fetched rows into the gap-filled bucket axis
+    step = 7 if granularity == 'week' else 1
+    index = ((_floor(times, granularity) - axis[0]).astype(np.int64) // step)
+    stock_in = np.bincount(index, weights=stock_in, minlength=len(axis)).astype(np.int64)
+    stock_out = np.bincount(index, weights=stock_out, minlength=len(axis)).astype(np.int64)
+    net_change = stock_in - stock_out
+
+    opening = quantities_as_of(start)
+    if filtered:
+        opening = {key: opening[key] for key in db.session.scalars(items) if key in opening}
+    balance = sum(opening.values()) + np.cumsum(net_change)
+
+    unit = 's' if granularity == 'hour' else 'D'
+    labels = np.datetime_as_string(axis.astype(f'datetime64[{unit}]'), unit=unit)
+
+    return [{
+        'date': label,
+        'stock_in': int(bucket_in),
+        'stock_out': int(bucket_out),
+        'net_change': int(net),
+        'stock_in_avg': round(float(avg_in), 2),
+        'stock_out_avg': round(float(avg_out), 2),
+        'net_change_avg': round(float(avg_net), 2),
+        'balance': int(running)
+    } for label, bucket_in, bucket_out, net, avg_in, avg_out, avg_net, running in zip(
+        labels.tolist(), stock_in.tolist(), stock_out.tolist(), net_change.tolist(),
+        _rolling_mean(stock_in, window).tolist(), _rolling_mean(stock_out, window).tolist(),
+        _rolling_mean(net_change, window).tolist(), balance.tolist()
+    )]
@@ -16,6 +16,7 @@ from dotenv import load_dotenv
 
 # Import backup utilities directly (standalone implementation)
 from backup_utils import create_backup, restore_backup
+from reconcile_utils import reconcile_stock
 
 # Load environment variables
 load_dotenv()
@@ -27,6 +28,7 @@ GPG_PASSPHRASE = os.getenv('GPG_PASSPHRASE', 'default_passphrase')
 API_URL = os.getenv('API_URL', 'http://backend:5000/api')
 BACKUP_RETENTION_DAYS = int(os.getenv('BACKUP_RETENTION_DAYS', '30'))
 HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', '300'))  # 5 minutes
+RECONCILE_PATH = os.getenv('RECONCILE_PATH', '/app/logs/reconciliation')
 
 # Setup logging
 logging.basicConfig(
@@ -48,6 +50,7 @@ class InvGuardBackupService:
         self.backup_path = BACKUP_PATH
         self.gpg_passphrase = GPG_PASSPHRASE
         self.retention_days = BACKUP_RETENTION_DAYS
+        self.reconcile_path = RECONCILE_PATH
         
         # Ensure directories exist
         os.makedirs(self.backup_path, exist_ok=True)
@@ -212,6 +215,36 @@ class InvGuardBackupService:
         # Cleanup old backups
         self.cleanup_old_backups()
     
+    def reconciliation_job(self, rescan: bool = False):
+        """Daily stock reconciliation job (on-hand quantities vs. transaction ledger)"""
+        logger.info("Starting stock reconciliation...")
+        
+        try:
+            # The database volume is read-only here; the checkpoint and
+            # reports live under the reconciliation directory
+            result = reconcile_stock(self.db_path, self.reconcile_path, rescan=rescan)
+            
+            scan = "full scan" if result['full_rescan'] else "incremental"
+            logger.info(
+                f"Reconciliation checked {result['items_checked']} items, "
+                f"{result['rows_scanned']} new ledger rows ({scan})"
+            )
+            
+            if result['discrepancies']:
+                self.send_notification(
+                    f"Stock reconciliation found {result['discrepancies']} items that differ "
+                    f"from the ledger. Report: {result['report']}",
+                    "WARNING"
+                )
+            else:
+                logger.info("Stock reconciliation passed: on-hand stock matches the ledger")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error during stock reconciliation: {e}")
+            self.send_notification(f"Stock reconciliation failed: {e}", "ERROR")
+            return None
+    
     def hourly_health_check_job(self):
         """Hourly health check job"""
         logger.info("Starting hourly health check...")
@@ -250,6 +283,7 @@ class InvGuardBackupService:
         
         # Schedule jobs
         schedule.every().day.at("02:00").do(self.daily_backup_job)
+        schedule.every().day.at("01:00").do(self.reconciliation_job)
         schedule.every().hour.do(self.hourly_health_check_job)
         schedule.every().sunday.at("03:00").do(self.weekly_maintenance_job)
         
@@ -258,6 +292,7 @@ class InvGuardBackupService:
         
         logger.info("Scheduler started. Jobs scheduled:")
         logger.info("- Daily backup: 02:00")
+        logger.info("- Daily stock reconciliation: 01:00")
         logger.info("- Hourly health check: Every hour")
         logger.info("- Weekly maintenance: Sunday 03:00")
         
@@ -287,6 +322,10 @@ def main():
     elif len(sys.argv) > 1 and sys.argv[1] == "cleanup":
         logger.info("Running cleanup...")
         backup_service.cleanup_old_backups()
+    elif len(sys.argv) > 1 and sys.argv[1] == "reconcile":
+        logger.info("Running stock reconciliation...")
+        result = backup_service.reconciliation_job(rescan="--rescan" in sys.argv[2:])
+        sys.exit(0 if result is not None else 1)
     elif len(sys.argv) > 1 and sys.argv[1] == "health":
         logger.info("Running health check...")
         if backup_service.health_check():
@@ -23,6 +23,9 @@ API_URL = os.getenv('API_URL', 'http://backend:5000/api')
 BACKUP_RETENTION_DAYS = int(os.getenv('BACKUP_RETENTION_DAYS', '30'))
 HEALTH_CHECK_INTERVAL = int(os.getenv('HEALTH_CHECK_INTERVAL', '300'))
 
+# Reconciliation Configuration
+RECONCILE_PATH = os.getenv('RECONCILE_PATH', '/app/logs/reconciliation')
+
 # Monitoring Configuration
 ALERT_THRESHOLDS = {
     'low_stock_percentage': 0.1,  # Alert if more than 10% of items are low stock
@@ -39,6 +42,7 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 # Schedule Configuration
 SCHEDULE_CONFIG = {
     'daily_backup_time': '02:00',
+    'daily_reconcile_time': '01:00',
     'weekly_maintenance_day': 'sunday',
     'weekly_maintenance_time': '03:00',
     'monthly_check_day': 1,
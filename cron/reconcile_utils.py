@@ -0,0 +1,181 @@
+"""
+Standalone stock reconciliation for InvGuard Cron Service
+This module compares on-hand quantities with the transaction ledger without depending on backend modules.
+"""
+
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+RECONCILE_CHUNK_SIZE = 50000
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_transaction_id INTEGER NOT NULL,
+    rows_counted INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger_balances (
+    item_id INTEGER PRIMARY KEY,
+    quantity INTEGER NOT NULL
+);
+"""
+
+# One grouped aggregate per chunk of ledger ids; only per-item sums leave SQLite
+CHUNK_AGGREGATE = """
+SELECT item_id,
+       SUM(CASE WHEN transaction_type = 'IN' THEN quantity ELSE -quantity END),
+       COUNT(*)
+FROM inventory.transactions
+WHERE id > ? AND id <= ?
+GROUP BY item_id
+"""
+
+ADD_TO_BALANCE = """
+INSERT INTO ledger_balances (item_id, quantity) VALUES (?, ?)
+ON CONFLICT(item_id) DO UPDATE SET quantity = quantity + excluded.quantity
+"""
+
+DISCREPANCIES = """
+SELECT i.id, i.sku, i.name, COALESCE(i.quantity, 0), COALESCE(b.quantity, 0)
+FROM inventory.items AS i
+LEFT JOIN ledger_balances AS b ON b.item_id = i.id
+WHERE COALESCE(i.quantity, 0) != COALESCE(b.quantity, 0)
+ORDER BY i.id
+"""
+
+REPORT_HEADER = ['item_id', 'sku', 'name', 'on_hand', 'ledger', 'difference']
+
+def reconcile_stock(db_path, work_dir, chunk_size=RECONCILE_CHUNK_SIZE, rescan=False, sample_size=10):
+    """
+    Compare every item's on-hand quantity with the sum of its ledger rows
+
+    The ledger is read in id-range chunks and folded into per-item running
+    sums kept in a checkpoint database under work_dir, so a rerun only
+    aggregates rows added since the last run. A full rescan happens when
+    rows at or below the checkpoint have disappeared (deleted transactions,
+    deleted items or archived years). The inventory database is opened
+    read-only.
+
+    Args:
+        db_path (str): Path to the inventory database
+        work_dir (str): Directory for the checkpoint database and reports
+        chunk_size (int): Number of ledger ids aggregated per statement
+        rescan (bool): Discard the checkpoint and start from the first row
+        sample_size (int): Number of discrepancies to include in the result
+
+    Returns:
+        dict: Summary with the number of items checked, discrepancies found,
+        ledger rows scanned, a sample of discrepancies and the CSV report path
+        (None when stock and ledger agree)
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f'Database file not found: {db_path}')
+
+    os.makedirs(work_dir, exist_ok=True)
+    conn = sqlite3.connect(
+        os.path.join(work_dir, 'reconciliation_state.db'),
+        isolation_level=None, timeout=30, uri=True
+    )
+    try:
+        conn.executescript(STATE_SCHEMA)
+        conn.execute('ATTACH DATABASE ? AS inventory', (f'file:{db_path}?mode=ro',))
+
+        last_id, rows_counted = _load_checkpoint(conn)
+        full_rescan = rescan or last_id == 0 or _rows_up_to(conn, last_id) != rows_counted
+        if full_rescan:
+            last_id, rows_counted = 0, 0
+        scanned_from = rows_counted
+
+        # Bulk of the ledger: each chunk commits with its checkpoint, so an
+        # interrupted run resumes where it stopped
+        target = conn.execute('SELECT COALESCE(MAX(id), 0) FROM inventory.transactions').fetchone()[0]
+        conn.execute('BEGIN')
+        if full_rescan:
+            conn.execute('DELETE FROM ledger_balances')
+            _save_checkpoint(conn, 0, 0)
+        conn.execute('COMMIT')
+
+        while last_id < target:
+            upper = min(last_id + chunk_size, target)
+            conn.execute('BEGIN')
+            rows_counted += _fold_chunk(conn, last_id, upper)
+            _save_checkpoint(conn, upper, rows_counted)
+            conn.execute('COMMIT')
+            last_id = upper
+
+        # Catch up with movements written meanwhile and compare, all in one
+        # read transaction so on-hand and ledger are seen at the same moment
+        conn.execute('BEGIN')
+        try:
+            target = conn.execute('SELECT COALESCE(MAX(id), 0) FROM inventory.transactions').fetchone()[0]
+            if target > last_id:
+                rows_counted += _fold_chunk(conn, last_id, target)
+                last_id = target
+                _save_checkpoint(conn, last_id, rows_counted)
+
+            items_checked = conn.execute('SELECT COUNT(*) FROM inventory.items').fetchone()[0]
+            report, found, sample = _write_report(conn.execute(DISCREPANCIES), work_dir, sample_size)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return {
+            'items_checked': items_checked,
+            'discrepancies': found,
+            'rows_scanned': rows_counted - scanned_from,
+            'last_transaction_id': last_id,
+            'full_rescan': full_rescan,
+            'sample': sample,
+            'report': report
+        }
+    finally:
+        conn.close()
+
+def _load_checkpoint(conn):
+    row = conn.execute('SELECT last_transaction_id, rows_counted FROM checkpoint WHERE id = 1').fetchone()
+    return row if row else (0, 0)
+
+def _save_checkpoint(conn, last_id, rows_counted):
+    conn.execute(
+        'INSERT OR REPLACE INTO checkpoint (id, last_transaction_id, rows_counted, updated_at) '
+        'VALUES (1, ?, ?, ?)',
+        (last_id, rows_counted, datetime.utcnow().isoformat())
+    )
+
+def _rows_up_to(conn, last_id):
+    """Count ledger rows already folded into the balances (answered from the primary key)"""
+    return conn.execute('SELECT COUNT(*) FROM inventory.transactions WHERE id <= ?', (last_id,)).fetchone()[0]
+
+def _fold_chunk(conn, low, high):
+    """Add the ledger rows with low < id <= high to the running balances"""
+    groups = conn.execute(CHUNK_AGGREGATE, (low, high)).fetchall()
+    conn.executemany(ADD_TO_BALANCE, [(item_id, delta) for item_id, delta, _ in groups])
+    return sum(count for _, _, count in groups)
+
+def _write_report(rows, work_dir, sample_size):
+    """Stream discrepancy rows into a timestamped CSV report"""
+    report = None
+    found = 0
+    sample = []
+    handle = None
+    try:
+        for item_id, sku, name, on_hand, ledger in rows:
+            if handle is None:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                report = os.path.join(work_dir, f'reconciliation_{timestamp}.csv')
+                handle = open(report, 'w', newline='')
+                writer = csv.writer(handle)
+                writer.writerow(REPORT_HEADER)
+            line = [item_id, sku, name, on_hand, ledger, on_hand - ledger]
+            writer.writerow(line)
+            found += 1
+            if len(sample) < sample_size:
+                sample.append(dict(zip(REPORT_HEADER, line)))
+    finally:
+        if handle is not None:
+            handle.close()
+    return report, found, sample
@@ -16,22 +16,40 @@ export const useSocket = () => useContext(SocketContext);
 export const SocketProvider = ({ children }) => {
     const socket = io(getWebSocketUrl(), {
         transports: ['websocket'],
-        autoConnect: true
+        autoConnect: true,
+        auth: { token: localStorage.getItem('token') }
     });
 
     useEffect(() => {
         socket.on('connect', () => {
             console.log('Connected to WebSocket');
+            // Rooms are per connection, so subscribe again after a reconnect
+            socket.emit('subscribe', { rooms: ['resource:item', 'resource:transaction'] });
         });
 
-        socket.on('inventory_update', (data) => {
-            const { type, action, resource_id, audit } = data;
-            
-            // Show toast notification
-            const message = `${action} ${type.split('_')[0]} #${resource_id}`;
-            toast(message, {
-                icon: action === 'CREATE' ? '➕' : action === 'UPDATE' ? '📝' : '❌'
+        // Changes arrive coalesced: one frame per flush window, ids grouped
+        // by resource and action, at most a couple of frames per second
+        socket.on('inventory_delta', (frame) => {
+            const parts = [];
+            Object.entries(frame.changes).forEach(([resource, actions]) => {
+                Object.entries(actions).forEach(([action, ids]) => {
+                    parts.push(ids.length === 1
+                        ? `${resource} #${ids[0]} ${action}`
+                        : `${ids.length} ${resource}s ${action}`);
+                });
             });
+            if (parts.length > 0) {
+                toast(parts.join(', '), { icon: '🔄' });
+            }
+        });
+
+        // Sent only when an item crosses its reorder level
+        socket.on('stock_threshold', (data) => {
+            const { name, sku, quantity, reorder_level, state } = data;
+            const message = state === 'low'
+                ? `${name} (${sku}) is low on stock: ${quantity} left, reorder level ${reorder_level}`
+                : `${name} (${sku}) is back above its reorder level`;
+            toast(message, { icon: state === 'low' ? '⚠️' : '✅' });
         });
 
         return () => {
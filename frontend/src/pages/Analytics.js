@@ -25,26 +25,18 @@ function Analytics() {
       const token = localStorage.getItem('token');
       const headers = { Authorization: `Bearer ${token}` };
 
-      const [
-        lowStockResponse,
-        categoryResponse,
-        trendsResponse,
-        topItemsResponse,
-        dashboardResponse
-      ] = await Promise.all([
-        axios.get(`${API_URL}/analytics/low-stock`, { headers }),
-        axios.get(`${API_URL}/analytics/category-summary`, { headers }),
-        axios.get(`${API_URL}/analytics/stock-trends`, { headers }),
-        axios.get(`${API_URL}/analytics/top-items`, { headers }),
-        axios.get(`${API_URL}/analytics/dashboard`, { headers })
-      ]);
+      // One request for every section, computed from one read snapshot
+      const response = await axios.get(`${API_URL}/analytics/bundle`, {
+        headers,
+        params: { sections: 'low-stock,category-summary,stock-trends,top-items,dashboard' }
+      });
 
       setAnalyticsData({
-        lowStockItems: lowStockResponse.data,
-        categorySummary: categoryResponse.data,
-        stockTrends: trendsResponse.data,
-        topItems: topItemsResponse.data,
-        dashboardStats: dashboardResponse.data
+        lowStockItems: response.data['low-stock'],
+        categorySummary: response.data['category-summary'],
+        stockTrends: response.data['stock-trends'],
+        topItems: response.data['top-items'],
+        dashboardStats: response.data['dashboard']
       });
     } catch (error) {
       console.error('Error fetching analytics data:', error);
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useMemo } from 'react';
 import axios from 'axios';
 import config from '../config';
 import { toast } from 'react-hot-toast';
+import { useSocket } from '../components/SocketProvider';
 
 const AuditLog = () => {
     const [logs, setLogs] = useState([]);
@@ -18,11 +19,24 @@ const AuditLog = () => {
     });
     const [viewMode, setViewMode] = useState('table'); // 'table' or 'timeline'
     const [selectedLog, setSelectedLog] = useState(null);
+    const socket = useSocket();
 
     useEffect(() => {
         fetchLogs();
     }, []);
 
+    // New records arrive in the admin room as they are written
+    useEffect(() => {
+        if (!socket) return undefined;
+        const handleRecords = ({ records }) => {
+            setLogs((current) => [...records.reverse(), ...current]);
+        };
+        socket.on('audit_records', handleRecords);
+        return () => {
+            socket.off('audit_records', handleRecords);
+        };
+    }, [socket]);
+
     const fetchLogs = async () => {
         try {
             const response = await axios.get(`${config.API_URL}/audit`, {
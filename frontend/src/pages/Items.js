@@ -1,12 +1,15 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import ItemTable from '../components/ItemTable';
+import { fetchChanges, applyChanges } from '../sync';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
 function Items({ user }) {
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Change sequence the list reflects; null until the first load
+  const seq = useRef(null);
   const [showModal, setShowModal] = useState(false);
   const [editingItem, setEditingItem] = useState(null);
   const [formData, setFormData] = useState({
@@ -23,13 +26,12 @@ function Items({ user }) {
     fetchItems();
   }, []);
 
+  // The first call loads every item; later ones only what changed since
   const fetchItems = async () => {
     try {
-      const token = localStorage.getItem('token');
-      const response = await axios.get(`${API_URL}/items`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setItems(response.data);
+      const changes = await fetchChanges(API_URL, seq.current, ['item']);
+      setItems((current) => applyChanges(current, changes.items, changes.deleted.item));
+      seq.current = changes.seq;
     } catch (error) {
       console.error('Error fetching items:', error);
     } finally {
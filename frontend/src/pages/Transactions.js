@@ -1,6 +1,7 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 import axios from 'axios';
 import { toast } from 'react-hot-toast';
+import { fetchChanges, applyChanges } from '../sync';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
 
@@ -8,6 +9,8 @@ function Transactions({ user }) {
   const [transactions, setTransactions] = useState([]);
   const [items, setItems] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Change sequence the lists reflect; null until the items are loaded
+  const seq = useRef(null);
   const [showModal, setShowModal] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [formData, setFormData] = useState({
@@ -27,9 +30,12 @@ function Transactions({ user }) {
   });
 
   useEffect(() => {
-    fetchTransactions();
     fetchItems();
-  }, [filters]);
+  }, []);
+
+  useEffect(() => {
+    fetchTransactions();
+  }, [filters, dateRange]);
 
   const fetchTransactions = async () => {
     try {
@@ -39,6 +45,8 @@ function Transactions({ user }) {
       if (filters.item_id) params.append('item_id', filters.item_id);
       if (filters.type) params.append('type', filters.type);
       if (filters.limit) params.append('limit', filters.limit);
+      if (dateRange.start) params.append('from', dateRange.start);
+      if (dateRange.end) params.append('to', dateRange.end);
 
       const response = await axios.get(`${API_URL}/transactions?${params}`, {
         headers: { Authorization: `Bearer ${token}` }
@@ -54,17 +62,49 @@ function Transactions({ user }) {
 
   const fetchItems = async () => {
     try {
-      const token = localStorage.getItem('token');
-      const response = await axios.get(`${API_URL}/items`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setItems(response.data);
+      const changes = await fetchChanges(API_URL, null, ['item']);
+      setItems(changes.items);
+      seq.current = changes.seq;
     } catch (error) {
       console.error('Error fetching items:', error);
       toast.error('Failed to load items');
     }
   };
 
+  // After a write, fetch only what changed instead of both full lists
+  const syncChanges = async () => {
+    if (seq.current === null || dateRange.start || dateRange.end) {
+      fetchTransactions();
+      fetchItems();
+      return;
+    }
+    try {
+      const changes = await fetchChanges(API_URL, seq.current, ['item', 'transaction']);
+      seq.current = changes.seq;
+      setItems((current) => applyChanges(current, changes.items, changes.deleted.item));
+      const added = changes.transactions.filter((t) =>
+        (!filters.item_id || t.item_id === parseInt(filters.item_id)) &&
+        (!filters.type || t.transaction_type === filters.type)
+      );
+      const deleted = new Set(changes.deleted.transaction);
+      setTransactions((current) => {
+        // Tombstones first, then upsert by ID, like applyChanges: a row
+        // in this batch may carry the ID of one deleted in it
+        const changed = new Map(added.map((t) => [t.id, t]));
+        const kept = current
+          .filter((t) => !deleted.has(t.id))
+          .map((t) => changed.get(t.id) || t);
+        const known = new Set(kept.map((t) => t.id));
+        const merged = [...added.filter((t) => !known.has(t.id)).reverse(), ...kept];
+        return filters.limit ? merged.slice(0, filters.limit) : merged;
+      });
+    } catch (error) {
+      console.error('Error syncing changes:', error);
+      fetchTransactions();
+      fetchItems();
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     
@@ -100,8 +140,7 @@ function Transactions({ user }) {
         quantity: 0,
         notes: ''
       });
-      fetchTransactions();
-      fetchItems();
+      syncChanges();
     } catch (error) {
       toast.error(error.response?.data?.message || 'Failed to create transaction');
     }
@@ -132,8 +171,7 @@ function Transactions({ user }) {
         headers: { Authorization: `Bearer ${token}` }
       });
       toast.success('Transaction deleted successfully');
-      fetchTransactions();
-      fetchItems();
+      syncChanges();
     } catch (error) {
       toast.error(error.response?.data?.message || 'Failed to delete transaction');
     }
@@ -0,0 +1,32 @@
+import axios from 'axios';
+
+// Fetch the changes after a sequence number from /api/sync, following the
+// cursor until the page is complete. With since null it returns every row.
+export const fetchChanges = async (apiUrl, since, resources) => {
+  const token = localStorage.getItem('token');
+  const result = { seq: since, items: [], transactions: [], deleted: { item: [], transaction: [] } };
+  let cursor = null;
+  do {
+    const params = new URLSearchParams({ resources: resources.join(',') });
+    if (cursor) params.append('cursor', cursor);
+    else if (since !== null) params.append('since', since);
+
+    const { data } = await axios.get(`${apiUrl}/sync?${params}`, {
+      headers: { Authorization: `Bearer ${token}` }
+    });
+    result.items.push(...data.items);
+    result.transactions.push(...data.transactions);
+    Object.entries(data.deleted).forEach(([resource, ids]) => result.deleted[resource].push(...ids));
+    result.seq = data.seq;
+    cursor = data.next_cursor;
+  } while (cursor);
+  return result;
+};
+
+// Apply deletions, then upserts, to a list of rows keyed by id
+export const applyChanges = (rows, changed, deletedIds) => {
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  deletedIds.forEach((id) => byId.delete(id));
+  changed.forEach((row) => byId.set(row.id, row));
+  return [...byId.values()].sort((a, b) => a.id - b.id);
+};